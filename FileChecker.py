@@ -1,8 +1,197 @@
+import json
+import re
+import sys
 import docx
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from style_resolver import get_resolver, read_fonts, font_slot
+
+STRUCTURE_TITLES = ("STATEMENT", "ABOUT THE DOCUMENT", "TARGET USERS", "SYMBOL DESCRIPTION", "EXPLANATION OF TERMS")
+DEFAULT_ALLOWED_FONTS = ("Montserrat", "思源黑体")
+
 
 class FileChecker:
-    def __init__(self, doc_path):
-        self.doc = docx.Document(doc_path)
+    def __init__(self, doc_path, output=None):
+        # A path, or a document that is already loaded (e.g. shared by the pipeline's read-only stages)
+        self.doc = doc_path if isinstance(doc_path, docx.document.Document) else docx.Document(doc_path)
+        # Stream of the check reports, None for sys.stdout
+        self.output = output
+        self._resolver = None
+        self._analysis = {}
+
+    @property
+    def resolver(self):
+        """Style resolver for this document, shared with other documents that use the same styles.xml."""
+        if self._resolver is None:
+            try:
+                styles_xml = self.doc.part.part_related_by(RT.STYLES).blob
+            except KeyError:
+                styles_xml = b'<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"/>'
+            try:
+                theme_xml = self.doc.part.part_related_by(RT.THEME).blob
+            except KeyError:
+                theme_xml = None
+            self._resolver = get_resolver(styles_xml, theme_xml)
+        return self._resolver
+
+    def analyze(self, allowed_fonts=DEFAULT_ALLOWED_FONTS):
+        """
+        Walks all paragraphs (including tables) once and collects everything the checks report:
+        structure titles, heading-level skips, undefined/unused styles and font deviations.
+        The result is cached per set of allowed fonts.
+        """
+        allowed_fonts = tuple(allowed_fonts)
+        if allowed_fonts in self._analysis:
+            return self._analysis[allowed_fonts]
+
+        resolver = self.resolver
+        allowed = set(allowed_fonts)
+        titles_found = {title: False for title in STRUCTURE_TITLES}
+        heading_skips = []
+        undefined_styles = {}
+        used_styles = set()
+        font_issues = []
+        previous_level = None
+
+        for i, p in enumerate(self.doc.element.body.iter(qn("w:p"))):
+            p_style_element = p.find(f"{qn('w:pPr')}/{qn('w:pStyle')}")
+            p_style = p_style_element.get(qn("w:val")) if p_style_element is not None else None
+            if p_style:
+                used_styles.add(p_style)
+                if not resolver.is_defined(p_style):
+                    undefined_styles.setdefault(p_style, i + 1)
+
+            runs = p.xpath("./w:r | ./w:hyperlink/w:r")
+            run_texts = ["".join(t.text or "" for t in r.iter(qn("w:t"))) for r in runs]
+            text = "".join(run_texts).strip()
+            if not text:
+                continue
+
+            if text in titles_found:
+                titles_found[text] = True
+
+            outline_element = p.find(f"{qn('w:pPr')}/{qn('w:outlineLvl')}")
+            if outline_element is not None:
+                level = int(outline_element.get(qn("w:val")))
+                level = level if level < 9 else None
+            else:
+                level = resolver.outline_level(p_style or resolver.default_paragraph_style)
+            if level is not None:
+                if previous_level is not None and level > previous_level + 1:
+                    heading_skips.append(
+                        f"Issue at paragraph {i+1}, text: '{text}': heading level {level+1} follows level {previous_level+1}"
+                    )
+                previous_level = level
+
+            for r, run_text in zip(runs, run_texts):
+                if not run_text.strip():
+                    continue
+                rpr = r.find(qn("w:rPr"))
+                r_style_element = rpr.find(qn("w:rStyle")) if rpr is not None else None
+                r_style = r_style_element.get(qn("w:val")) if r_style_element is not None else None
+                if r_style:
+                    used_styles.add(r_style)
+                    if not resolver.is_defined(r_style):
+                        undefined_styles.setdefault(r_style, i + 1)
+                fonts = resolver.effective_fonts(p_style, r_style, read_fonts(rpr))
+                font = fonts.get(font_slot(run_text))
+                if font is not None and font not in allowed:
+                    font_issues.append(
+                        f"Issue at paragraph {i+1}, text: '{text}': found font '{font}' instead of one of {allowed_fonts}"
+                    )
+
+        # Styles only referenced through basedOn are in use as well
+        for style_id in list(used_styles):
+            parent = resolver.styles.get(style_id, {}).get("based_on")
+            while parent and parent not in used_styles:
+                used_styles.add(parent)
+                parent = resolver.styles.get(parent, {}).get("based_on")
+        unused_custom_styles = sorted(
+            style["name"] for style_id, style in resolver.styles.items()
+            # Linked character styles ("Heading 1 Char") are companions Word creates automatically
+            if style["custom"] and not style["linked"] and style_id not in used_styles
+        )
+
+        analysis = {
+            "titles": titles_found,
+            "heading_skips": heading_skips,
+            "undefined_styles": undefined_styles,
+            "unused_custom_styles": unused_custom_styles,
+            "font_issues": font_issues,
+        }
+        self._analysis[allowed_fonts] = analysis
+        return analysis
+
+    def iter_parts(self):
+        """Yields (label, element) for the body and every distinct header/footer part."""
+        yield "body", self.doc.element.body
+        seen_parts = set()
+        for section in self.doc.sections:
+            for block in (section.header, section.footer):
+                if block.is_linked_to_previous or block.part.partname in seen_parts:
+                    continue
+                seen_parts.add(block.part.partname)
+                yield block.part.partname.split("/")[-1].rsplit(".", 1)[0], block._element
+
+    def inspect(self, out=None, level="paragraph", styles=None, parts=None, pattern=None):
+        """
+        Streams one compact NDJSON record per paragraph (or per run) to out.
+
+        Filters are applied during the traversal, so unmatched paragraphs cost
+        almost nothing and no XML is serialized.
+
+        Args:
+            out: Writable text stream. Defaults to sys.stdout.
+            level (str): "paragraph" or "run".
+            styles (iterable, optional): Only paragraphs with these style ids or names (case-insensitive).
+            parts (iterable, optional): Only these parts, e.g. "body", "header" or "footer2".
+            pattern (str, optional): Only paragraphs (or runs) whose text matches this regex.
+
+        Returns:
+            int: The number of records written.
+        """
+        out = out or sys.stdout
+        resolver = self.resolver
+        styles = {style.lower() for style in styles} if styles else None
+        parts = tuple(parts) if parts else None
+        regex = re.compile(pattern) if pattern else None
+        count = 0
+
+        for part_label, element in self.iter_parts():
+            if parts and not part_label.startswith(parts):
+                continue
+            for i, p in enumerate(element.iter(qn("w:p"))):
+                p_style_element = p.find(f"{qn('w:pPr')}/{qn('w:pStyle')}")
+                p_style = p_style_element.get(qn("w:val")) if p_style_element is not None else resolver.default_paragraph_style
+                style_name = resolver.style_name(p_style) if p_style else None
+                if styles and (p_style or "").lower() not in styles and (style_name or "").lower() not in styles:
+                    continue
+
+                runs = p.xpath("./w:r | ./w:hyperlink/w:r")
+                run_texts = ["".join(t.text or "" for t in r.iter(qn("w:t"))) for r in runs]
+                record = {"part": part_label, "paragraph": i, "style_id": p_style, "style": style_name}
+
+                if level == "run":
+                    for j, (r, run_text) in enumerate(zip(runs, run_texts)):
+                        if regex and not regex.search(run_text):
+                            continue
+                        rpr = r.find(qn("w:rPr"))
+                        r_style_element = rpr.find(qn("w:rStyle")) if rpr is not None else None
+                        r_style = r_style_element.get(qn("w:val")) if r_style_element is not None else None
+                        fonts = resolver.effective_fonts(p_style, r_style, read_fonts(rpr))
+                        out.write(json.dumps(dict(record, run=j, run_style_id=r_style,
+                                                  font=fonts.get(font_slot(run_text)), text=run_text),
+                                             ensure_ascii=False, separators=(",", ":")) + "\n")
+                        count += 1
+                else:
+                    text = "".join(run_texts)
+                    if regex and not regex.search(text):
+                        continue
+                    fonts = resolver.effective_fonts(p_style)
+                    out.write(json.dumps(dict(record, font=fonts.get(font_slot(text)), runs=len(runs), text=text),
+                                         ensure_ascii=False, separators=(",", ":")) + "\n")
+                    count += 1
+        return count
 
     def check_title_presence(self, expected_titles):
         """Check if specific titles exist in the document with the correct content."""
@@ -11,7 +200,7 @@ class FileChecker:
             content = para.text.strip()
             if content in titles_found:
                 titles_found[content] = True
-                print(f"{content} section found.")  # 打印找到的章节
+                print(f"{content} section found.", file=self.output)  # 打印找到的章节
 
                 # 如果找到所有标题，提前返回
                 if all(titles_found.values()):
@@ -22,51 +211,60 @@ class FileChecker:
         """Check if the STATEMENT section exists in the document."""
         for para in self.doc.paragraphs:
             if para.text.strip() == "STATEMENT":
-                print("STATEMENT section found.")
+                print("STATEMENT section found.", file=self.output)
                 return True
 
-        print("STATEMENT section is missing.")
+        print("STATEMENT section is missing.", file=self.output)
         return False
 
     def check_document_structure(self):
-        """Main function to check the structure based on specific titles."""
+        """Main function to check the structure based on specific titles, heading levels and styles."""
+        analysis = self.analyze()
+        titles = analysis["titles"]
+        for title, found in titles.items():
+            if found:
+                print(f"{title} section found.", file=self.output)
         structure_checks = {
-            "STATEMENT": self.check_statement_page(),  # 检查 STATEMENT 是否存在
-            "ABOUT THE DOCUMENT and TARGET USERS": self.check_title_presence(["ABOUT THE DOCUMENT", "TARGET USERS"]),
-            "SYMBOL DESCRIPTION and EXPLANATION OF TERMS": self.check_title_presence(["SYMBOL DESCRIPTION", "EXPLANATION OF TERMS"])
+            "STATEMENT": titles["STATEMENT"],  # 检查 STATEMENT 是否存在
+            "ABOUT THE DOCUMENT and TARGET USERS": titles["ABOUT THE DOCUMENT"] and titles["TARGET USERS"],
+            "SYMBOL DESCRIPTION and EXPLANATION OF TERMS": titles["SYMBOL DESCRIPTION"] and titles["EXPLANATION OF TERMS"]
         }
-        
+
         missing_sections = []
         for section, result in structure_checks.items():
             if not result:
                 missing_sections.append(section)
-                print(f"Detailed Issue: '{section}' page is missing or incorrect.")
+                print(f"Detailed Issue: '{section}' page is missing or incorrect.", file=self.output)
 
         # 总结检查结果
         if not missing_sections:
-            print("Document structure is correct.")
+            print("Document structure is correct.", file=self.output)
         else:
-            print("Document structure is incomplete or incorrect.")
-            print("Missing or incorrect sections:")
+            print("Document structure is incomplete or incorrect.", file=self.output)
+            print("Missing or incorrect sections:", file=self.output)
             for section in missing_sections:
-                print(f"- {section}")
+                print(f"- {section}", file=self.output)
 
-    def check_font_consistency(self, allowed_fonts=("Montserrat", "思源黑体")):
-        """Check all text in the document uses one of the allowed fonts."""
-        font_issues = []
-        for i, para in enumerate(self.doc.paragraphs):
-            if not para.text.strip():  # Skip empty paragraphs
-                continue
+        if analysis["heading_skips"]:
+            print("Heading level skips found:", file=self.output)
+            for issue in analysis["heading_skips"]:
+                print(issue, file=self.output)
+        if analysis["undefined_styles"]:
+            print("Styles used but not defined in the document (orphan styles):", file=self.output)
+            for style_id, paragraph in analysis["undefined_styles"].items():
+                print(f"- '{style_id}' (first used at paragraph {paragraph})", file=self.output)
+        if analysis["unused_custom_styles"]:
+            print("Custom styles defined but never used:", file=self.output)
+            for name in analysis["unused_custom_styles"]:
+                print(f"- {name}", file=self.output)
 
-            for run in para.runs:
-                if run.text.strip() and (run.font.name is not None) and (run.font.name not in allowed_fonts):
-                    font_issues.append(
-                        f"Issue at paragraph {i+1}, text: '{para.text.strip()}': found font '{run.font.name}' instead of one of {allowed_fonts}"
-                    )
+    def check_font_consistency(self, allowed_fonts=DEFAULT_ALLOWED_FONTS):
+        """Check all text in the document uses one of the allowed fonts, following style inheritance."""
+        font_issues = self.analyze(allowed_fonts)["font_issues"]
 
         if font_issues:
-            print("Font consistency issues found:")
+            print("Font consistency issues found:", file=self.output)
             for issue in font_issues:
-                print(issue)
+                print(issue, file=self.output)
         else:
-            print("Font consistency is correct.")
+            print("Font consistency is correct.", file=self.output)
@@ -1,5 +1,7 @@
 import docx
-import jieba
+from glossary_store import load_glossary
+from segments import iter_text_segments
+from term_matcher import TermMatcher
 
 class Postprocessor:
     """
@@ -9,9 +11,14 @@ class Postprocessor:
     def __init__(self, glossary):
         """
         Initialize the Postprocessor with a glossary of terms.
-        :param glossary: List of dictionaries containing terms, expanded forms, and descriptions.
+        :param glossary: List of dictionaries containing terms, expanded forms, and descriptions,
+                         or a glossary file / Glossary loaded through glossary_store.
         """
+        if not isinstance(glossary, list):
+            glossary = load_glossary(glossary).to_terms()
         self.glossary = glossary
+        # Compile the glossary once; detection then scans the document in a single pass
+        self.term_matcher = TermMatcher(glossary)
 
     def insert_explanation_of_terms(self, doc, terms):
         """
@@ -46,34 +53,29 @@ class Postprocessor:
     def detect_terms(self, doc):
         """
         Detects terms from the document that match the glossary.
+        Body paragraphs, tables, headers and footers are all scanned.
         :param doc: docx.Document object.
-        :return: List of matched terms.
+        :return: List of matched terms, each extended with "count" and "first_location".
         """
-        # Combine all document text
-        full_text = []
-        for para in doc.paragraphs:
-            full_text.append(para.text)
-        full_text = " ".join(full_text)
-
-        # Perform word segmentation using jieba
-        words = jieba.lcut(full_text)
-
-        # Match detected words with glossary terms
-        matched_terms = [term for term in self.glossary if term["acronym"] in words]
+        matched_terms = []
+        for hit in self.term_matcher.find(iter_text_segments(doc)):
+            matched_terms.append({**hit["term"], "count": hit["count"], "first_location": hit["first_location"]})
         return matched_terms
 
-    def process_word_file(self, input_path, output_path):
+    def process_word_file(self, input_path, output_path, matched_terms=None):
         """
         Postprocesses the Word file to add an EXPLANATION OF TERMS section if necessary.
         :param input_path: Path to the input Word file.
         :param output_path: Path to save the processed Word file.
+        :param matched_terms: Terms already detected in the input file (optional), detected here if None.
         """
         try:
             # Load the document
             doc = docx.Document(input_path)
 
             # Detect terms in the document
-            matched_terms = self.detect_terms(doc)
+            if matched_terms is None:
+                matched_terms = self.detect_terms(doc)
 
             # If matched terms exist, add the EXPLANATION OF TERMS section
             if matched_terms:
@@ -1,6 +1,6 @@
 import docx
 import os
-import shutil
+from backup_store import BackupStore
 
 class Preprocessor:
 
@@ -77,11 +77,12 @@ class Preprocessor:
         """
         Process a Word file: delete all content before the first "Heading 1", delete headers, footers, and watermark.
         """
-        # Create a backup path for the output file
-        backup_path = f"{output_path}.backup.docx"
+        # Back up the original file into the content-addressed backup store
         try:
-            shutil.copyfile(input_path, backup_path)
-            print(f"A backup of the original file has been created at {backup_path}")
+            same_file = os.path.exists(output_path) and os.path.samefile(input_path, output_path)
+            entry = BackupStore().store(input_path, allow_hardlink=not same_file)
+            print(f"A backup of the original file is stored as {entry['sha256'][:12]} ({entry['method']}). "
+                  f"Restore it with: python backup_store.py restore {entry['sha256'][:12]}")
 
         except Exception as e:
             print(f"An error occurred while creating the backup: {e}")
@@ -1,3 +1,4 @@
+import copy
 import docx
 import json
 from urllib.parse import quote
@@ -5,9 +6,39 @@ import datetime
 import hmac
 import hashlib
 import requests
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import functools
 import os
+import threading
+import time
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
+from glossary_store import load_glossary
+from sentence_splitter import split_sentences, join_sentences
+from translation_memory import TranslationMemory
+from usage_ledger import UsageLedger
+from pydoc_logging import get_logger
+
+logger = get_logger("translator")
+
+
+def job(method):
+    """
+    Runs a Translator method as one job: all requests made inside it share one deadline of
+    job_timeout seconds. Nested jobs (e.g. translate_batch inside translate_word_file) use the
+    deadline of the outermost one.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        outer = self._deadline
+        if outer is None and self.job_timeout:
+            self._deadline = time.monotonic() + self.job_timeout
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._deadline = outer
+    return wrapper
 
 
 class Translator:
@@ -15,9 +46,55 @@ class Translator:
     Initializes the Translator class.
 
     This method creates an empty dictionary translated_cache that is used to cache translated text to avoid repeated translation.
+    An optional glossary (file path, Glossary or term list) provides fixed translations for segments that are exactly a glossary term.
+    Paragraphs are split into sentences before caching and batching (sentence_split=True), and sentences are
+    looked up in and stored to the persistent translation memory (memory, pass False to disable it).
+    Texts are translated to target_lang, which also selects the translation memory partition.
+
+    Every request has a (connect, read) timeout in seconds, and a job (one document or batch) may be
+    bounded by job_timeout seconds, after which no new request is sent. With hedge_percentile (e.g.
+    0.95), a batch still unanswered after that percentile of the recent request latencies is sent a
+    second time; the first successful answer is used and the other request is abandoned.
     """
-    def __init__(self):
+    # Limits of one VolcEngine TranslateText request
+    BATCH_SIZE = 16
+    BATCH_CHARS = 5000
+    # (connect, read) timeout of one request in seconds
+    REQUEST_TIMEOUT = (5, 60)
+    # Latencies kept for the hedging percentile, and the number needed before hedging starts
+    LATENCY_WINDOW = 200
+    HEDGE_MIN_SAMPLES = 20
+
+    def __init__(self, glossary=None, memory=None, sentence_split=True, workers=4,
+                 timeout=REQUEST_TIMEOUT, job_timeout=None, hedge_percentile=None, target_lang="en"):
         self.translated_cache = {}
+        self.target_lang = self.api_language(target_lang)
+        self.glossary = load_glossary(glossary) if glossary is not None else None
+        self.glossary_name = glossary if isinstance(glossary, str) else None
+        self.memory = TranslationMemory() if memory is None else memory or None
+        self.sentence_split = sentence_split
+        self.workers = workers
+        self.ledger = UsageLedger()
+        self.document = None
+        self.timeout = timeout
+        self.job_timeout = job_timeout
+        self.hedge_percentile = hedge_percentile
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._deadline = None
+        self._hedge_executor = None
+        self._hedge_executor_lock = threading.Lock()
+
+    @staticmethod
+    def api_language(code):
+        """
+        Converts a language code (e.g. "EN-US", "DE", "zh-Hant") to a VolcEngine target language.
+
+        VolcEngine has no regional variants of English and Portuguese, so EN-US and EN-GB both
+        translate to "en" and share one translation memory partition.
+        """
+        code = code.lower()
+        base = code.split("-")[0]
+        return base if base in ("en", "pt") else code
 
     def hmac_sha256(self, key: bytes, content: str):
         """
@@ -63,7 +140,7 @@ class Translator:
                 query = query + quote(key, safe="-_.~") + "=" + quote(params[key], safe="-_.~") + "&"
         return query[:-1].replace("+", "%20")
 
-    def request(self, method, date, query, header, ak, sk, action, body):
+    def request(self, method, date, query, header, ak, sk, action, body, timeout=None, session=None):
         """
         Sends a request to the specified API endpoint with the given parameters.
 
@@ -76,6 +153,9 @@ class Translator:
             sk (str): The secret access key for authentication.
             action (str): The API action to perform.
             body (str): The body of the request (if any).
+            timeout (tuple, optional): (connect, read) timeout in seconds. Defaults to self.timeout.
+            session (requests.Session, optional): Session to send the request with, so it can be
+                closed by the caller.
 
         Returns:
             dict: The JSON response from the API, or None if an error occurred.
@@ -140,25 +220,29 @@ class Translator:
         header = {**header, **sign_result}
 
         try:
-            print(f"Making request with method: {method}, url: https://{request_param['host']}{request_param['path']}, params: {request_param['query']}, headers: {header}, data: {request_param['body']}")
-            r = requests.request(
+            # Headers and body are never logged: they carry the signed credentials and the document text
+            start = time.monotonic()
+            r = (session or requests).request(
                 method=method,
                 url="https://{}{}".format(request_param["host"], request_param["path"]),
                 headers=header,
                 params=request_param["query"],
                 data=request_param["body"],
                 proxies={},
+                timeout=timeout or self.timeout,
             )
-            print(f"Received response status code: {r.status_code}, content: {r.content}")
+            fields = {"action": action, "status": r.status_code, "request_bytes": len(request_param["body"]),
+                      "response_bytes": len(r.content), "ms": round((time.monotonic() - start) * 1000)}
+            logger.debug("VolcEngine request", extra={"sampled": True, "fields": fields})
             r.raise_for_status()
             return r.json()
         except requests.exceptions.RequestException as e:
-            print(f"An error occurred while making the request: {e}")
+            logger.error("An error occurred while making the request: %s", e, extra={"fields": {"action": action}})
             return None
 
     def translate_text(self, text):
         """
-        Translates the given text to English.
+        Translates the given text to the target language.
 
         Args:
             text (str): The text to be translated.
@@ -166,25 +250,193 @@ class Translator:
         Returns:
             str: The translated text, or an error message if the translation fails.
         """
+        translated_text = self.translate_batch([text])[0]
+        if translated_text is None:
+            return "Failed to obtain translation result."
+        return translated_text
+
+    def _lookup(self, text):
+        """Returns True if the text is already cached, filling the cache from the glossary when the text is a term."""
         if text in self.translated_cache:
-            return self.translated_cache[text]
+            return True
+        if self.glossary is not None:
+            term = self.glossary.get(text)
+            if term is not None:
+                self.translated_cache[text] = term
+                return True
+        return False
+
+    def _request_timeout(self):
+        """Returns the timeout of the next request, shortened to the job deadline, or None if the deadline has passed."""
+        if self._deadline is None:
+            return self.timeout
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        connect, read = self.timeout
+        return min(connect, remaining), min(read, remaining)
+
+    def _hedge_delay(self):
+        """Returns how long to wait before hedging a batch, or None if hedging is off or there are too few samples."""
+        if not self.hedge_percentile or len(self.latencies) < self.HEDGE_MIN_SAMPLES:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(self.hedge_percentile * len(latencies)))]
+
+    def _send_batch(self, texts):
+        """
+        Sends one batch, hedged with a duplicate request if it is slower than the hedge percentile.
+
+        Returns:
+            list: The translated texts, or None if every attempt failed or the job deadline has passed.
+        """
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._request_translations(texts)
+
+        # Only the first successful attempt may use its result: the other one records no usage or latency
+        winner = threading.Lock()
+        executor = self._hedging_executor()
+
+        def request():
+            with requests.Session() as session:
+                return self._request_translations(texts, session, lambda: winner.acquire(blocking=False))
+
+        attempts = [executor.submit(request)]
+        done, _ = wait(attempts, timeout=delay)
+        if not done and self._request_timeout() is not None:
+            logger.debug("Hedging a batch of %d texts after %.2fs", len(texts), delay, extra={"sampled": True})
+            attempts.append(executor.submit(request))
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result() is not None:
+                    # A request cannot be interrupted: the losing one runs to completion in the background
+                    # and its result is dropped. Like every request, its timeout is capped by _request_timeout,
+                    # so it never outlives the job deadline.
+                    return future.result()
+        return None
+
+    def _hedging_executor(self):
+        """Returns the thread pool of hedged attempts, shared by all batches of this Translator."""
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                # Room for both attempts of every concurrent batch, plus losers that are still running
+                self._hedge_executor = ThreadPoolExecutor(max_workers=4 * max(1, self.workers), thread_name_prefix="hedge")
+            return self._hedge_executor
+
+    def _request_translations(self, texts, session=None, claim=None):
+        """
+        Translates a list of texts to the target language in a single API request.
+
+        Args:
+            texts (list): The texts to be translated, at most BATCH_SIZE items.
+            session (requests.Session, optional): Session to send the request with.
+            claim (callable, optional): Called before a successful result is used; if it returns
+                False the result is dropped without recording usage (the losing request of a hedge).
+
+        Returns:
+            list: The translated texts in the same order, or None if the request fails
+                or the job deadline has passed.
+        """
+        timeout = self._request_timeout()
+        if timeout is None:
+            logger.warning("Job deadline exceeded, a batch of %d texts was not sent.", len(texts))
+            return None
         body = {
-            'TargetLanguage': 'en',
-            'TextList': [text],
+            'TargetLanguage': self.target_lang,
+            'TextList': texts,
         }
-        url = "https://translate.volcengineapi.com/"
         now = datetime.datetime.now(datetime.timezone.utc)
         headers = {}
-        result = self.request("POST", now, {}, headers, os.getenv('VOLC_ACCESS_KEY'), os.getenv('VOLC_SECRET_KEY'), "TranslateText", json.dumps(body))
+        start = time.monotonic()
+        result = self.request("POST", now, {}, headers, os.getenv('VOLC_ACCESS_KEY'), os.getenv('VOLC_SECRET_KEY'), "TranslateText", json.dumps(body), timeout, session)
         if result is None:
-            print("Translation result is None. Check the request.")
-            return "Failed to obtain translation result."
-        elif 'TranslationList' in result:
-            self.translated_cache[text] = result['TranslationList'][0]['Translation']
-            return self.translated_cache[text]
+            logger.error("Translation result is None. Check the request.")
+            return None
+        elif 'TranslationList' in result and len(result['TranslationList']) == len(texts):
+            if claim is not None and not claim():
+                logger.debug("Dropping the result of a hedged batch answered second", extra={"sampled": True})
+                return None
+            self.ledger.record("volcengine", sum(len(text) for text in texts), document=self.document, glossary=self.glossary_name)
+            self.latencies.append(time.monotonic() - start)
+            return [item['Translation'] for item in result['TranslationList']]
         else:
-            print(f"Unexpected result: {result}")
-            return "Failed to obtain translation result."
+            logger.error("Unexpected result: %s", result)
+            return None
+
+    @job
+    def translate_batch(self, texts):
+        """
+        Translates many texts with as few API requests as possible.
+
+        Texts that are not cached or a glossary term are split into sentences, so a revised
+        paragraph only sends its changed sentences and long paragraphs are spread over requests.
+        Cached sentences and translation memory hits are not sent, duplicates are sent once, and
+        the rest is packed into requests of at most BATCH_SIZE texts and BATCH_CHARS characters.
+        The translated sentences are joined back into paragraphs.
+
+        Args:
+            texts (list): The texts to be translated.
+
+        Returns:
+            list: The translated texts in the same order; None for texts whose request failed.
+        """
+        splits = {}
+        units = []
+        for text in dict.fromkeys(texts):
+            if self._lookup(text):
+                continue
+            sentences, separators = split_sentences(text) if self.sentence_split else ([text], [])
+            if len(sentences) > 1:
+                splits[text] = (sentences, separators)
+                units.extend(sentences)
+            else:
+                units.append(text)
+        self._translate_units(units)
+
+        results = []
+        for text in texts:
+            if text in splits:
+                sentences, separators = splits[text]
+                translated = [self.translated_cache.get(sentence) for sentence in sentences]
+                results.append(None if None in translated else join_sentences(translated, separators, self.target_lang))
+            else:
+                results.append(self.translated_cache.get(text))
+        return results
+
+    def _translate_units(self, units):
+        """Fills translated_cache for the units, from the glossary, the translation memory or the API."""
+        pending = [text for text in dict.fromkeys(units) if not self._lookup(text)]
+        partition = os.path.basename(self.glossary_name) if self.glossary_name else ""
+        if self.memory is not None and pending:
+            found = self.memory.get_many(pending, self.target_lang, partition)
+            self.translated_cache.update(found)
+            pending = [text for text in pending if text not in found]
+
+        batches, batch, batch_chars = [], [], 0
+        for text in pending:
+            if batch and (len(batch) >= self.BATCH_SIZE or batch_chars + len(text) > self.BATCH_CHARS):
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(text)
+            batch_chars += len(text)
+        if batch:
+            batches.append(batch)
+
+        def send(i, batch):
+            logger.debug("Translating batch %d/%d (%d texts)", i + 1, len(batches), len(batch), extra={"sampled": True})
+            return batch, self._send_batch(batch)
+
+        # Batches of one long paragraph or of a whole document are sent concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(batches)))) as executor:
+            for batch, translations in executor.map(send, range(len(batches)), batches):
+                if translations is not None:
+                    self.translated_cache.update(zip(batch, translations))
+                    if self.memory is not None:
+                        self.memory.put_many(zip(batch, translations), provider="volcengine",
+                                             target_lang=self.target_lang, partition=partition)
 
     def insert_paragraph_after(self, para, text=None, style=None):
         """
@@ -209,38 +461,157 @@ class Translator:
                 new_paragraph.style = style
         return new_paragraph
 
+    @staticmethod
+    def iter_word_units(doc):
+        """
+        Yields the translation units of a Word document in document order.
+
+        A unit is a body paragraph or a table cell (merged cells only once). Each unit holds its
+        segments: the paragraph text, or one segment per line of the cell text. Segment ids are
+        numbered in this order, so they are stable for the same document.
+
+        Yields:
+            tuple: (kind, obj, segments) with kind "paragraph" or "cell", the python-docx object
+                and a list of (segment id, location, text).
+        """
+        counter = 0
+        for p_index, para in enumerate(doc.paragraphs):
+            if para.text:
+                counter += 1
+                yield "paragraph", para, [(f"s{counter}", f"body/p[{p_index}]", para.text)]
+
+        for t_index, table in enumerate(doc.tables):
+            seen_cells = {}
+            for r_index, row in enumerate(table.rows):
+                for c_index, cell in enumerate(row.cells):
+                    # Merged cells are returned once per grid column, only translate them once
+                    if id(cell._tc) in seen_cells:
+                        continue
+                    seen_cells[id(cell._tc)] = cell._tc
+                    original_text = cell.text.strip()
+                    if not original_text:
+                        continue
+                    segments = []
+                    for l_index, line in enumerate(original_text.splitlines()):
+                        counter += 1
+                        segments.append((f"s{counter}", f"tbl[{t_index}]/r[{r_index}]/c[{c_index}]/l[{l_index}]", line))
+                    yield "cell", cell, segments
+
+    def apply_word_translations(self, doc, translate):
+        """
+        Adds the translation below every segment of the document while retaining styles.
+
+        Args:
+            doc (docx.Document): The document, modified in place.
+            translate (callable): translate(segment_id, text) returning the translated text.
+        """
+        for kind, obj, segments in self.iter_word_units(doc):
+            translated = [translate(segment_id, text) for segment_id, _, text in segments]
+            if kind == "paragraph":
+                self.insert_paragraph_after(obj, text=translated[0], style=obj.style)
+                continue
+            obj.text = ""
+            for (_, _, line), translated_line in zip(segments, translated):
+                para = obj.add_paragraph(line)
+                translated_para = obj.add_paragraph(translated_line)
+                translated_para.style = para.style
+
+    @job
     def translate_word_file(self, input_path, output_path):
             """Translate the document and add translation text below the original text while retaining styles."""
             doc = docx.Document(input_path)
+            self.document = input_path
+            self.apply_word_translations(doc, lambda segment_id, text: self.translate_text(text))
+            doc.save(output_path)
+            logger.info("Translation completed. Document saved at: %s", output_path)
 
-            # Translate all paragraphs
-            for para in doc.paragraphs:
-                original_text = para.text
-                if original_text:
-                    translated_text = self.translate_text(original_text)
-                    new_para = self.insert_paragraph_after(para, text=translated_text, style=para.style)
-
-            # Translate all tables, using a cache to avoid duplicate translations
-            translated_table_cells = {}
-
-            # Iterate through all tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        original_text = cell.text.strip()
-                        if original_text:
-                            if (row, cell) not in translated_table_cells:
-                                lines = original_text.splitlines()
-                                translated_lines = [self.translate_text(line) for line in lines]
-                                translated_table_cells[(row, cell)] = translated_lines
-                            else:
-                                translated_lines = translated_table_cells[(row, cell)]
-                            
-                            cell.text = ""
-                            for line, translated_line in zip(lines, translated_lines):
-                                para = cell.add_paragraph(line)
-                                translated_para = cell.add_paragraph(translated_line)
-                                translated_para.style = para.style
+    @job
+    def translate_word_outputs(self, input_path, outputs, target_lang="en"):
+        """
+        Translates a Word document once and writes any combination of outputs from the same translations.
 
-            doc.save(output_path)
-            print(f"Translation completed. Document saved at: {output_path}")
+        Every segment is translated in batched requests, then the outputs are written in parallel:
+        "bilingual" (like translate_word_file), "target" (source text replaced in place), "table"
+        (two-column source/translation table) and "tmx".
+
+        Args:
+            input_path (str): The Word document.
+            outputs (dict): {format: path}, e.g. from translation_outputs.output_paths().
+            target_lang (str): Target language code written to the TMX file and table header.
+
+        Returns:
+            dict: The written {format: path}.
+        """
+        from translation_outputs import write_outputs
+
+        doc = docx.Document(input_path)
+        self.document = input_path
+        segments = [(segment_id, text) for _, _, unit_segments in self.iter_word_units(doc)
+                    for segment_id, _, text in unit_segments]
+        translations = self.translate_segments(segments)
+        written = write_outputs(input_path, translations, outputs, target_lang=target_lang)
+        logger.info("Translation completed. Outputs: %s", ", ".join(written.values()))
+        return written
+
+    @job
+    def translate_segments(self, segments):
+        """
+        Translates the segments of a document in batched requests.
+
+        Args:
+            segments (list): (segment id, text) tuples, e.g. from iter_word_units.
+
+        Returns:
+            dict: {segment id: translated text}; segments that could not be translated keep their text.
+        """
+        texts = [text for _, text in segments if text.strip()]
+        translated = dict(zip(texts, self.translate_batch(texts)))
+        failed = sum(1 for translation in translated.values() if translation is None)
+        if failed:
+            logger.warning("%d segments could not be translated and were left unchanged.", failed)
+        return {segment_id: translated.get(text) or text for segment_id, text in segments}
+
+    @job
+    def translate_pptx_file(self, input_path, output_path):
+        """
+        Translate a PowerPoint deck in place: shapes (including grouped shapes), table cells and speaker notes.
+
+        The text of all paragraphs is collected first and translated in batched requests, then every
+        paragraph is replaced by its translation in one pass, keeping the formatting of its first run.
+        """
+        # python-pptx is only needed for decks, so Word translation works without it
+        from pptx import Presentation
+        from pptx_segments import iter_text_frames
+
+        prs = Presentation(input_path)
+        self.document = input_path
+
+        paragraphs = []
+        for _, text_frame in iter_text_frames(prs):
+            for paragraph in text_frame.paragraphs:
+                # Skip numbers, symbols and empty paragraphs
+                if any(ch.isalpha() for ch in paragraph.text):
+                    paragraphs.append(paragraph)
+
+        texts = [paragraph.text.strip() for paragraph in paragraphs]
+        translations = dict(zip(texts, self.translate_batch(texts)))
+
+        failed = 0
+        for paragraph, text in zip(paragraphs, texts):
+            translated_text = translations[text]
+            if translated_text is None:
+                failed += 1
+                continue
+            runs = paragraph.runs
+            rpr = runs[0]._r.rPr if runs else None
+            rpr = copy.deepcopy(rpr) if rpr is not None else None
+            # Line breaks are kept as vertical tabs, which python-pptx writes back as <a:br/>
+            paragraph.text = translated_text
+            if rpr is not None:
+                for run in paragraph.runs:
+                    run._r.insert(0, copy.deepcopy(rpr))
+
+        prs.save(output_path)
+        if failed:
+            logger.warning("%d paragraphs could not be translated and were left unchanged.", failed)
+        logger.info("Translation completed. Presentation saved at: %s", output_path)
@@ -0,0 +1,344 @@
+import argparse
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ioctl request number of FICLONE on Linux (copy-on-write clone of a whole file)
+FICLONE = 0x40049409
+
+DEFAULT_BACKUP_DIR = os.path.join(os.path.expanduser("~"), ".pydoc", "backups")
+
+
+class BackupStore:
+    """
+    Content-addressed store for the original files touched by PyDoc.
+
+    Every backed up file is hashed (SHA256) and stored once under ``objects/``;
+    repeated runs on the same source only refresh its entry in ``index.json``.
+    New objects are created with a reflink when the filesystem supports one and
+    fall back to a full copy otherwise. Hardlinks are opt-in ($PYDOC_BACKUP_HARDLINK=1):
+    they cost nothing but share the data with the source, so any in-place rewrite
+    of the source also changes its backup.
+
+    Changes of the index and the objects are serialized by an exclusive lock on ``.lock``,
+    so concurrent runs neither lose each other's entries nor prune an object that another
+    run has just stored.
+    """
+
+    def __init__(self, root=None, max_entries=200, max_age_days=30, max_total_mb=2048, use_hardlinks=None):
+        """
+        Initializes the backup store.
+
+        Args:
+            root (str, optional): Store directory. Defaults to $PYDOC_BACKUP_DIR or ~/.pydoc/backups.
+            max_entries (int): Maximum number of index entries kept by prune().
+            max_age_days (int): Entries not seen for longer than this are dropped by prune().
+            max_total_mb (int): Maximum size of all stored objects, oldest entries go first.
+            use_hardlinks (bool, optional): Allow hardlinks when reflinks are unavailable.
+                Defaults to $PYDOC_BACKUP_HARDLINK.
+        """
+        self.root = root or os.getenv("PYDOC_BACKUP_DIR") or DEFAULT_BACKUP_DIR
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.index_path = os.path.join(self.root, "index.json")
+        self.lock_path = os.path.join(self.root, ".lock")
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.max_total_bytes = max_total_mb * 1024 * 1024
+        if use_hardlinks is None:
+            use_hardlinks = os.getenv("PYDOC_BACKUP_HARDLINK", "").lower() in ("1", "true", "yes")
+        self.use_hardlinks = use_hardlinks
+
+    # ========= Index =========
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Holds the store lock, shared by all threads and processes using the store."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.lock_path, "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return []
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Backup index is unreadable, starting a new one: {e}")
+            return []
+
+    def _save_index(self, entries):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    # ========= Objects =========
+
+    @staticmethod
+    def hash_file(path, chunk_size=1024 * 1024):
+        """
+        Calculates the SHA256 of a file without loading it into memory.
+
+        Args:
+            path (str): The file to hash.
+            chunk_size (int): Read size in bytes.
+
+        Returns:
+            str: The hexadecimal digest.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def object_path(self, digest, ext=""):
+        return os.path.join(self.objects_dir, digest[:2], digest + ext)
+
+    @staticmethod
+    def _reflink(src, dst):
+        if fcntl is None:
+            return False
+        try:
+            with open(src, "rb") as fs, open(dst, "wb") as fd:
+                fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+            return True
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+            return False
+
+    def _materialize(self, src, dst, allow_hardlink):
+        """Creates dst from src as cheaply as the filesystem allows and returns the method used."""
+        tmp_dst = f"{dst}.tmp"
+        if self._reflink(src, tmp_dst):
+            method = "reflink"
+        else:
+            method = None
+            if allow_hardlink and self.use_hardlinks:
+                try:
+                    os.link(src, tmp_dst)
+                    method = "hardlink"
+                except OSError:
+                    method = None
+            if method is None:
+                shutil.copyfile(src, tmp_dst)
+                method = "copy"
+        os.replace(tmp_dst, dst)
+        return method
+
+    # ========= Public API =========
+
+    def store(self, path, allow_hardlink=True):
+        """
+        Backs up a file, writing it to the store only if its content is not already there.
+
+        Args:
+            path (str): The file to back up.
+            allow_hardlink (bool): Whether a hardlink may be used for this file (if enabled
+                for the store). Pass False when the source is about to be rewritten in place.
+
+        Returns:
+            dict: The index entry of the backup.
+        """
+        path = os.path.abspath(path)
+        digest = self.hash_file(path)
+        ext = os.path.splitext(path)[1]
+        obj_path = self.object_path(digest, ext)
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+
+        with self._locked():
+            if os.path.exists(obj_path) and os.path.getsize(obj_path) == os.path.getsize(path):
+                method = "existing"
+            else:
+                os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+                method = self._materialize(path, obj_path, allow_hardlink)
+
+            entries = self._load_index()
+            entry = next((e for e in entries if e["sha256"] == digest and e["source"] == path), None)
+            if entry is None:
+                entry = {
+                    "sha256": digest,
+                    "source": path,
+                    "object": os.path.relpath(obj_path, self.root),
+                    "size": os.path.getsize(path),
+                    "created": now,
+                    "last_seen": now,
+                    "method": method,
+                }
+                entries.append(entry)
+            else:
+                entry["last_seen"] = now
+
+            self._prune(entries)
+        return entry
+
+    def list(self, source=None):
+        """
+        Lists the backups in the store, most recently seen first.
+
+        Args:
+            source (str, optional): Only list backups of this source file.
+
+        Returns:
+            list: Index entries.
+        """
+        entries = self._load_index()
+        if source:
+            source = os.path.abspath(source)
+            entries = [e for e in entries if e["source"] == source]
+        return sorted(entries, key=lambda e: e["last_seen"], reverse=True)
+
+    def find(self, ref):
+        """
+        Finds a backup by SHA256 prefix or source path (latest backup of that source).
+
+        Args:
+            ref (str): A digest prefix or a source file path.
+
+        Returns:
+            dict: The matching index entry, or None.
+
+        Raises:
+            ValueError: If the prefix matches backups of different content.
+        """
+        entries = self.list()
+        matches = [e for e in entries if e["sha256"].startswith(ref)]
+        digests = sorted({e["sha256"] for e in matches})
+        if len(digests) > 1:
+            raise ValueError(f"Ambiguous backup prefix {ref}, it matches: {', '.join(d[:12] for d in digests)}")
+        if not matches:
+            matches = [e for e in entries if e["source"] == os.path.abspath(ref)]
+        return matches[0] if matches else None
+
+    def restore(self, ref, dest=None):
+        """
+        Restores a backup as a regular copy (never a link), so the stored object stays intact.
+
+        Args:
+            ref (str): A digest prefix or a source file path.
+            dest (str, optional): Where to write the file. Defaults to the original source path.
+
+        Returns:
+            str: The restored file path, or None if no backup matched.
+
+        Raises:
+            ValueError: If the prefix matches backups of different content.
+        """
+        entry = self.find(ref)
+        if entry is None:
+            print(f"No backup found for: {ref}")
+            return None
+        dest = os.path.abspath(dest or entry["source"])
+        dest_dir = os.path.dirname(dest)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+        obj_path = os.path.join(self.root, entry["object"])
+        if self.hash_file(obj_path) != entry["sha256"]:
+            print(f"Warning: backup {entry['sha256'][:12]} no longer matches its hash, "
+                  f"the hardlinked source was probably modified in place.")
+        shutil.copyfile(obj_path, dest)
+        print(f"Backup {entry['sha256'][:12]} restored to {dest}")
+        return dest
+
+    def prune(self, entries=None):
+        """
+        Applies the retention limits and deletes objects no longer referenced by the index.
+
+        Args:
+            entries (list, optional): Index entries to prune. Defaults to the stored index.
+
+        Returns:
+            int: The number of index entries removed.
+        """
+        with self._locked():
+            return self._prune(self._load_index() if entries is None else entries)
+
+    def _prune(self, entries):
+        # Callers hold the store lock, so entries is the current index
+        before = len(entries)
+
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=self.max_age_days)).isoformat(timespec="seconds")
+        entries = sorted((e for e in entries if e["last_seen"] >= cutoff), key=lambda e: e["last_seen"], reverse=True)
+        entries = entries[:self.max_entries]
+
+        kept, seen_objects, total = [], set(), 0
+        for entry in entries:
+            if entry["object"] not in seen_objects:
+                if kept and total + entry["size"] > self.max_total_bytes:
+                    continue
+                total += entry["size"]
+                seen_objects.add(entry["object"])
+            kept.append(entry)
+
+        if os.path.isdir(self.objects_dir):
+            for dirpath, _, filenames in os.walk(self.objects_dir):
+                for name in filenames:
+                    obj_path = os.path.join(dirpath, name)
+                    if os.path.relpath(obj_path, self.root) not in seen_objects:
+                        os.remove(obj_path)
+
+        self._save_index(kept)
+        return before - len(kept)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the PyDoc backup store.")
+    parser.add_argument("--root", type=str, help="Backup store directory (default: $PYDOC_BACKUP_DIR or ~/.pydoc/backups).")
+    subparsers = parser.add_subparsers(dest="command")
+
+    list_parser = subparsers.add_parser("list", help="List stored backups.")
+    list_parser.add_argument("source", nargs="?", help="Only list backups of this source file.")
+
+    restore_parser = subparsers.add_parser("restore", help="Restore a backup.")
+    restore_parser.add_argument("ref", help="SHA256 prefix or source file path.")
+    restore_parser.add_argument("-o", "--output", type=str, help="Restore to this path instead of the original location.")
+
+    prune_parser = subparsers.add_parser("prune", help="Apply retention limits.")
+    prune_parser.add_argument("--max-entries", type=int, default=200)
+    prune_parser.add_argument("--max-age-days", type=int, default=30)
+    prune_parser.add_argument("--max-total-mb", type=int, default=2048)
+
+    args = parser.parse_args()
+    store = BackupStore(args.root)
+
+    if args.command == "list":
+        for entry in store.list(args.source):
+            print(f"{entry['sha256'][:12]}  {entry['last_seen']}  {entry['size']:>10}  {entry['source']}")
+    elif args.command == "restore":
+        try:
+            restored = store.restore(args.ref, args.output)
+        except ValueError as e:
+            print(e)
+            restored = None
+        if restored is None:
+            sys.exit(1)
+    elif args.command == "prune":
+        store = BackupStore(args.root, args.max_entries, args.max_age_days, args.max_total_mb)
+        print(f"Removed {store.prune()} backup entries.")
+    else:
+        parser.print_help()
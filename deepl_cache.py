@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+
+from glossary_store import load_glossary
+from pydoc_logging import get_logger
+
+logger = get_logger("deepl")
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pydoc", "cache", "deepl")
+DEFAULT_MAX_MB = 1024
+# Bump when the key or the stored format changes, so older entries are never hit
+KEY_VERSION = 1
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def glossary_hash(glossary_path):
+    """
+    Hashes the entries of a glossary rather than its file, so the same terms in another format
+    (JSON, CSV/TSV, key=value) or with a reordered file give the same hash.
+    """
+    entries = sorted(load_glossary(glossary_path).as_dict().items())
+    return hashlib.sha256(json.dumps(entries, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    """
+    Content-addressed cache of documents translated by DeepL.
+
+    An entry is keyed by the SHA256 of the input file, the source and target language, the
+    glossary entries and the formality, so a document that was translated before with the same
+    settings is served from disk without uploading it again. Entries are immutable files whose
+    mtime records their last use; when the cache grows over its size limit the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, root=None, max_mb=None):
+        """
+        Args:
+            root (str, optional): Cache directory. Defaults to $PYDOC_DEEPL_CACHE_DIR or ~/.pydoc/cache/deepl.
+            max_mb (int, optional): Size limit of all entries. Defaults to $PYDOC_DEEPL_CACHE_MB or 1024.
+        """
+        self.root = root or os.getenv("PYDOC_DEEPL_CACHE_DIR") or DEFAULT_CACHE_DIR
+        if max_mb is None:
+            max_mb = int(os.getenv("PYDOC_DEEPL_CACHE_MB") or DEFAULT_MAX_MB)
+        self.max_bytes = max_mb * 1024 * 1024
+
+    def key(self, input_path, source_lang, target_lang, glossary_path=None, formality=None):
+        """
+        Builds the cache key of a document translation.
+
+        Args:
+            input_path (str): The source document.
+            source_lang (str): Source language code, None for auto-detection.
+            target_lang (str): Target language code.
+            glossary_path (str, optional): Glossary file.
+            formality (str, optional): DeepL formality, None for the default.
+
+        Returns:
+            str: The hexadecimal key.
+        """
+        parts = {
+            "version": KEY_VERSION,
+            "input": hash_file(input_path),
+            "ext": os.path.splitext(input_path)[1].lower(),
+            "source": (source_lang or "").upper(),
+            "target": target_lang.upper(),
+            "glossary": glossary_hash(glossary_path) if glossary_path else None,
+            "formality": formality if formality and formality != "default" else None,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key, output_path):
+        """
+        Copies a cached translation to output_path.
+
+        Returns:
+            bool: Whether the key was in the cache.
+        """
+        path = self.entry_path(key)
+        try:
+            shutil.copyfile(path, output_path)
+        except FileNotFoundError:
+            return False
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def put(self, key, translated_path):
+        """Stores a translated document under key and evicts old entries if the cache is over its limit."""
+        path = self.entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            shutil.copyfile(translated_path, tmp_path)
+            os.replace(tmp_path, path)
+            self.evict()
+        except OSError as e:
+            logger.warning("Could not write DeepL cache entry %s: %s", path, e)
+
+    def entries(self):
+        """Returns (last use, size, path) of every entry, least recently used first."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for folder in os.scandir(self.root):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(found)
+
+    def evict(self, max_bytes=None):
+        """
+        Removes the least recently used entries until the cache fits its size limit.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.info("Evicted %d DeepL cache entries", removed)
+        return removed
@@ -1,8 +1,13 @@
 import os
 import deepl
-import json
 from typing import Optional, List, Dict, Any
 import time
+from glossary_store import load_glossary
+from deepl_cache import DocumentCache
+from usage_ledger import UsageLedger
+from pydoc_logging import get_logger
+
+logger = get_logger("deepl")
 
 class DeepLTranslator:
     """
@@ -25,10 +30,14 @@ class DeepLTranslator:
         
         # 创建DeepL客户端
         self.translator = deepl.Translator(auth_key)
-        print("DeepL翻译器初始化成功")
+        self._glossary_ids = {}
+        self.ledger = UsageLedger()
+        self.cache = DocumentCache()
+        logger.info("DeepL翻译器初始化成功")
     
     def translate_file(self, input_path: str, output_path: str, source_lang: Optional[str] = None, 
-                      target_lang: str = 'EN-US', glossary_path: Optional[str] = None, reuse_glossary: bool = True) -> None:
+                      target_lang: str = 'EN-US', glossary_path: Optional[str] = None, reuse_glossary: bool = True,
+                      formality: Optional[str] = None, use_cache: bool = True) -> None:
         """
         翻译文件
         
@@ -37,8 +46,11 @@ class DeepLTranslator:
             output_path: 输出文件路径
             source_lang: 源语言代码（可选，DeepL会自动检测）
             target_lang: 目标语言代码，默认为美式英语'EN-US'
-            glossary_path: 术语库JSON文件路径（可选）
+            glossary_path: 术语库文件路径（可选，JSON、CSV/TSV或key=value格式）
             reuse_glossary: 是否复用现有的同名术语库（默认为True）
+            formality: 正式程度（可选，如'more'、'less'、'prefer_more'、'prefer_less'）
+            use_cache: 是否使用本地译文缓存（默认为True）。输入文件、语言、术语库内容和正式程度
+                都相同的文档直接从缓存复制，不再上传和计费
         """
         try:
             # 检查输入文件是否存在
@@ -50,59 +62,135 @@ class DeepLTranslator:
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
+            # 规范化语言代码
+            # DeepL API不再接受"EN"作为目标语言代码，必须使用"EN-GB"或"EN-US"
+            if target_lang == 'EN':
+                target_lang = 'EN-US'  # 默认为美式英语
+            # 当使用术语库时，必须提供源语言
+            if glossary_path and not source_lang:
+                source_lang = 'ZH'  # 如果未指定源语言，默认为中文
+            
+            # 查找缓存，命中时不调用API
+            cache_key = None
+            if use_cache:
+                cache_key = self.cache.key(input_path, source_lang, target_lang, glossary_path, formality)
+                if self.cache.get(cache_key, output_path):
+                    logger.info(f"命中译文缓存，跳过DeepL翻译: {input_path}")
+                    logger.info(f"翻译文件已保存至: {output_path}")
+                    return
+            
             # 处理术语库
             glossary_id = None
             if glossary_path:
                 glossary_id = self._get_or_create_glossary(glossary_path, source_lang, target_lang, reuse_glossary)
             
-            print(f"开始翻译文件: {input_path}")
-            print(f"目标语言: {target_lang}")
+            logger.info(f"开始翻译文件: {input_path}")
+            logger.info(f"目标语言: {target_lang}")
             if glossary_id:
-                print(f"使用术语库进行翻译")
-            
-            # 规范化语言代码
-            # DeepL API不再接受"EN"作为目标语言代码，必须使用"EN-GB"或"EN-US"
-            if target_lang == 'EN':
-                target_lang = 'EN-US'  # 默认为美式英语
+                logger.info(f"使用术语库进行翻译")
             
             # 执行翻译
-            # 当使用术语库时，必须提供源语言
+            options = {}
             if glossary_id:
-                # 确保源语言被设置
-                if not source_lang:
-                    source_lang = 'ZH'  # 如果未指定源语言，默认为中文
-                
-                result = self.translator.translate_document_from_filepath(
-                    input_path,
-                    output_path,
-                    source_lang=source_lang,
-                    target_lang=target_lang,
-                    glossary=glossary_id
-                )
-            else:
-                result = self.translator.translate_document_from_filepath(
-                    input_path,
-                    output_path,
-                    source_lang=source_lang,
-                    target_lang=target_lang
-                )
+                options["glossary"] = glossary_id
+            if formality:
+                options["formality"] = formality
+            result = self.translator.translate_document_from_filepath(
+                input_path,
+                output_path,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                **options
+            )
             
-            print(f"翻译完成！")
+            logger.info(f"翻译完成！")
+            # 记录计费字符数（DeepL按文档实际计费字符返回）
+            self.ledger.record("deepl", getattr(result, "billed_characters", None), document=input_path, glossary=glossary_path)
+            if cache_key:
+                self.cache.put(cache_key, output_path)
             # 不再尝试访问不存在的属性
             if source_lang:
-                print(f"源语言: {source_lang}")
-            print(f"翻译文件已保存至: {output_path}")
+                logger.info(f"源语言: {source_lang}")
+            logger.info(f"翻译文件已保存至: {output_path}")
             
         except Exception as e:
-            print(f"翻译过程中出错: {str(e)}")
+            logger.error(f"翻译过程中出错: {str(e)}")
             raise
     
+    # 单次文本翻译请求的上限（DeepL每次请求最多50段文本，请求体不超过128 KiB）
+    BATCH_SIZE = 50
+    BATCH_CHARS = 30000
+
+    def translate_batch(self, texts: List[str], source_lang: Optional[str] = None, target_lang: str = 'EN-US',
+                        glossary_path: Optional[str] = None, reuse_glossary: bool = True) -> List[Optional[str]]:
+        """
+        按段落批量翻译文本，重复文本只发送一次
+
+        Args:
+            texts: 待翻译的文本列表
+            source_lang: 源语言代码（可选，DeepL会自动检测）
+            target_lang: 目标语言代码，默认为美式英语'EN-US'
+            glossary_path: 术语库文件路径（可选）
+            reuse_glossary: 是否复用现有的同名术语库（默认为True）
+
+        Returns:
+            与输入顺序一致的译文列表，请求失败的文本对应None
+        """
+        if target_lang == 'EN':
+            target_lang = 'EN-US'
+        glossary_id = None
+        if glossary_path:
+            # 使用术语库时必须提供源语言
+            source_lang = source_lang or 'ZH'
+            # 同一术语库只查找/创建一次，避免每批请求都调用术语库接口
+            key = (os.path.abspath(glossary_path), source_lang, target_lang)
+            if key not in self._glossary_ids:
+                self._glossary_ids[key] = self._get_or_create_glossary(glossary_path, source_lang, target_lang, reuse_glossary)
+            glossary_id = self._glossary_ids[key]
+
+        unique_texts = list(dict.fromkeys(texts))
+        batches, batch, batch_chars = [], [], 0
+        for text in unique_texts:
+            if batch and (len(batch) >= self.BATCH_SIZE or batch_chars + len(text) > self.BATCH_CHARS):
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(text)
+            batch_chars += len(text)
+        if batch:
+            batches.append(batch)
+
+        translations = {}
+        for i, batch in enumerate(batches):
+            logger.debug(f"DeepL批量翻译 {i + 1}/{len(batches)}（{len(batch)}段）", extra={"sampled": True})
+            try:
+                results = self.translator.translate_text(batch, source_lang=source_lang, target_lang=target_lang,
+                                                         glossary=glossary_id)
+                translations.update(zip(batch, (result.text for result in results)))
+                self.ledger.record("deepl", sum(len(text) for text in batch), glossary=glossary_path)
+            except Exception as e:
+                logger.error(f"批量翻译时出错: {str(e)}")
+        return [translations.get(text) for text in texts]
+
+    def get_usage(self) -> Optional[tuple]:
+        """
+        查询DeepL账户本计费周期的字符用量
+
+        Returns:
+            (已用字符数, 字符上限)，上限为None表示无限制；查询失败时返回None
+        """
+        try:
+            usage = self.translator.get_usage()
+            return usage.character.count, usage.character.limit
+        except Exception as e:
+            logger.error(f"查询DeepL用量时出错: {str(e)}")
+            return None
+
     def _get_or_create_glossary(self, glossary_path: str, source_lang: Optional[str], target_lang: str, reuse_glossary: bool = True) -> str:
         """
         获取现有术语库或创建新的术语库
         
         Args:
-            glossary_path: 术语库JSON文件路径
+            glossary_path: 术语库文件路径
             source_lang: 源语言代码
             target_lang: 目标语言代码
             reuse_glossary: 是否复用现有的同名术语库
@@ -123,62 +211,27 @@ class DeepLTranslator:
                     # 查找同名术语库
                     for glossary in glossaries:
                         if glossary.name == glossary_name:
-                            print(f"找到现有术语库: {glossary_name}")
-                            print(f"源语言: {glossary.source_lang}, 目标语言: {glossary.target_lang}")
+                            logger.info(f"找到现有术语库: {glossary_name}")
+                            logger.info(f"源语言: {glossary.source_lang}, 目标语言: {glossary.target_lang}")
                             return glossary.glossary_id
-                    print(f"未找到现有术语库，将创建新术语库")
+                    logger.info(f"未找到现有术语库，将创建新术语库")
                 except Exception as e:
-                    print(f"查找现有术语库时出错: {str(e)}")
-                    print("将创建新术语库")
-            
-            # 读取术语库JSON文件
-            with open(glossary_path, 'r', encoding='utf-8') as f:
-                glossary_data = json.load(f)
-            
-            # 验证术语库格式
-            if not isinstance(glossary_data, list):
-                raise ValueError("术语库文件必须包含JSON数组")
-            
-            # 转换术语库格式
-            source_terms = []
-            target_terms = []
-            
-            # 支持两种格式：
-            # 1. ["术语1", "术语2", ...] (假设源语言为中文，目标语言为英文)
-            # 2. [{"source": "术语1", "target": "term1"}, ...]
+                    logger.error(f"查找现有术语库时出错: {str(e)}")
+                    logger.info("将创建新术语库")
             
-            for item in glossary_data:
-                if isinstance(item, str):
-                    # 第一种格式
-                    source_terms.append(item)
-                    # 尝试从项目中提取英文术语（如果有）
-                    # 这里做一个简单的检查，如果是字典格式
-                    if isinstance(glossary_data, list) and glossary_data.index(item) < len(glossary_data) - 1:
-                        next_item = glossary_data[glossary_data.index(item) + 1]
-                        if isinstance(next_item, str):
-                            target_terms.append(next_item)
-                    else:
-                        target_terms.append(item)  # 默认使用相同术语
-                elif isinstance(item, dict):
-                    # 第二种格式
-                    if "source" in item and "target" in item:
-                        source_terms.append(item["source"])
-                        target_terms.append(item["target"])
-                    elif "acronym" in item and "expanded_form" in item:
-                        # 支持与现有glossary格式兼容
-                        source_terms.append(item["acronym"])
-                        target_terms.append(item["expanded_form"])
+            # 通过glossary_store读取术语库（支持JSON、CSV/TSV和key=value格式，编译结果会被缓存）
+            entries = load_glossary(glossary_path).as_dict()
             
-            if not source_terms or not target_terms:
+            if not entries:
                 raise ValueError("术语库文件不包含有效的术语对")
             
             # 如果未指定源语言，默认为中文
             if not source_lang:
                 source_lang = 'ZH'
             
-            print(f"创建术语库: {glossary_name}")
-            print(f"源语言: {source_lang}, 目标语言: {target_lang}")
-            print(f"术语数量: {len(source_terms)}")
+            logger.info(f"创建术语库: {glossary_name}")
+            logger.info(f"源语言: {source_lang}, 目标语言: {target_lang}")
+            logger.info(f"术语数量: {len(entries)}")
             
             # 规范化语言代码
             if target_lang == 'EN':
@@ -189,7 +242,7 @@ class DeepLTranslator:
                 name=glossary_name,
                 source_lang=source_lang,
                 target_lang=target_lang,
-                entries=dict(zip(source_terms, target_terms))
+                entries=entries
                 )
             
             # 添加延迟，避免API调用过于频繁
@@ -198,26 +251,26 @@ class DeepLTranslator:
             return glossary.glossary_id
             
         except Exception as e:
-            print(f"创建术语库时出错: {str(e)}")
+            logger.error(f"创建术语库时出错: {str(e)}")
             
             # 如果是配额超限错误，尝试查找现有术语库
             if "QuotaExceededException" in str(type(e)) or "Too many glossaries" in str(e):
-                print("术语库配额已超限，尝试使用现有术语库")
+                logger.warning("术语库配额已超限，尝试使用现有术语库")
                 try:
                     glossaries = self.translator.list_glossaries()
                     glossary_name = f"temp_glossary_{os.path.basename(glossary_path).split('.')[0]}"
                     
                     for glossary in glossaries:
                         if glossary.name == glossary_name:
-                            print(f"找到现有术语库: {glossary_name}")
+                            logger.info(f"找到现有术语库: {glossary_name}")
                             return glossary.glossary_id
                     
                     # 如果没有找到同名术语库，尝试使用第一个可用的术语库
                     if glossaries:
-                        print(f"未找到同名术语库，使用第一个可用术语库")
+                        logger.warning(f"未找到同名术语库，使用第一个可用术语库")
                         return glossaries[0].glossary_id
                 except Exception as inner_e:
-                    print(f"查找现有术语库时出错: {str(inner_e)}")
+                    logger.error(f"查找现有术语库时出错: {str(inner_e)}")
             
             raise
     
@@ -245,7 +298,7 @@ class DeepLTranslator:
             }
             
         except Exception as e:
-            print(f"获取支持的语言时出错: {str(e)}")
+            logger.error(f"获取支持的语言时出错: {str(e)}")
             return {"source_languages": [], "target_languages": []}
     
     def get_supported_formats(self) -> List[str]:
@@ -279,7 +332,7 @@ class DeepLTranslator:
                 print(f"   创建时间: {glossary.creation_time}")
             return glossaries
         except Exception as e:
-            print(f"列出术语库时出错: {str(e)}")
+            logger.error(f"列出术语库时出错: {str(e)}")
             return []
             
     def delete_all_glossaries(self) -> None:
@@ -288,13 +341,13 @@ class DeepLTranslator:
         """
         try:
             glossaries = self.translator.list_glossaries()
-            print(f"准备删除 {len(glossaries)} 个术语库")
+            logger.info(f"准备删除 {len(glossaries)} 个术语库")
             
             for glossary in glossaries:
                 self.translator.delete_glossary(glossary.glossary_id)
-                print(f"已删除术语库: {glossary.name}")
+                logger.info(f"已删除术语库: {glossary.name}")
                 time.sleep(0.5)  # 添加延迟避免API调用过于频繁
             
-            print("所有术语库已删除")
+            logger.info("所有术语库已删除")
         except Exception as e:
-            print(f"删除术语库时出错: {str(e)}")
\ No newline at end of file
+            logger.error(f"删除术语库时出错: {str(e)}")
\ No newline at end of file
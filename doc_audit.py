@@ -0,0 +1,320 @@
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Iterator, Optional
+
+from doc_tester import DocumentTester
+
+# 按文件名关键字归类文档类型（按顺序匹配，第一个命中的类型生效）
+DOC_TYPE_KEYWORDS = [
+    ("产品说明书", ["说明书", "User Manual", "User Guide"]),
+    ("安装手册", ["安装", "Installation"]),
+    ("测试标准", ["测试", "Test"]),
+    ("规格书", ["规格", "Datasheet", "Specification"]),
+    ("白皮书", ["白皮书", "White Paper"]),
+]
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pydoc", "cache", "doc_audit.json")
+
+CSV_FIELDS = ["file_path", "folder", "doc_type", "status", "total_found", "total_required", "missing_parts", "message"]
+
+
+def classify_document(file_path: str) -> str:
+    """
+    根据文件名推断文档类型。
+
+    Args:
+        file_path: 文档路径
+
+    Returns:
+        文档类型名称，无法识别时返回"其他"
+    """
+    name = os.path.basename(file_path).lower()
+    for doc_type, keywords in DOC_TYPE_KEYWORDS:
+        if any(keyword.lower() in name for keyword in keywords):
+            return doc_type
+    return "其他"
+
+
+def expand_paths(patterns: List[str]) -> Iterator[str]:
+    """
+    将目录、通配符和文件路径展开为去重后的.docx绝对路径。
+
+    Args:
+        patterns: 目录、glob模式或文件路径
+    """
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = glob.iglob(os.path.join(pattern, "**", "*.docx"), recursive=True)
+        else:
+            candidates = glob.iglob(pattern, recursive=True)
+        for path in candidates:
+            path = os.path.abspath(path)
+            # 跳过Word打开文档时产生的临时文件
+            if path.lower().endswith(".docx") and not os.path.basename(path).startswith("~$") and path not in seen:
+                seen.add(path)
+                yield path
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return _hash_stream(f)
+
+
+def _hash_stream(f) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _checker_signature() -> str:
+    """检查规则的签名，规则变化后缓存自动失效。"""
+    rules = json.dumps([DocumentTester.REQUIRED_PARTS, DocumentTester.TOC_VARIANTS], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(rules.encode("utf-8")).hexdigest()[:16]
+
+
+def _audit_file(file_path: str) -> Dict[str, Any]:
+    """在工作进程中检查单个文档，返回结果和文件哈希。哈希分块计算，随后同一文件对象回到开头交给检查，内存占用恒定。"""
+    try:
+        f = open(file_path, "rb")
+    except OSError:
+        # 打开失败时由 check_document_parts 生成错误结果
+        result = DocumentTester(verbose=False).check_document_parts(file_path)
+        result["sha256"] = None
+        return result
+    with f:
+        digest = _hash_stream(f)
+        f.seek(0)
+        result = DocumentTester(verbose=False).check_document_parts(file_path, f)
+    result["sha256"] = digest
+    return result
+
+
+class AuditCache:
+    """
+    以文件内容哈希为键的检查结果缓存。
+
+    先比较文件大小和修改时间，变化时才重新计算哈希，因此未变化的文件无需读取。
+    保存时清除已不存在的文件及不再被引用的结果。
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.signature = _checker_signature()
+        self.files = {}
+        self.results = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("signature") == self.signature:
+                    self.files = data.get("files", {})
+                    self.results = data.get("results", {})
+            except (OSError, ValueError) as e:
+                print(f"忽略无法读取的缓存文件 {path}: {e}", file=sys.stderr)
+
+    def lookup(self, file_path: str) -> Optional[Dict[str, Any]]:
+        known = self.files.get(file_path)
+        if not known:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            digest = known["sha256"]
+        elif known["size"] == stat.st_size:
+            # 仅修改时间变化：用内容哈希确认
+            digest = _hash_file(file_path)
+            known.update(mtime_ns=stat.st_mtime_ns, sha256=digest)
+        else:
+            return None
+        cached = self.results.get(digest)
+        if cached is None:
+            return None
+        return dict(cached, file_path=file_path, sha256=digest)
+
+    def store(self, result: Dict[str, Any]) -> None:
+        digest = result.get("sha256")
+        if not digest or result["status"] != "success":
+            return
+        stat = os.stat(result["file_path"])
+        self.files[result["file_path"]] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        self.results[digest] = {key: value for key, value in result.items() if key not in ("file_path", "sha256")}
+
+    def prune(self) -> None:
+        """删除已不存在的文件的记录，以及没有文件引用的检查结果。"""
+        self.files = {path: known for path, known in self.files.items() if os.path.exists(path)}
+        referenced = {known["sha256"] for known in self.files.values()}
+        self.results = {digest: result for digest, result in self.results.items() if digest in referenced}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        self.prune()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "files": self.files, "results": self.results}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def audit_documents(paths: List[str], workers: Optional[int] = None, cache: Optional[AuditCache] = None) -> Iterator[Dict[str, Any]]:
+    """
+    在进程池中并行检查多个文档，按完成顺序逐个产出结果。
+
+    Args:
+        paths: 文档绝对路径
+        workers: 工作进程数，默认为CPU核数
+        cache: 结果缓存（可选），命中的文件不再检查
+
+    Yields:
+        检查结果字典（DocumentTester.check_document_parts 的结果，附加 folder、doc_type、cached 字段）
+    """
+    def annotate(result, cached):
+        result["folder"] = os.path.dirname(result["file_path"])
+        result["doc_type"] = classify_document(result["file_path"])
+        result["cached"] = cached
+        return result
+
+    pending = []
+    for path in paths:
+        cached = cache.lookup(path) if cache else None
+        if cached is not None:
+            yield annotate(cached, True)
+        else:
+            pending.append(path)
+
+    if not pending:
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_audit_file, path): path for path in pending}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"status": "error", "message": f"检查过程中发生错误：{str(e)}", "missing_parts": [],
+                          "found_parts": [], "total_required": len(DocumentTester.REQUIRED_PARTS), "total_found": 0,
+                          "file_path": futures[future]}
+            if cache:
+                cache.store(result)
+            yield annotate(result, False)
+
+
+class AuditSummary:
+    """汇总批量检查结果：整体、按目录和按文档类型统计缺失最多的部件。"""
+
+    def __init__(self):
+        self.total = 0
+        self.errors = 0
+        self.complete = 0
+        self.cached = 0
+        self.missing = Counter()
+        self.by_folder = defaultdict(Counter)
+        self.by_type = defaultdict(Counter)
+        self.folder_counts = Counter()
+        self.type_counts = Counter()
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.total += 1
+        self.cached += result.get("cached", False)
+        if result["status"] != "success":
+            self.errors += 1
+            return
+        self.folder_counts[result["folder"]] += 1
+        self.type_counts[result["doc_type"]] += 1
+        if not result["missing_parts"]:
+            self.complete += 1
+        for part in result["missing_parts"]:
+            self.missing[part] += 1
+            self.by_folder[result["folder"]][part] += 1
+            self.by_type[result["doc_type"]][part] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "complete": self.complete,
+            "errors": self.errors,
+            "cached": self.cached,
+            "missing": dict(self.missing.most_common()),
+            "by_folder": {folder: {"documents": count, "missing": dict(self.by_folder[folder].most_common())}
+                          for folder, count in self.folder_counts.items()},
+            "by_type": {doc_type: {"documents": count, "missing": dict(self.by_type[doc_type].most_common())}
+                        for doc_type, count in self.type_counts.items()},
+        }
+
+    def generate_report(self) -> str:
+        report = []
+        report.append("=" * 80)
+        report.append("批量文档部件检查汇总".center(76))
+        report.append("=" * 80)
+        report.append(f"文档总数: {self.total}  完整: {self.complete}  出错: {self.errors}  缓存命中: {self.cached}")
+        report.append("-" * 80)
+        report.append("缺失最多的部件:")
+        for part, count in self.missing.most_common():
+            report.append(f"  {part.ljust(12)} {count}")
+        for title, groups, counts in (("按目录:", self.by_folder, self.folder_counts),
+                                      ("按文档类型:", self.by_type, self.type_counts)):
+            report.append("-" * 80)
+            report.append(title)
+            for key in sorted(counts, key=lambda key: -sum(groups[key].values())):
+                top = ", ".join(f"{part} {count}" for part, count in groups[key].most_common(3)) or "无缺失"
+                report.append(f"  {key} ({counts[key]}个文档): {top}")
+        report.append("=" * 80)
+        return "\n".join(report)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量检查文档部件完整性，并输出汇总报告。")
+    parser.add_argument("paths", nargs="+", help="文档路径、目录或glob模式（如 \"archive/**/*.docx\"）。")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson", help="逐文档结果的输出格式（默认: ndjson）。")
+    parser.add_argument("-o", "--output", type=str, help="逐文档结果输出文件（默认: 标准输出）。")
+    parser.add_argument("--summary", type=str, help="将汇总结果写入JSON文件。")
+    parser.add_argument("-j", "--workers", type=int, help="工作进程数（默认: CPU核数）。")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE_PATH, help=f"结果缓存文件（默认: {DEFAULT_CACHE_PATH}）。")
+    parser.add_argument("--no-cache", action="store_true", help="不使用结果缓存。")
+    args = parser.parse_args(argv)
+
+    paths = list(expand_paths(args.paths))
+    if not paths:
+        print("未找到任何.docx文档。", file=sys.stderr)
+        return 1
+
+    cache = None if args.no_cache else AuditCache(args.cache)
+    summary = AuditSummary()
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        writer = None
+        if args.format == "csv":
+            writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+        for result in audit_documents(paths, args.workers, cache):
+            summary.add(result)
+            if writer:
+                writer.writerow(dict(result, missing_parts=";".join(result["missing_parts"])))
+            else:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if cache:
+            cache.save()
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary.as_dict(), f, ensure_ascii=False, indent=2)
+    print(summary.generate_report(), file=sys.stderr)
+    return 0 if summary.errors == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
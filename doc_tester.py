@@ -1,6 +1,16 @@
 import os
-import docx
-from typing import Dict, List, Optional, Any
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Any, Iterator, IO
+
+# WordprocessingML命名空间下的段落与文本标签
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P = W_NS + "p"
+W_T = W_NS + "t"
+
+# 页眉页脚部件在docx压缩包中的名称
+HEADER_FOOTER_PART_RE = re.compile(r"^word/(header|footer)\d*\.xml$")
 
 
 class DocumentTester:
@@ -25,7 +35,10 @@ class DocumentTester:
         "正文": "[Body]"        # 隐藏文字标识
     }
     
-    def __init__(self):
+    # 目录标题的常见变体
+    TOC_VARIANTS = ["Table of Contents", "TABLE OF CONTENTS", "Contents", "CONTENTS"]
+    
+    def __init__(self, verbose: bool = True):
         """
         初始化文档测试器实例。
         
@@ -33,20 +46,30 @@ class DocumentTester:
         - results: 存储各部件的检查状态
         - missing_parts: 记录缺失的部件
         - found_parts: 记录找到的部件
+        - identifier_map: 预先计算的 标识符 -> 部件 映射（已包含目录变体）
+        
+        Args:
+            verbose: 是否打印检查进度
         """
         self.results = {}
         self.missing_parts = []
         self.found_parts = []
+        self.verbose = verbose
+        self.identifier_map = {identifier: part for part, identifier in self.REQUIRED_PARTS.items()}
+        for variant in self.TOC_VARIANTS:
+            self.identifier_map.setdefault(variant, "目录")
     
-    def check_document_parts(self, file_path: str) -> Dict[str, Any]:
+    def check_document_parts(self, file_path: str, source: Optional[IO[bytes]] = None) -> Dict[str, Any]:
         """
         检查文档的必要部件是否完整。
         
         该方法会验证文档是否包含所有必要的部件，如封面、声明、目录等。
         支持检查文档正文、页眉和页脚中的部件标识，包括隐藏文字类型的标识。
+        文档以流式方式解析（iterparse），内存占用恒定，且所有部件找到后立即停止扫描。
         
         Args:
             file_path: 文档的绝对路径
+            source: 已打开的可随机访问的文档二进制流（可选），提供时不再按 file_path 打开文件
             
         Returns:
             包含检查结果的字典，格式为 {
@@ -84,26 +107,11 @@ class DocumentTester:
             self.missing_parts = []
             self.found_parts = []
             
-            print(f"正在检查文档: {os.path.basename(file_path)}")
+            if self.verbose:
+                print(f"正在检查文档: {os.path.basename(file_path)}")
             
-            # 加载文档
-            doc = docx.Document(file_path)
-            
-            print("检查正文段落...")
-            # 检查所有段落
-            for para in doc.paragraphs:
-                self._check_paragraph(para)
-            
-            print("检查页眉和页脚...")
-            # 检查所有页眉和页脚（可能包含隐藏文字）
-            for section in doc.sections:
-                # 检查页眉
-                for header_para in section.header.paragraphs:
-                    self._check_paragraph(header_para, is_hidden=True)
-                
-                # 检查页脚
-                for footer_para in section.footer.paragraphs:
-                    self._check_paragraph(footer_para, is_hidden=True)
+            # 流式扫描正文、页眉和页脚
+            self._scan_package(source if source is not None else file_path)
             
             # 生成检查结果
             for part, is_found in self.results.items():
@@ -139,7 +147,7 @@ class DocumentTester:
                 "total_found": 0,
                 "file_path": file_path
             }
-        except docx.opc.exceptions.PackageNotFoundError:
+        except (zipfile.BadZipFile, KeyError):
             # 处理文档格式错误
             return {
                 "status": "error",
@@ -173,41 +181,68 @@ class DocumentTester:
                 "file_path": file_path
             }
     
-    def _check_paragraph(self, para: docx.text.paragraph.Paragraph, is_hidden: bool = False) -> None:
+    def _scan_package(self, source) -> None:
         """
-        检查单个段落是否包含某个文档部件标识。
+        按顺序流式扫描 document.xml 以及所有页眉页脚部件，所有部件找到后立即停止。
         
         Args:
-            para: 要检查的段落
-            is_hidden: 是否为隐藏文字部分
+            source: docx文件路径或文件对象
+        """
+        remaining = {part for part, is_found in self.results.items() if not is_found}
+        with zipfile.ZipFile(source) as package:
+            names = package.namelist()
+            part_names = ["word/document.xml"] + sorted(name for name in names if HEADER_FOOTER_PART_RE.match(name))
+            for part_name in part_names:
+                if self.verbose:
+                    print("检查正文段落..." if part_name == "word/document.xml" else f"检查页眉/页脚: {part_name}")
+                # document.xml 缺失时由 ZipFile.open 抛出 KeyError
+                with package.open(part_name) as stream:
+                    for text in self._iter_paragraph_texts(stream):
+                        self._check_text(text, remaining)
+                        if not remaining:
+                            return
+    
+    @staticmethod
+    def _iter_paragraph_texts(stream: IO[bytes]) -> Iterator[str]:
         """
-        text = para.text.strip()
+        以恒定内存逐段产出段落文本（已去除首尾空白）。
         
-        # 检查每个必要部件
-        for part_name, part_identifier in self.REQUIRED_PARTS.items():
-            # 如果已经找到该部件，跳过检查
-            if self.results[part_name]:
+        每个元素在结束事件处理完后即从父元素中移除，因此内存占用与文档大小无关。
+        嵌套段落（如文本框中的段落）单独产出，不计入外层段落的文本。
+        
+        Args:
+            stream: XML部件的字节流
+        """
+        element_stack = []
+        text_stack = []
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                element_stack.append(elem)
+                if elem.tag == W_P:
+                    text_stack.append([])
                 continue
             
-            # 检查是否匹配
-            if part_identifier.startswith("[") and part_identifier.endswith("]"):
-                # 隐藏文字类型 ([Cover], [Body])
-                # 对于隐藏文字，我们需要精确匹配
-                if text == part_identifier:
-                    # 隐藏文字可能在任何位置，包括页眉页脚
-                    self.results[part_name] = True
-            else:
-                # 大写英文标题类型 (STATEMENT, ABOUT THIS DOCUMENT 等)
-                # 对于大写英文标题，我们需要精确匹配
-                if text == part_identifier:
-                    self.results[part_name] = True
-                    
-        # 特殊检查：对于目录部分，还需要检查可能的变体
-        if not self.results["目录"]:
-            # 检查可能的目录标题变体
-            directory_variants = ["Table of Contents", "TABLE OF CONTENTS", "Contents", "CONTENTS"]
-            if text in directory_variants:
-                self.results["目录"] = True
+            element_stack.pop()
+            if elem.tag == W_T:
+                if text_stack:
+                    text_stack[-1].append(elem.text or "")
+            elif elem.tag == W_P:
+                yield "".join(text_stack.pop()).strip()
+            if element_stack:
+                element_stack[-1].remove(elem)
+    
+    def _check_text(self, text: str, remaining: set) -> None:
+        """
+        检查单个段落文本是否为某个文档部件标识（精确匹配，包括目录变体）。
+        
+        Args:
+            text: 去除首尾空白的段落文本
+            remaining: 尚未找到的部件集合，找到的部件会从中移除
+        """
+        part_name = self.identifier_map.get(text)
+        if part_name in remaining:
+            self.results[part_name] = True
+            remaining.discard(part_name)
     
     def generate_report(self, result: Dict[str, any]) -> str:
         """
@@ -261,7 +296,7 @@ class DocumentTester:
         return "\n".join(report)
 
 # 为了方便直接使用，提供一个函数接口
-def check_document_parts(file_path: str) -> Dict[str, Any]:
+def check_document_parts(file_path: str, source: Optional[IO[bytes]] = None) -> Dict[str, Any]:
     """
     检查文档的必要部件是否完整的便捷函数。
     
@@ -270,6 +305,7 @@ def check_document_parts(file_path: str) -> Dict[str, Any]:
     
     Args:
         file_path: 文档的绝对路径
+        source: 已打开的可随机访问的文档二进制流（可选）
         
     Returns:
         包含检查结果的字典，包括状态、消息、找到的部件和缺失的部件
@@ -279,7 +315,7 @@ def check_document_parts(file_path: str) -> Dict[str, Any]:
         FileNotFoundError: 当文档文件不存在时
     """
     tester = DocumentTester()
-    result = tester.check_document_parts(file_path)
+    result = tester.check_document_parts(file_path, source)
     report = tester.generate_report(result)
     print(report)
     return result
@@ -291,3 +327,4 @@ if __name__ == "__main__":
         check_document_parts(sys.argv[1])
     else:
         print("用法: python doc_tester.py <文档路径>")
+        print("批量检查: python doc_audit.py <目录或glob模式>... [--format ndjson|csv] [-o 结果文件] [--summary 汇总.json]")
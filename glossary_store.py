@@ -0,0 +1,286 @@
+import array
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pydoc", "cache", "glossaries")
+
+# magic, byte order, entry count, source mtime_ns, source size, source sha256
+HEADER = struct.Struct("<8sc7xQQQ32s")
+MAGIC = b"PYDGLS01"
+BYTE_ORDER = b"l" if sys.byteorder == "little" else b"b"
+
+
+class Glossary:
+    """
+    Read-only glossary compiled into a sorted, memory-mappable index.
+
+    Layout: a fixed header, then 3 * count + 1 offsets (uint64) into a UTF-8 blob
+    holding source, target and description of every entry, sorted by source.
+    Lookups are binary searches over the mapped offsets, so opening a cached
+    glossary does not parse or materialize any entry.
+    """
+
+    def __init__(self, buffer, path=None):
+        """
+        Args:
+            buffer: bytes or mmap holding a compiled glossary.
+            path (str, optional): The source file the glossary was compiled from.
+        """
+        magic, byte_order, count, _, _, _ = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or byte_order != BYTE_ORDER:
+            raise ValueError("Not a compiled PyDoc glossary")
+        self.path = path
+        self.count = count
+        self._buffer = buffer
+        view = memoryview(buffer)
+        offsets_end = HEADER.size + 8 * (3 * count + 1)
+        self._offsets = view[HEADER.size:offsets_end].cast("Q")
+        self._blob = view[offsets_end:]
+
+    # ========= Compilation =========
+
+    @staticmethod
+    def compile(entries, mtime_ns=0, size=0, digest=b"\0" * 32):
+        """
+        Compiles (source, target, description) tuples into the binary glossary format.
+
+        Entries are sorted by source; the first entry of a duplicated source wins.
+
+        Returns:
+            bytes: The compiled glossary.
+        """
+        unique = {}
+        for source, target, description in entries:
+            source = source.strip()
+            if source and source not in unique:
+                unique[source] = (source.encode("utf-8"), target.strip().encode("utf-8"),
+                                  (description or "").strip().encode("utf-8"))
+        records = sorted(unique.values(), key=lambda record: record[0])
+
+        offsets = array.array("Q", [0])
+        blob = bytearray()
+        for record in records:
+            for field in record:
+                blob += field
+                offsets.append(len(blob))
+        return HEADER.pack(MAGIC, BYTE_ORDER, len(records), mtime_ns, size, digest) + offsets.tobytes() + bytes(blob)
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Builds an in-memory glossary from term dictionaries (see parse_glossary_data).
+
+        Args:
+            entries (list): e.g. [{"acronym": "AP", "expanded_form": "Wireless Access Point", ...}]
+
+        Returns:
+            Glossary: The compiled glossary.
+        """
+        return cls(cls.compile(parse_glossary_data(entries)))
+
+    # ========= Lookup =========
+
+    def _field(self, index, field):
+        start = self._offsets[3 * index + field]
+        end = self._offsets[3 * index + field + 1]
+        return self._blob[start:end]
+
+    def _find(self, source):
+        key = source.strip().encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._field(mid, 0)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._field(lo, 0) == key:
+            return lo
+        return -1
+
+    def entry(self, index):
+        """Returns the (source, target, description) tuple at a sorted position."""
+        return tuple(bytes(self._field(index, field)).decode("utf-8") for field in range(3))
+
+    def get(self, source, default=None):
+        """
+        Looks up the target of a source term.
+
+        Args:
+            source (str): The source term.
+            default: Returned when the term is not in the glossary.
+
+        Returns:
+            str: The target term.
+        """
+        index = self._find(source)
+        if index < 0:
+            return default
+        return bytes(self._field(index, 1)).decode("utf-8")
+
+    def __contains__(self, source):
+        return self._find(source) >= 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.entry(index)
+
+    def as_dict(self):
+        """Returns the glossary as a {source: target} dictionary, e.g. for DeepL."""
+        return {source: target for source, target, _ in self}
+
+    def to_terms(self):
+        """Returns the glossary in the term format used by the Postprocessor."""
+        return [{"acronym": source, "expanded_form": target, "description": description}
+                for source, target, description in self]
+
+
+# ========= Parsing =========
+
+def parse_glossary_data(data):
+    """
+    Normalizes parsed JSON glossary data into (source, target, description) tuples.
+
+    Supported shapes:
+        [{"source": "价签", "target": "ESL"}, ...]
+        [{"acronym": "AP", "expanded_form": "Wireless Access Point", "description": "..."}, ...]
+        ["价签", "ESL", "基站", "AP", ...] (alternating source and target)
+        {"价签": "ESL", ...}
+
+    Yields:
+        tuple: (source, target, description)
+    """
+    if isinstance(data, dict):
+        for source, target in data.items():
+            yield str(source), str(target), ""
+        return
+    if not isinstance(data, list):
+        raise ValueError("Glossary JSON must be an array or an object")
+
+    strings = []
+    for item in data:
+        if isinstance(item, str):
+            strings.append(item)
+        elif isinstance(item, dict):
+            if "source" in item and "target" in item:
+                yield item["source"], item["target"], item.get("description", "")
+            elif "acronym" in item and "expanded_form" in item:
+                yield item["acronym"], item["expanded_form"], item.get("description", "")
+    for i in range(0, len(strings) - 1, 2):
+        yield strings[i], strings[i + 1], ""
+
+
+def parse_glossary_file(path):
+    """
+    Parses a glossary file in any of the supported formats.
+
+    - .json: see parse_glossary_data
+    - .csv / .tsv: source, target[, description] columns, with an optional header row
+    - anything else: "source=target" lines, as written by scripts/GlossaryGenerator.py
+
+    Yields:
+        tuple: (source, target, description)
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            yield from parse_glossary_data(json.load(f))
+    elif ext in (".csv", ".tsv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f, delimiter="\t" if ext == ".tsv" else ",")
+            for i, row in enumerate(reader):
+                if len(row) < 2:
+                    continue
+                if i == 0 and row[0].strip().lower() in ("source", "acronym") and row[1].strip().lower() in ("target", "expanded_form"):
+                    continue
+                yield row[0], row[1], row[2] if len(row) > 2 else ""
+    else:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+                source, target = line.split("=", 1)
+                yield source, target, ""
+
+
+# ========= Cache =========
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_glossary(source, cache_dir=None):
+    """
+    Loads a glossary, compiling it into the cache on first use.
+
+    The compiled index is reused while the source file's size and mtime are
+    unchanged; if only the mtime changed, the content hash decides.
+
+    Args:
+        source: A glossary file path, a Glossary, or a list of term dictionaries.
+        cache_dir (str, optional): Cache directory. Defaults to $PYDOC_GLOSSARY_CACHE or ~/.pydoc/cache/glossaries.
+
+    Returns:
+        Glossary: The loaded glossary.
+    """
+    if isinstance(source, Glossary):
+        return source
+    if isinstance(source, (list, dict)):
+        return Glossary.from_entries(source)
+
+    path = os.path.abspath(source)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Glossary file does not exist: {path}")
+    cache_dir = cache_dir or os.getenv("PYDOC_GLOSSARY_CACHE") or DEFAULT_CACHE_DIR
+    cache_path = os.path.join(cache_dir, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".glsidx")
+    stat = os.stat(path)
+
+    digest = None
+    if os.path.exists(cache_path):
+        try:
+            buffer = _map_file(cache_path)
+            magic, byte_order, _, mtime_ns, size, cached_digest = HEADER.unpack_from(buffer, 0)
+            if magic == MAGIC and byte_order == BYTE_ORDER and size == stat.st_size:
+                if mtime_ns == stat.st_mtime_ns:
+                    return Glossary(buffer, path)
+                digest = _hash_file(path)
+                if digest == cached_digest:
+                    # Same content, only touched: record the new mtime to skip hashing next time
+                    with open(cache_path, "r+b") as f:
+                        f.write(HEADER.pack(magic, byte_order, HEADER.unpack_from(buffer, 0)[2],
+                                            stat.st_mtime_ns, size, digest))
+                    return Glossary(buffer, path)
+            buffer.close()
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring unreadable glossary cache {cache_path}: {e}")
+
+    data = Glossary.compile(parse_glossary_file(path), stat.st_mtime_ns, stat.st_size, digest or _hash_file(path))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+        return Glossary(_map_file(cache_path), path)
+    except OSError as e:
+        # e.g. read-only cache directory, or the old index is still mapped on Windows
+        print(f"Could not write glossary cache {cache_path}, using it from memory: {e}")
+        return Glossary(data, path)
@@ -0,0 +1,248 @@
+import importlib
+import io
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import docx
+
+from pydoc_logging import get_logger
+
+logger = get_logger("pipeline")
+
+# Plugins can also be listed here (comma-separated module names) or installed with a "pydoc.stages" entry point
+PLUGINS_ENV = "PYDOC_PLUGINS"
+ENTRY_POINT_GROUP = "pydoc.stages"
+
+STAGE_REGISTRY = {}
+
+
+class Stage:
+    """
+    One step of the document pipeline.
+
+    A stage declares the artifacts it reads (inputs) and produces (outputs). "document" is
+    the document being processed: stages that list it in their outputs modify it and are run
+    one at a time, in pipeline order. All other stages only read the document and run
+    concurrently on a shared snapshot of it.
+
+    Subclass it, set name/inputs/outputs/order and implement run(); register the class with
+    register_stage() to make it available to pydoc.py through --stage. Report with self.print()
+    so the output of concurrent stages does not interleave.
+    """
+
+    name = None
+    inputs = ("document",)
+    outputs = ()
+    # Position in the pipeline: preprocessing is 10, translation 40-70, checks 80-95, postprocessing 100
+    order = 200
+    # Where self.print() writes, set by the pipeline while the stage runs; None is sys.stdout
+    output = None
+
+    @property
+    def mutates(self):
+        return "document" in self.outputs
+
+    def print(self, *args, **kwargs):
+        """Prints to the output of the stage, like print()."""
+        print(*args, file=self.output, **kwargs)
+
+    def run(self, context, inputs):
+        """
+        Runs the stage.
+
+        Args:
+            context (PipelineContext): Paths and options of the run.
+            inputs (dict): The declared input artifacts; "document" is a DocumentSnapshot.
+
+        Returns:
+            dict: The declared output artifacts. Stages that modify the document write it to
+                context.output_path and return {"document": context.output_path}.
+        """
+        raise NotImplementedError
+
+
+def register_stage(stage_class):
+    """Registers a Stage subclass under its name. Can be used as a class decorator."""
+    if not stage_class.name:
+        raise ValueError(f"Stage {stage_class.__name__} has no name")
+    STAGE_REGISTRY[stage_class.name] = stage_class
+    return stage_class
+
+
+def load_plugins(modules=()):
+    """
+    Imports stage plugins, which register their stages when imported.
+
+    Args:
+        modules (iterable): Module names, in addition to $PYDOC_PLUGINS and the "pydoc.stages" entry points.
+    """
+    names = list(modules) + [name.strip() for name in os.getenv(PLUGINS_ENV, "").split(",") if name.strip()]
+    for name in names:
+        importlib.import_module(name)
+    try:
+        from importlib.metadata import entry_points
+        found = entry_points()
+        found = found.select(group=ENTRY_POINT_GROUP) if hasattr(found, "select") else found.get(ENTRY_POINT_GROUP, [])
+    except ImportError:
+        found = []
+    for entry_point in found:
+        loaded = entry_point.load()
+        if isinstance(loaded, type) and issubclass(loaded, Stage):
+            register_stage(loaded)
+
+
+class DocumentSnapshot:
+    """
+    An immutable view of one version of the document, shared by the stages that read it.
+
+    The file is read once and parsed at most once, however many stages use it.
+    Stages must not modify the parsed document.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self._document = None
+        self._lock = threading.Lock()
+
+    @property
+    def data(self):
+        """The bytes of the file."""
+        with self._lock:
+            if self._data is None:
+                with open(self.path, "rb") as f:
+                    self._data = f.read()
+            return self._data
+
+    def stream(self):
+        """Returns a new file object over the bytes of the file."""
+        return io.BytesIO(self.data)
+
+    @property
+    def document(self):
+        """The parsed Word document (read-only)."""
+        data = self.data
+        with self._lock:
+            if self._document is None:
+                self._document = docx.Document(io.BytesIO(data))
+            return self._document
+
+
+class PipelineContext:
+    """Paths and options shared by all stages of one run."""
+
+    def __init__(self, input_path, output_path=None, **options):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.options = options
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    def resource(self, key, factory):
+        """Returns an object shared by the stages of the run, e.g. a compiled glossary, created on first use."""
+        with self._lock:
+            if key not in self._resources:
+                self._resources[key] = factory()
+            return self._resources[key]
+
+
+class Pipeline:
+    """
+    Runs stages as a DAG derived from their declared inputs and outputs.
+
+    Every stage waits for the stages that produced its inputs. A stage producing an artifact
+    also waits for the previous producer and for all readers of the previous version, so
+    document changes stay in pipeline order while the stages between two changes run at once.
+    """
+
+    def __init__(self, stages, max_workers=None):
+        self.stages = sorted(stages, key=lambda stage: stage.order)
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 2)
+        self.dependencies = self._build_dependencies()
+
+    def _build_dependencies(self):
+        dependencies = []
+        producer = {}
+        readers = {}
+        for index, stage in enumerate(self.stages):
+            needs = {producer[name] for name in stage.inputs if name in producer}
+            for name in stage.outputs:
+                if name in producer:
+                    needs.add(producer[name])
+                needs.update(readers.get(name, ()))
+            for name in stage.inputs:
+                readers.setdefault(name, []).append(index)
+            for name in stage.outputs:
+                producer[name] = index
+                readers[name] = []
+            needs.discard(index)
+            dependencies.append(needs)
+        return dependencies
+
+    def run(self, context):
+        """
+        Runs all stages.
+
+        Args:
+            context (PipelineContext): Paths and options of the run.
+
+        Returns:
+            dict: The artifacts produced by the stages.
+
+        Raises:
+            Exception: The first error raised by a stage; stages depending on it are not run.
+        """
+        artifacts = {"document": DocumentSnapshot(context.input_path)}
+        buffers = [None if stage.mutates else io.StringIO() for stage in self.stages]
+        done = set()
+        flushed = 0
+        running = {}
+        errors = []
+
+        def execute(index, inputs):
+            # Stages that may run next to others write to their own buffer, printed in pipeline order
+            stage = self.stages[index]
+            stage.output = buffers[index]
+            try:
+                return stage.run(context, inputs)
+            finally:
+                stage.output = None
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while True:
+                    if not errors:
+                        for index, stage in enumerate(self.stages):
+                            if index in done or index in running.values() or not self.dependencies[index] <= done:
+                                continue
+                            inputs = {name: artifacts[name] for name in stage.inputs if name in artifacts}
+                            logger.debug("Starting stage %s", stage.name)
+                            running[executor.submit(execute, index, inputs)] = index
+                    if not running:
+                        break
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        index = running.pop(future)
+                        try:
+                            produced = future.result() or {}
+                        except Exception as e:
+                            logger.error("Stage %s failed: %s", self.stages[index].name, e)
+                            errors.append(e)
+                            continue
+                        for name, value in produced.items():
+                            artifacts[name] = DocumentSnapshot(value) if name == "document" else value
+                        done.add(index)
+                    # Print buffered reports in pipeline order
+                    while flushed < len(self.stages) and flushed in done:
+                        if buffers[flushed] is not None:
+                            sys.stdout.write(buffers[flushed].getvalue())
+                        flushed += 1
+        finally:
+            for index in range(flushed, len(self.stages)):
+                if buffers[index] is not None and buffers[index].tell():
+                    sys.stdout.write(buffers[index].getvalue())
+        if errors:
+            raise errors[0]
+        return artifacts
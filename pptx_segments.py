@@ -0,0 +1,43 @@
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+
+def iter_all_shapes(shapes):
+    """
+    Yields every shape depth-first, including the shapes inside group shapes.
+
+    Args:
+        shapes: A python-pptx shape collection, e.g. slide.shapes.
+    """
+    for shape in shapes:
+        yield shape
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from iter_all_shapes(shape.shapes)
+
+
+def iter_text_frames(prs, notes=True):
+    """
+    Yields every text frame of a presentation: shapes (groups included), table cells and speaker notes.
+
+    Args:
+        prs (pptx.Presentation): The presentation to walk.
+        notes (bool): Whether to include the speaker notes.
+
+    Yields:
+        tuple: (location, text_frame), e.g. ("slide[3]/shape[2]/r[1]/c[0]", cell.text_frame).
+    """
+    for s_index, slide in enumerate(prs.slides):
+        for shape_index, shape in enumerate(iter_all_shapes(slide.shapes)):
+            prefix = f"slide[{s_index}]/shape[{shape_index}]"
+            if shape.has_text_frame:
+                yield prefix, shape.text_frame
+            if getattr(shape, "has_table", False) and shape.has_table:
+                for r_index, row in enumerate(shape.table.rows):
+                    for c_index, cell in enumerate(row.cells):
+                        # Only the origin of a merged range holds text
+                        if cell.is_spanned:
+                            continue
+                        yield f"{prefix}/r[{r_index}]/c[{c_index}]", cell.text_frame
+        if notes and slide.has_notes_slide:
+            notes_frame = slide.notes_slide.notes_text_frame
+            if notes_frame is not None:
+                yield f"slide[{s_index}]/notes", notes_frame
@@ -1,12 +1,13 @@
 import argparse
 import os
-from Preprocessor import Preprocessor
-from Translator import Translator
-from FileChecker import FileChecker
-from Postprocessor import Postprocessor
-from deepl_translator import DeepLTranslator
+from collections import Counter
 from dotenv import load_dotenv
-from doc_tester import check_document_parts as check_doc_parts
+from pipeline import STAGE_REGISTRY, Pipeline, PipelineContext, load_plugins
+from pydoc_logging import setup_logging
+import stages as _builtin_stages  # registers the built-in stages
+from stages import target_glossary, volcengine_translator
+from translation_planner import TranslationPlan
+from translation_router import configured_providers, parse_preferences
 
 # 加载环境变量
 load_dotenv()
@@ -18,85 +19,208 @@ glossary = [
 ]
 
 def process_document(input_file_path, output_file_path, preprocess, translate, check, postprocess, check_parts=False, deepl_translate=False, 
-                    deepl_source_lang=None, deepl_target_lang='EN-US', deepl_glossary=None, deepl_auth_key=None, deepl_reuse_glossary=True):
+                    deepl_source_lang=None, deepl_target_lang='EN-US', deepl_glossary=None, deepl_auth_key=None, deepl_reuse_glossary=True,
+                    deepl_formality=None, deepl_cache=True,
+                    glossary_path=None, convert_units=False, export_segments_path=None, import_segments_path=None, route=False, route_preferences=None,
+                    report_terms=False, term_qa=False, output_formats=None, request_timeout=None, job_timeout=None,
+                    hedge_percentile=None, targets=None, stages=()):
     input_file_path = os.path.abspath(os.path.normpath(input_file_path))
     
     # Only normalize output_file_path if it is provided
     if output_file_path:
         output_file_path = os.path.abspath(os.path.normpath(output_file_path))
 
-    if preprocess:
-        print("Starting document preprocessing...")
-        preprocessor = Preprocessor()
-        preprocessor.process_word_file(input_file_path, output_file_path)
-        print("Preprocessing completed.")
-
-    if translate:
-        print("Start document translation...")
-        translator = Translator()
-        translator.translate_word_file(input_file_path if not preprocess else output_file_path, output_file_path)
-        print("Translation completed.")
-    
-    if deepl_translate:
-        print("Starting DeepL document translation...")
-        # 使用DeepL翻译器
-        deepl_translator = DeepLTranslator(deepl_auth_key)
-        deepl_translator.translate_file(
-            input_path=input_file_path if not (preprocess or translate) else output_file_path,
-            output_path=output_file_path,
-            source_lang=deepl_source_lang,
-            target_lang=deepl_target_lang,
-            glossary_path=deepl_glossary,
-            reuse_glossary=deepl_reuse_glossary
-        )
-
-    if check:
-        print("Starting document check...")
-        checker = FileChecker(output_file_path if (preprocess or translate) and output_file_path else input_file_path)
-        checker.check_document_structure()
-        checker.check_font_consistency()
-        print("Document check completed.")
-    
-    if check_parts:
-        print("\nStarting document parts integrity check...")
-        try:
-            result = check_doc_parts(output_file_path if (preprocess or translate) and output_file_path else input_file_path)
-            print(f"Document parts check {'completed successfully' if result['status'] == 'success' else 'completed with warnings'}.")
-        except Exception as e:
-            print(f"Error during document parts check: {str(e)}")
-        print("\n")
-
-    if postprocess:
-        print("Starting document postprocessing...")
-        postprocessor = Postprocessor(glossary)
-        postprocessor.process_word_file(output_file_path if (preprocess or translate) and output_file_path else input_file_path, output_file_path)
-        print("Postprocessing completed.")
+    # Stages that change the document run one after another, the checks between them run concurrently
+    selected = [name for name, enabled in (
+        ("preprocess", preprocess),
+        ("export_segments", export_segments_path),
+        ("import_segments", import_segments_path),
+        ("translate", translate),
+        ("route", route),
+        ("deepl", deepl_translate),
+        ("convert_units", convert_units),
+        ("check", check),
+        ("check_parts", check_parts),
+        ("terms", report_terms or postprocess),
+        ("term_qa", term_qa),
+        ("postprocess", postprocess),
+    ) if enabled]
+    selected += [name for name in stages if name not in selected]
+    unknown = [name for name in selected if name not in STAGE_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}. Available: {', '.join(sorted(STAGE_REGISTRY))}")
+
+    if targets:
+        if route or import_segments_path or translate == deepl_translate:
+            raise ValueError("Several target languages are translated with either -t or --deepl")
+        # Stages before translation run once, the others once per target language
+        before = [name for name in selected if STAGE_REGISTRY[name].order < STAGE_REGISTRY["translate"].order]
+        after = [name for name in selected if name not in before and name not in ("translate", "deepl")]
+        selected = before + ["translate_targets"]
+
+    options = dict(
+        glossary_path=glossary_path,
+        glossary=glossary_path or glossary,
+        deepl_source_lang=deepl_source_lang,
+        deepl_target_lang=deepl_target_lang,
+        deepl_glossary=deepl_glossary,
+        deepl_auth_key=deepl_auth_key,
+        deepl_reuse_glossary=deepl_reuse_glossary,
+        deepl_formality=deepl_formality,
+        deepl_cache=deepl_cache,
+        export_segments_path=export_segments_path,
+        import_segments_path=import_segments_path,
+        report_terms=report_terms,
+        translate=translate,
+        deepl_translate=deepl_translate,
+        route_preferences=route_preferences,
+        output_formats=output_formats,
+        request_timeout=request_timeout,
+        job_timeout=job_timeout,
+        hedge_percentile=hedge_percentile,
+        targets=targets,
+    )
+    artifacts = Pipeline([STAGE_REGISTRY[name]() for name in selected]).run(PipelineContext(input_file_path, output_file_path, **options))
+    if targets and after:
+        for target, path in artifacts["target_documents"].items():
+            print(f"\n[{target}] {path}")
+            target_options = dict(
+                options,
+                glossary_path=target_glossary(glossary_path, target),
+                glossary=target_glossary(glossary_path, target) or glossary,
+                deepl_glossary=target_glossary(deepl_glossary, target),
+                deepl_target_lang=target,
+                source_path=artifacts["document"].path,
+            )
+            Pipeline([STAGE_REGISTRY[name]() for name in after]).run(PipelineContext(path, path, **target_options))
+    return artifacts
+
+def process_batch(input_file_paths, output_dir, preprocess, translate, check, postprocess, **options):
+    """
+    Processes several documents into output_dir, keeping their file names.
+
+    With translate, the documents are translated as one batch: the stages before translation run
+    on every document first, then every unique segment of the batch is translated once (see
+    TranslationPlan) and fanned out to all documents, and the later stages run on every
+    translated document. Other operations run document by document.
+    """
+    output_dir = os.path.abspath(os.path.normpath(output_dir))
+    duplicates = sorted(name for name, count in Counter(os.path.basename(path) for path in input_file_paths).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Several input documents are named {', '.join(duplicates)}, their outputs would overwrite each other in {output_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, os.path.join(output_dir, os.path.basename(path))) for path in input_file_paths]
+    if not translate:
+        for input_path, output_path in jobs:
+            print(f"\n[{os.path.basename(input_path)}]")
+            process_document(input_path, output_path, preprocess, False, check, postprocess, **options)
+        return
+
+    sources = []
+    for input_path, output_path in jobs:
+        if preprocess:
+            process_document(input_path, output_path, True, False, False, False)
+            sources.append(output_path)
+        else:
+            sources.append(os.path.abspath(input_path))
+
+    plan = TranslationPlan(sources)
+    print(plan.generate_report())
+    translator = volcengine_translator(options, options.get("glossary_path"))
+    failed = plan.translate(translator.translate_batch)
+    if failed:
+        print(f"Warning: {failed} unique segments could not be translated and are left unchanged.")
+    for source_path, (_, output_path) in zip(sources, jobs):
+        plan.apply_document(source_path, output_path)
+
+    later_stages = [check, postprocess] + [options.get(name) for name in ("check_parts", "convert_units", "report_terms", "term_qa", "stages")]
+    if not any(later_stages):
+        return
+    for _, output_path in jobs:
+        print(f"\n[{os.path.basename(output_path)}]")
+        process_document(output_path, output_path, False, False, check, postprocess, **options)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process and translate Word documents.')
-    parser.add_argument('-i', '--input', required=True, type=str, help='Input Word document path.')
-    parser.add_argument('-o', '--output', type=str, help='Output Word document path.')
-    parser.add_argument('-p', '--preprocess', action='store_true', help='Preprocess the document before translation.')
-    parser.add_argument('-t', '--translate', action='store_true', help='Translate the document.')
+    parser.add_argument('-i', '--input', required=True, type=str, nargs='+', help='Input Word document path (several documents are processed as one batch).')
+    parser.add_argument('-o', '--output', type=str, help='Output Word document path (a folder for several input documents).')
+    parser.add_argument('-p', '--preprocess', action='store_true', help='Preprocess the Word document before translation (not available for PowerPoint).')
+    parser.add_argument('-t', '--translate', action='store_true', help='Translate the document (Word, or PowerPoint .pptx).')
+    parser.add_argument('--outputs', type=str, help='Comma-separated outputs of one -t run: bilingual, target, table, tmx. '
+                                                    'The first Word output is written to -o, the others next to it (e.g. -o manual.docx --outputs bilingual,target,tmx).')
+    parser.add_argument('--targets', type=str, help='Comma-separated target languages translated at once with -t or --deepl, e.g. EN-US,EN-GB,DE,FR. '
+                                                    'Each is written next to -o (manual-DE.docx); a glossary path may contain {lang} for one glossary per language.')
+    parser.add_argument('--timeout', type=float, help='Read timeout of one translation request in seconds (default: 60).')
+    parser.add_argument('--deadline', type=float, help='Stop sending translation requests after this many seconds; the remaining segments stay untranslated.')
+    parser.add_argument('--hedge', type=float, help='Resend a batch that is slower than this percentile of recent requests (e.g. 0.95) and use the first answer.')
     parser.add_argument('-f', '--check', action='store_true', help='Check the document structure and font consistency.')
     parser.add_argument('--check-parts', action='store_true', help='Check the document parts integrity (cover, statement, TOC, etc.).')
     parser.add_argument('--postprocess', action='store_true', help='Postprocess the document to add additional content.')
+    parser.add_argument('--export-segments', type=str, help='Export the translatable segments to an XLIFF 2.0 (.xlf) or TMX (.tmx) file.')
+    parser.add_argument('--import-segments', type=str, help='Merge a translated XLIFF 2.0 or TMX file into the document (instead of -t).')
+    parser.add_argument('--convert-units', action='store_true', help='Convert metric values in tables (mm, ℃) to inches and °F.')
+    parser.add_argument('--glossary', type=str, help='Glossary file (JSON, CSV/TSV or key=value) used for translation and postprocessing.')
+    parser.add_argument('--terms', action='store_true', help='Report the glossary terms used in the document.')
+    parser.add_argument('--term-qa', action='store_true', help='Check that glossary terms were translated as in the glossary (after -t or --deepl, or on a bilingual document).')
+
+    # 自定义阶段（插件）参数
+    parser.add_argument('--plugin', action='append', default=[], help='Import a module that registers custom pipeline stages (repeatable, also PYDOC_PLUGINS).')
+    parser.add_argument('--stage', action='append', default=[], help='Add a registered stage to the pipeline by name (repeatable).')
     
     # DeepL翻译相关参数
     parser.add_argument('--deepl', action='store_true', help='Use DeepL API for translation.')
+    parser.add_argument('--route', action='store_true', help='Translate with VolcEngine and DeepL at the same time, routed by latency, quota and errors.')
+    parser.add_argument('--route-prefer', action='append', default=[], metavar='KEY=PROVIDER',
+                        help='With --route, reserve a segment kind (paragraph, cell) or glossary file for a provider (volcengine, deepl) while it can take them, e.g. cell=deepl. Repeatable.')
     parser.add_argument('--deepl-source', type=str, help='DeepL source language code (optional, auto-detected if not specified).')
     parser.add_argument('--deepl-target', type=str, default='EN-US', help='DeepL target language code (default: EN-US).')
     parser.add_argument('--deepl-glossary', type=str, help='Path to DeepL glossary JSON file.')
     parser.add_argument('--deepl-key', type=str, help='DeepL API authentication key (optional, can be set via DEEPL_AUTH_KEY environment variable).')
     parser.add_argument('--deepl-reuse-glossary', action='store_true', default=True, help='Reuse existing glossary with the same name, default: True')
     parser.add_argument('--deepl-no-reuse', action='store_false', dest='deepl_reuse_glossary', help='Create new glossary each time, do not reuse existing glossary')
+    parser.add_argument('--deepl-formality', type=str, help='DeepL formality: more, less, prefer_more or prefer_less (default: DeepL default).')
+    parser.add_argument('--deepl-no-cache', action='store_false', dest='deepl_cache', help='Always upload the document to DeepL, do not use or update the local translation cache')
     parser.add_argument('--deepl-list-glossaries', action='store_true', help='List all available DeepL glossaries')
     parser.add_argument('--deepl-cleanup', action='store_true', help='Delete all DeepL glossaries (use with caution)')
 
+    # 日志参数
+    parser.add_argument('--log-level', type=str, help='Log level: DEBUG, INFO, WARNING or ERROR (default: PYDOC_LOG_LEVEL or INFO).')
+    parser.add_argument('--log-format', choices=['text', 'json'], help='Log format, json writes one object per line (default: PYDOC_LOG_FORMAT or text).')
+    parser.add_argument('--log-file', type=str, help='Write the log to this file instead of stderr (default: PYDOC_LOG_FILE).')
+
     args = parser.parse_args()
+    setup_logging(args.log_level, args.log_format, args.log_file)
 
-    input_file_path = args.input
+    input_file_paths = args.input
     output_file_path = args.output
+    if args.preprocess and any(path.lower().endswith('.pptx') for path in input_file_paths):
+        parser.error("Preprocessing (-p) only applies to Word documents, run PowerPoint decks without -p.")
+    if len(input_file_paths) > 1:
+        unsupported = [flag for flag, used in (('--deepl', args.deepl), ('--route', args.route), ('--export-segments', args.export_segments),
+                                               ('--import-segments', args.import_segments), ('--outputs', args.outputs), ('--targets', args.targets))
+                       if used]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} can only be used with one input document.")
+        if args.translate and any(path.lower().endswith('.pptx') for path in input_file_paths):
+            parser.error("Several PowerPoint decks cannot be translated as one batch, translate them one by one.")
+        duplicates = sorted(name for name, count in Counter(os.path.basename(path) for path in input_file_paths).items() if count > 1)
+        if duplicates:
+            parser.error(f"Several input documents are named {', '.join(duplicates)}, their outputs would overwrite each other in the output folder.")
+    load_plugins(args.plugin)
+    unknown_stages = [name for name in args.stage if name not in STAGE_REGISTRY]
+    if unknown_stages:
+        parser.error(f"Unknown stage(s): {', '.join(unknown_stages)}. Available: {', '.join(sorted(STAGE_REGISTRY))}")
+    if args.route and not configured_providers(args.deepl_key):
+        parser.error("--route needs VolcEngine credentials (VOLC_ACCESS_KEY, VOLC_SECRET_KEY) or a DeepL key (DEEPL_AUTH_KEY, --deepl-key).")
+    if args.route_prefer and not args.route:
+        parser.error("--route-prefer can only be used with --route.")
+    try:
+        route_preferences = parse_preferences(args.route_prefer)
+    except ValueError as e:
+        parser.error(str(e))
+    # Operations that write the output document
+    modifies_document = any([args.preprocess, args.translate, args.postprocess, args.deepl, args.convert_units, args.import_segments, args.route]) \
+        or any(STAGE_REGISTRY[name]().mutates for name in args.stage)
 
     # Handle special DeepL operations
     if args.deepl_list_glossaries:
@@ -136,27 +260,52 @@ if __name__ == "__main__":
         sys.exit(0)
             
     # Check if at least one operation is specified
-    if not any([args.preprocess, args.translate, args.check, args.check_parts, args.postprocess, args.deepl]) and not args.deepl_list_glossaries and not args.deepl_cleanup:
+    if not any([args.preprocess, args.translate, args.check, args.check_parts, args.postprocess, args.deepl, args.convert_units, args.export_segments, args.import_segments, args.route, args.terms, args.term_qa, args.stage]) and not args.deepl_list_glossaries and not args.deepl_cleanup:
         print("Please specify at least one operation: preprocess (-p), translate (-t), check (-f), postprocess (--postprocess), or deepl (--deepl).")
     
     # Check if input file exists
-    elif not os.path.exists(input_file_path):
+    elif not all(os.path.exists(path) for path in input_file_paths):
         print("The input file does not exist, please check the path.")
     
-    # Check if -f or --check-parts flag is used without -o, allowing skipping output generation
-    elif (args.check or args.check_parts) and not args.preprocess and not args.translate and not args.postprocess and not output_file_path:
-        print("Running check without output file generation...")
-        process_document(input_file_path, None, args.preprocess, args.translate, args.check, args.postprocess, check_parts=args.check_parts)
-    
+    # Checks, term reports and segment export only read the document, no output file is generated
+    elif not modifies_document and not output_file_path:
+        if args.check or args.check_parts:
+            print("Running check without output file generation...")
+        for input_file_path in input_file_paths:
+            process_document(input_file_path, None, False, False, args.check, False, check_parts=args.check_parts,
+                             glossary_path=args.glossary, export_segments_path=args.export_segments,
+                             report_terms=args.terms, term_qa=args.term_qa, stages=args.stage)
+
     # Run with output file generation if -o is provided or other flags require it
     else:
         if not output_file_path:
             parser.error("Output file path (-o) is required if using preprocess (-p), translate (-t), or postprocess (--postprocess).")
-        process_document(input_file_path, output_file_path, args.preprocess, args.translate, args.check, args.postprocess,
+        options = dict(
+                        check_parts=args.check_parts,
+                        glossary_path=args.glossary,
+                        convert_units=args.convert_units,
+                        report_terms=args.terms,
+                        term_qa=args.term_qa,
+                        request_timeout=args.timeout,
+                        job_timeout=args.deadline,
+                        hedge_percentile=args.hedge,
+                        stages=args.stage)
+        if len(input_file_paths) > 1:
+            process_batch(input_file_paths, output_file_path, args.preprocess, args.translate, args.check, args.postprocess, **options)
+        else:
+            process_document(input_file_paths[0], output_file_path, args.preprocess, args.translate, args.check, args.postprocess,
                         deepl_translate=args.deepl,
                         deepl_source_lang=args.deepl_source,
                         deepl_target_lang=args.deepl_target,
                         deepl_glossary=args.deepl_glossary,
                         deepl_auth_key=args.deepl_key,
                         deepl_reuse_glossary=args.deepl_reuse_glossary,
-                        check_parts=args.check_parts)
+                        deepl_formality=args.deepl_formality,
+                        deepl_cache=args.deepl_cache,
+                        export_segments_path=args.export_segments,
+                        import_segments_path=args.import_segments,
+                        route=args.route,
+                        route_preferences=route_preferences,
+                        output_formats=[name.strip() for name in args.outputs.split(',') if name.strip()] if args.outputs else None,
+                        targets=[name.strip() for name in args.targets.split(',') if name.strip()] if args.targets else None,
+                        **options)
@@ -0,0 +1,156 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+
+ROOT_LOGGER = "pydoc"
+
+# Field names whose values are never written to a log
+SECRET_KEY_RE = re.compile(r"authori[sz]ation|secret|password|token|signature|auth_?key|access_?key|credential", re.IGNORECASE)
+# Secrets that may appear inside a message: signed headers, DeepL keys, key=value pairs
+SECRET_TEXT_RES = [
+    (re.compile(r"(Credential=)[^,\s]+"), r"\1***"),
+    (re.compile(r"(Signature=)[0-9a-fA-F]+"), r"\1***"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(:fx)?\b"), "***"),
+    (re.compile(r"((?:key|secret|token|password)\w*['\"]?\s*[:=]\s*['\"]?)[^'\",\s}]+", re.IGNORECASE), r"\1***"),
+]
+REDACTED = "***"
+
+_listener = None
+
+
+def get_logger(name):
+    """Returns the logger of a PyDoc module, e.g. get_logger("translator")."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def redact(value):
+    """Returns a copy of a log value with secrets replaced, recursing into dicts and lists."""
+    if isinstance(value, dict):
+        return {key: REDACTED if SECRET_KEY_RE.search(str(key)) else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        for pattern, replacement in SECRET_TEXT_RES:
+            value = pattern.sub(replacement, value)
+    return value
+
+
+class RedactionFilter(logging.Filter):
+    """Removes secrets from the message and the structured fields of every record."""
+
+    def filter(self, record):
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if hasattr(record, "fields"):
+            record.fields = redact(record.fields)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in every N per-request records (logged with extra={"sampled": True}).
+
+    Warnings and errors are always kept, so failed requests are never sampled away.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        return self.every > 0 and next(self._counter) % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per line: ts, level, logger, msg and the structured fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable format for the console, structured fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s", datefmt="%H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+def setup_logging(level=None, log_format=None, log_file=None, sample_rate=None, background=True):
+    """
+    Configures the PyDoc loggers. Safe to call more than once.
+
+    Args:
+        level (str, optional): Log level. Defaults to $PYDOC_LOG_LEVEL or INFO.
+        log_format (str, optional): "text" or "json". Defaults to $PYDOC_LOG_FORMAT or text.
+        log_file (str, optional): Log file instead of stderr. Defaults to $PYDOC_LOG_FILE.
+        sample_rate (float, optional): Share of per-request records kept. Defaults to $PYDOC_LOG_SAMPLE_RATE or 0.1.
+        background (bool): Write records from a background thread through a queue, so logging
+            never blocks translation workers.
+    """
+    global _listener
+    level = (level or os.getenv("PYDOC_LOG_LEVEL") or "INFO").upper()
+    log_format = log_format or os.getenv("PYDOC_LOG_FORMAT") or "text"
+    log_file = log_file or os.getenv("PYDOC_LOG_FILE")
+    sample_rate = float(sample_rate if sample_rate is not None else os.getenv("PYDOC_LOG_SAMPLE_RATE", "0.1"))
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    handler = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    for existing in list(logger.filters):
+        logger.removeFilter(existing)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    if background:
+        # Filters run in the calling thread, formatting and I/O in the listener thread
+        records = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(records)
+        queue_handler.addFilter(SamplingFilter(sample_rate))
+        queue_handler.addFilter(RedactionFilter())
+        logger.addHandler(queue_handler)
+        _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler.addFilter(SamplingFilter(sample_rate))
+        handler.addFilter(RedactionFilter())
+        logger.addHandler(handler)
+    return logger
+
+
+@atexit.register
+def _stop_listener():
+    # Flush the queued records before the interpreter exits
+    if _listener is not None:
+        _listener.stop()
@@ -1,25 +1,261 @@
+import argparse
+import codecs
+import csv
+import io
 import json
+import os
+import sys
+import tempfile
+import zlib
+from collections import Counter
 
-def generate_geolocation_file(cn_file, en_file, output_file):
-    # Load data from the JSON files
-    with open(cn_file, 'r', encoding='utf-8') as cn_f, open(en_file, 'r', encoding='utf-8') as en_f:
-        cn_data = json.load(cn_f)
-        en_data = json.load(en_f)
-
-    # Open the output file
-    with open(output_file, 'w', encoding='utf-8') as out_f:
-        # Write pairs in "Chinese Value = English Value" format
-        for cn_key, cn_value in cn_data.items():
-            en_value = en_data.get(cn_key)
-            if en_value:  # Only write if there is a matching English translation
-                out_f.write(f"{cn_value}={en_value}\n")
-
-    print(f"Geolocation data has been written to {output_file}")
-
-# Define file paths
-cn_file = 'D:\PyDoc\data\input\geolocation-cn-glossary.json'
-en_file = 'D:\PyDoc\data\input\geolocation-en-glossary.json'
-output_file = 'D:\PyDoc\data\output\geolocation_glossary.txt'
-
-# Generate the geolocation file
-generate_geolocation_file(cn_file, en_file, output_file)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from glossary_store import load_glossary
+
+try:
+    import ijson
+except ImportError:  # ijson is optional, the built-in incremental parser is used instead
+    ijson = None
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_BUCKETS = 64
+FORMATS = ("json", "tsv", "txt")
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_object_items(f, chunk_size=CHUNK_SIZE):
+    """
+    Incrementally parses a top-level JSON object and yields its (key, value) pairs.
+
+    Only one chunk plus the value being decoded is held in memory, so files of any size can be read.
+
+    Args:
+        f: A binary UTF-8 file object positioned at the start of the JSON document.
+        chunk_size (int): Number of characters read at a time.
+
+    Yields:
+        tuple: (key, value) in file order.
+    """
+    if ijson is not None:
+        yield from ijson.kvitems(f, "")
+        return
+
+    f = io.TextIOWrapper(f, encoding="utf-8")
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    def expect(chars):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] not in chars:
+            found = buffer[pos] if pos < len(buffer) else "end of file"
+            raise ValueError(f"Expected one of {chars!r}, found {found!r}")
+        pos += 1
+        return buffer[pos - 1]
+
+    def decode():
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(buffer) or eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    expect("{")
+    skip_whitespace()
+    if pos < len(buffer) and buffer[pos] == "}":
+        return
+    while True:
+        key = decode()
+        expect(":")
+        yield key, decode()
+        if expect(",}") == "}":
+            return
+
+
+def _bucket(text, buckets):
+    return zlib.crc32(text.encode("utf-8")) % buckets
+
+
+def _partition(items, directory, prefix, buckets):
+    """Spreads (key, value) records over bucket files by hash of the key, returns the number of records."""
+    files = [open(os.path.join(directory, f"{prefix}{i}.ndjson"), "w", encoding="utf-8") for i in range(buckets)]
+    count = 0
+    try:
+        for key, value in items:
+            files[_bucket(key, buckets)].write(json.dumps([key, value], ensure_ascii=False) + "\n")
+            count += 1
+    finally:
+        for f in files:
+            f.close()
+    return count
+
+
+def _read_bucket(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _iter_string_items(path, stats):
+    with open(path, "rb") as f:
+        # ijson reads bytes and does not accept a byte order mark
+        if f.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+            f.seek(0)
+        for key, value in iter_json_object_items(f):
+            if isinstance(value, str) and value.strip():
+                yield str(key), value.strip()
+            else:
+                stats["skipped"] += 1
+
+
+def build_glossary(cn_file, en_file, buckets=DEFAULT_BUCKETS, on_conflict="most_common", stats=None):
+    """
+    Joins a Chinese and an English {key: value} JSON file on their keys.
+
+    Both files are streamed into hash buckets on disk and joined one bucket at a time, then
+    the joined pairs are bucketed again by source term to resolve conflicts. Memory use is
+    bounded by the size of one bucket.
+
+    Args:
+        cn_file (str): JSON object mapping keys to Chinese terms.
+        en_file (str): JSON object mapping the same keys to English terms.
+        buckets (int): Number of on-disk buckets; raise it for very large inputs.
+        on_conflict (str): For a source term with several different targets, "most_common" keeps
+            the most frequent target (the first one seen on ties), "drop" removes the term.
+        stats (Counter, optional): Receives the counts of the run.
+
+    Yields:
+        tuple: (source, target) pairs, each source once.
+    """
+    stats = stats if stats is not None else Counter()
+    with tempfile.TemporaryDirectory(prefix="pydoc-glossary-") as directory:
+        stats["cn"] = _partition(_iter_string_items(cn_file, stats), directory, "cn", buckets)
+        stats["en"] = _partition(_iter_string_items(en_file, stats), directory, "en", buckets)
+
+        pair_files = [open(os.path.join(directory, f"pair{i}.ndjson"), "w", encoding="utf-8") for i in range(buckets)]
+        try:
+            for i in range(buckets):
+                # Duplicate keys: the last value wins, as with json.load
+                en_values = dict(_read_bucket(os.path.join(directory, f"en{i}.ndjson")))
+                cn_values = dict(_read_bucket(os.path.join(directory, f"cn{i}.ndjson")))
+                for key, source in cn_values.items():
+                    target = en_values.get(key)
+                    if target is None:
+                        stats["unmatched"] += 1
+                        continue
+                    pair_files[_bucket(source, buckets)].write(json.dumps([source, target], ensure_ascii=False) + "\n")
+        finally:
+            for f in pair_files:
+                f.close()
+
+        for i in range(buckets):
+            targets = {}
+            for source, target in _read_bucket(os.path.join(directory, f"pair{i}.ndjson")):
+                targets.setdefault(source, Counter())[target] += 1
+            for source, counts in targets.items():
+                if len(counts) > 1:
+                    stats["conflicts"] += 1
+                    if on_conflict == "drop":
+                        continue
+                stats["duplicates"] += sum(counts.values()) - 1
+                stats["written"] += 1
+                # Counter keeps insertion order, so ties go to the first target seen
+                yield source, counts.most_common(1)[0][0]
+
+
+def write_glossary(pairs, output_file, output_format):
+    """
+    Writes (source, target) pairs in a format PyDoc reads with --glossary / --deepl-glossary.
+
+    Args:
+        pairs: Iterable of (source, target).
+        output_file (str): The output path.
+        output_format (str): "json" (DeepL source/target array), "tsv" or "txt" (source=target lines).
+    """
+    with open(output_file, "w", encoding="utf-8", newline="") as out_f:
+        if output_format == "json":
+            # Written entry by entry so the whole glossary is never held in memory
+            out_f.write("[")
+            for i, (source, target) in enumerate(pairs):
+                out_f.write(("," if i else "") + "\n  " + json.dumps({"source": source, "target": target}, ensure_ascii=False))
+            out_f.write("\n]\n")
+        elif output_format == "tsv":
+            writer = csv.writer(out_f, delimiter="\t", lineterminator="\n")
+            writer.writerow(["source", "target"])
+            for source, target in pairs:
+                writer.writerow([source, target])
+        else:
+            for source, target in pairs:
+                if "=" in source or "\n" in source or "\n" in target:
+                    continue
+                out_f.write(f"{source}={target}\n")
+
+
+def generate_geolocation_file(cn_file, en_file, output_file, output_format=None, buckets=DEFAULT_BUCKETS, on_conflict="most_common"):
+    """
+    Builds a glossary file from a Chinese and an English JSON file that share their keys.
+
+    Args:
+        cn_file (str): JSON object mapping keys to Chinese terms.
+        en_file (str): JSON object mapping the same keys to English terms.
+        output_file (str): The glossary file to write.
+        output_format (str, optional): "json", "tsv" or "txt"; derived from the output extension if None.
+        buckets (int): Number of on-disk buckets used for the join.
+        on_conflict (str): "most_common" or "drop", see build_glossary.
+
+    Returns:
+        Counter: The counts of the run.
+    """
+    if output_format is None:
+        ext = os.path.splitext(output_file)[1].lower().lstrip(".")
+        output_format = ext if ext in FORMATS else "txt"
+    stats = Counter()
+    write_glossary(build_glossary(cn_file, en_file, buckets, on_conflict, stats), output_file, output_format)
+    print(f"Geolocation data has been written to {output_file}: {stats['written']} terms "
+          f"(CN entries {stats['cn']}, EN entries {stats['en']}, unmatched {stats['unmatched']}, "
+          f"duplicates {stats['duplicates']}, conflicting sources {stats['conflicts']}, skipped values {stats['skipped']})")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Join a Chinese and an English JSON file on their keys into a PyDoc glossary.")
+    parser.add_argument("cn_file", help="JSON object mapping keys to Chinese terms.")
+    parser.add_argument("en_file", help="JSON object mapping the same keys to English terms.")
+    parser.add_argument("-o", "--output", required=True, help="Output glossary file (.json, .tsv or .txt).")
+    parser.add_argument("--format", choices=FORMATS, help="Output format (default: from the output extension, else txt).")
+    parser.add_argument("--on-conflict", choices=["most_common", "drop"], default="most_common",
+                        help="Source terms with several targets: keep the most frequent target (default) or drop the term.")
+    parser.add_argument("--buckets", type=int, default=DEFAULT_BUCKETS, help=f"On-disk buckets for the join (default: {DEFAULT_BUCKETS}).")
+    parser.add_argument("--compile", action="store_true", help="Also compile the glossary into the PyDoc glossary cache.")
+    args = parser.parse_args()
+
+    generate_geolocation_file(args.cn_file, args.en_file, args.output, args.format, args.buckets, args.on_conflict)
+    if args.compile:
+        print(f"Compiled glossary with {len(load_glossary(args.output))} terms.")
@@ -1,22 +1,25 @@
-import docx
+import argparse
+import os
+import sys
 
-class FileChecker:
-    def __init__(self, doc_path):
-        self.doc = docx.Document(doc_path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from FileChecker import FileChecker
 
-    def print_paragraph_styles_and_xml(self):
-        """Prints the style name and XML content for each paragraph in the document."""
-        for i, para in enumerate(self.doc.paragraphs):
-            print(f"Paragraph {i+1} - Style: {para.style.name if para.style else 'No Style'}")
-            print(f"Text: {para.text.strip()}")
-            for run in para.runs:
-                # 打印每个运行项的 XML 内容
-                print(f"Run XML: {run._element.xml}")
-            print("-" * 50)
-
-# 测试代码
 if __name__ == "__main__":
-    # 替换为你的文件路径
-    file_path = "D:\\PyDoc\\data\\output\\01-02-35汉朔电子价签抗撞击测试标准V1.1.0.docx"
-    checker = FileChecker(file_path)
-    checker.print_paragraph_styles_and_xml()
+    parser = argparse.ArgumentParser(description="Dump paragraph/run styles and resolved fonts of a Word document as NDJSON.")
+    parser.add_argument("input", help="Word document path.")
+    parser.add_argument("--runs", action="store_true", help="Emit one record per run instead of per paragraph.")
+    parser.add_argument("--style", action="append", help="Only paragraphs with this style id or name (repeatable).")
+    parser.add_argument("--part", action="append", help="Only this part: body, header, footer, header1, ... (repeatable).")
+    parser.add_argument("--grep", type=str, help="Only paragraphs/runs whose text matches this regular expression.")
+    parser.add_argument("-o", "--output", type=str, help="Write to this file instead of stdout.")
+    args = parser.parse_args()
+
+    checker = FileChecker(args.input)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        checker.inspect(out, level="run" if args.runs else "paragraph",
+                        styles=args.style, parts=args.part, pattern=args.grep)
+    finally:
+        if out is not sys.stdout:
+            out.close()
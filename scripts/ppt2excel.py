@@ -1,120 +1,125 @@
+import argparse
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pptx import Presentation
 from openpyxl import Workbook
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pptx_segments import iter_all_shapes
+from unit_converter import UnitConverter
+
+
+def iter_slide_rows(slide):
+    """
+    按顺序产出一页PPT中的所有行：文本形状各占一行，表格每行对应一行。组合形状会被递归展开。
+    """
+    for shape in iter_all_shapes(slide.shapes):
+        # 处理文本内容
+        if hasattr(shape, "text"):
+            yield [shape.text]
+
+        # 处理表格内容
+        if shape.has_table:
+            for row_data in shape.table.rows:
+                yield [cell.text or None for cell in row_data.cells]
+
+
 def pptx_to_excel(pptx_path, output_xlsx):
     """
     将PPTX文件转换为Excel文件，每页PPT内容单独存储在一个Excel sheet中
-    
+
+    使用openpyxl的只写模式逐页写出，单位转换(unit_converter)在写出每页时批量完成，内存占用不随PPT页数增长。
+
     参数:
         pptx_path: 输入的PPTX文件路径
         output_xlsx: 输出的Excel文件路径
+    返回:
+        是否转换成功
     """
-    # 创建Excel工作簿
-    wb = Workbook()
-    # 删除默认创建的Sheet
-    wb.remove(wb.active)
-    
+    # 创建只写模式的Excel工作簿（不含默认Sheet）
+    wb = Workbook(write_only=True)
+
     # 加载PPTX文件
     prs = Presentation(pptx_path)
-    
-    # 遍历每页PPT
+
+    converter = UnitConverter()
+
+    # 遍历每页PPT，为每页创建一个新的Sheet
     for i, slide in enumerate(prs.slides):
-        # 为每页PPT创建一个新的Sheet
         sheet = wb.create_sheet(title=f"Slide_{i+1}")
-        
-        # 提取PPT页面中的内容
-        row = 1
-        for shape in slide.shapes:
-            # 处理文本内容
-            if hasattr(shape, "text"):
-                sheet.cell(row=row, column=1, value=shape.text)
-                row += 1
-            
-            # 处理表格内容
-            if shape.has_table:
-                table = shape.table
-                for r_idx, row_data in enumerate(table.rows):
-                    for c_idx, cell in enumerate(row_data.cells):
-                        if cell.text:
-                            sheet.cell(row=row+r_idx, column=c_idx+1, value=cell.text)
-                row += len(table.rows)
-    
-    # 处理单位转换
-    for sheet in wb:
+        rows = list(iter_slide_rows(slide))
         try:
-            # 通过表头关键字查找目标单元格
-            for row in sheet.iter_rows():
-                for cell in row:
-                    if cell.value and isinstance(cell.value, str):
-                        # 检查尺寸相关表头
-                        if 'Product Dimensions (mm*mm*mm)' in cell.value:
-                            cell.value = 'Product Dimensions (inch)'
-                            target_cell = sheet.cell(row=cell.row, column=cell.column+1)
-                            if target_cell.value:
-                                try:
-                                    # 转换长*宽*高尺寸
-                                    dimensions = [round(float(d)/25.4, 1) for d in str(target_cell.value).split('*')]
-                                    target_cell.value = '*'.join(map(str, dimensions))
-                                except (ValueError, AttributeError):
-                                    pass
-                        elif 'Active Display Area (mm*mm)' in cell.value:
-                            cell.value = 'Active Display Area (inch)'
-                            target_cell = sheet.cell(row=cell.row, column=cell.column+1)
-                            if target_cell.value:
-                                try:
-                                    # 转换长*宽尺寸
-                                    dimensions = [round(float(d)/25.4, 1) for d in str(target_cell.value).split('*')]
-                                    target_cell.value = '*'.join(map(str, dimensions))
-                                except (ValueError, AttributeError):
-                                    pass
-                        
-                        # 检查温度相关表头
-                        elif 'Working Temperature (˚C)' in cell.value or 'Working Temperature (℃)' in cell.value:
-                            cell.value = 'Working Temperature (℉)'
-                            target_cell = sheet.cell(row=cell.row, column=cell.column+1)
-                            if target_cell.value:
-                                try:
-                                    temp_str = str(target_cell.value).strip()
-                                    # 处理温度范围格式(支持'0~40'或'0-40'格式)
-                                    if '~' in temp_str or '-' in temp_str:
-                                        separator = '~' if '~' in temp_str else '-'
-                                        temps = [t.strip() for t in temp_str.split(separator)]
-                                        f_temps = [str(int(float(t)*9/5 + 32)) for t in temps]
-                                        target_cell.value = f' {separator} '.join(f_temps)
-                                    # 处理单个温度值
-                                    else:
-                                        f_temp = str(int(float(temp_str)*9/5 + 32))
-                                        target_cell.value = f_temp
-                                except (ValueError, AttributeError) as e:
-                                    print(f"温度转换错误: {e}")
+            converter.convert_rows(rows)
         except Exception as e:
-            print(f"处理工作表 {sheet.title} 时出错: {e}")
-            continue
-    
+            print(f"处理工作表 Slide_{i+1} 时出错: {e}")
+        for row in rows:
+            sheet.append(row)
+
     # 保存Excel文件
     try:
         wb.save(output_xlsx)
         print(f"成功将PPTX文件转换为Excel文件: {output_xlsx}")
+        return True
     except PermissionError:
         print(f"错误: 没有权限写入到目录 {os.path.dirname(output_xlsx)}，请检查目录权限或尝试其他位置")
-        sys.exit(1)
     except Exception as e:
         print(f"保存Excel文件时出错: {str(e)}")
-        sys.exit(1)
+    return False
+
+
+def convert_many(pptx_paths, output_dir, workers=None):
+    """
+    使用进程池并行转换多个PPTX文件，输出到output_dir下的同名.xlsx文件
+
+    参数:
+        pptx_paths: 输入的PPTX文件路径列表
+        output_dir: 输出目录
+        workers: 工作进程数，默认为CPU核数
+    返回:
+        失败的文件数
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for pptx_path in pptx_paths:
+            output_xlsx = os.path.join(output_dir, os.path.splitext(os.path.basename(pptx_path))[0] + ".xlsx")
+            futures[executor.submit(pptx_to_excel, pptx_path, output_xlsx)] = pptx_path
+        for future in as_completed(futures):
+            try:
+                ok = future.result()
+            except Exception as e:
+                print(f"转换 {futures[future]} 时出错: {e}")
+                ok = False
+            failures += not ok
+    return failures
+
 
 if __name__ == "__main__":
-    import sys
-    
-    if len(sys.argv) != 3:
-        print("使用方法: python ppt2excel.py <输入PPTX文件路径> <输出Excel文件路径>")
-        sys.exit(1)
-    
-    input_pptx = sys.argv[1]
-    output_xlsx = sys.argv[2]
-    
-    if not os.path.exists(input_pptx):
-        print(f"错误: 输入的PPTX文件不存在 - {input_pptx}")
+    parser = argparse.ArgumentParser(description="将PPTX文件转换为Excel文件并转换单位。")
+    parser.add_argument("paths", nargs="*", help="旧用法: <输入PPTX文件路径> <输出Excel文件路径>")
+    parser.add_argument("-i", "--input", nargs="+", help="输入的PPTX文件路径（可多个）")
+    parser.add_argument("-o", "--output", help="输出Excel文件路径（单个输入）或输出目录（多个输入）")
+    parser.add_argument("-j", "--workers", type=int, help="并行转换的进程数（默认: CPU核数）")
+    args = parser.parse_args()
+
+    inputs = args.input or []
+    output = args.output
+    if not inputs and len(args.paths) == 2 and not output:
+        inputs, output = [args.paths[0]], args.paths[1]
+    else:
+        inputs = inputs + args.paths
+
+    if not inputs or not output:
+        print("使用方法: python ppt2excel.py -i <输入PPTX文件路径>... -o <输出Excel文件路径或目录> [-j 进程数]")
         sys.exit(1)
-    
-    pptx_to_excel(input_pptx, output_xlsx)
\ No newline at end of file
+
+    for input_pptx in inputs:
+        if not os.path.exists(input_pptx):
+            print(f"错误: 输入的PPTX文件不存在 - {input_pptx}")
+            sys.exit(1)
+
+    if len(inputs) == 1 and output.lower().endswith(".xlsx"):
+        sys.exit(0 if pptx_to_excel(inputs[0], output) else 1)
+    sys.exit(1 if convert_many(inputs, output, args.workers) else 0)
@@ -0,0 +1,227 @@
+import argparse
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+import docx
+
+from Translator import Translator
+from segment_index import load_segment_index
+from pydoc_logging import get_logger, setup_logging
+
+XLIFF_NS = "urn:oasis:names:tc:xliff:document:2.0"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+# Characters XML 1.0 does not allow, e.g. the control characters Word uses for fields
+INVALID_XML_CHARS_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f￾￿]")
+
+logger = get_logger("segments")
+
+
+def _xml_text(text):
+    return escape(INVALID_XML_CHARS_RE.sub("", text))
+
+
+def _format_from_path(path):
+    return "tmx" if path.lower().endswith(".tmx") else "xliff"
+
+
+def write_tmx(output_path, segments, source_lang="zh-CN", target_lang="en"):
+    """
+    Streams segments to a TMX 1.4 file.
+
+    Args:
+        output_path (str): The .tmx file to write.
+        segments (iterable): (segment id, location, source text, target text or None) tuples.
+        source_lang (str): Source language code.
+        target_lang (str): Target language code of the translations.
+
+    Returns:
+        int: The number of written translation units.
+    """
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4">\n')
+        out.write(f'  <header creationtool="PyDoc" creationtoolversion="1.0" segtype="paragraph" o-tmf="docx" '
+                  f'adminlang="en" srclang={quoteattr(source_lang)} datatype="plaintext"/>\n  <body>\n')
+        for segment_id, location, text, translation in segments:
+            out.write(f'    <tu tuid="{segment_id}"><prop type="x-location">{_xml_text(location)}</prop>'
+                      f'<tuv xml:lang={quoteattr(source_lang)}><seg>{_xml_text(text)}</seg></tuv>')
+            if translation is not None:
+                out.write(f'<tuv xml:lang={quoteattr(target_lang)}><seg>{_xml_text(translation)}</seg></tuv>')
+            out.write('</tu>\n')
+            count += 1
+        out.write("  </body>\n</tmx>\n")
+    return count
+
+
+def export_segments(input_path, output_path, source_lang="zh-CN", target_lang="en", file_format=None):
+    """
+    Writes every segment translate_word_file would translate to an XLIFF 2.0 or TMX file.
+
+    Segments are written while the document is walked, so they are never collected in memory.
+    Every unit carries the stable segment id and its location in the document.
+
+    Args:
+        input_path (str): The Word document.
+        output_path (str): The .xlf/.xliff or .tmx file to write.
+        source_lang (str): Source language code.
+        target_lang (str): Target language code.
+        file_format (str, optional): "xliff" or "tmx", derived from the output extension if None.
+
+    Returns:
+        int: The number of exported segments.
+    """
+    file_format = file_format or _format_from_path(output_path)
+    segments = iter(load_segment_index(input_path))
+    if file_format == "tmx":
+        count = write_tmx(output_path, ((segment_id, location, text, None) for segment_id, location, text in segments),
+                          source_lang, target_lang)
+        logger.info("Exported %d segments to %s", count, output_path)
+        return count
+
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        out.write(f'<xliff xmlns="{XLIFF_NS}" version="2.0" srcLang={quoteattr(source_lang)} trgLang={quoteattr(target_lang)}>\n')
+        out.write(f'  <file id="f1" original={quoteattr(os.path.basename(input_path))}>\n')
+        for segment_id, location, text in segments:
+            out.write(f'    <unit id="{segment_id}" name={quoteattr(location)}><segment>'
+                      f'<source xml:space="preserve">{_xml_text(text)}</source></segment></unit>\n')
+            count += 1
+        out.write("  </file>\n</xliff>\n")
+    logger.info("Exported %d segments to %s", count, output_path)
+    return count
+
+
+def iter_translations(path, target_lang="en"):
+    """
+    Streams (segment id, target text) pairs from a translated XLIFF 2.0 or TMX file.
+
+    Every unit is removed from the tree as soon as it is read, so memory does not grow with
+    the file. Units without a target are yielded with None, so a lookup is settled at the
+    position of the unit.
+
+    Args:
+        path (str): The XLIFF or TMX file.
+        target_lang (str): For TMX, the language of the translation variant.
+
+    Yields:
+        tuple: (segment id, target text or None)
+    """
+    tmx = _format_from_path(path) == "tmx"
+    target_lang = target_lang.lower()
+    parents = []
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tmx and tag == "tu":
+            translation = None
+            for tuv in element.iter("tuv"):
+                lang = (tuv.get(XML_LANG) or tuv.get("lang") or "").lower()
+                seg = tuv.find("seg")
+                if seg is not None and (lang == target_lang or lang.startswith(target_lang + "-")):
+                    translation = "".join(seg.itertext())
+                    break
+            yield element.get("tuid"), translation
+        elif not tmx and tag == "unit":
+            targets = element.findall(f"{{{XLIFF_NS}}}segment/{{{XLIFF_NS}}}target")
+            # A unit split into several segments by the CAT tool is merged again
+            yield element.get("id"), "".join("".join(target.itertext()) for target in targets) if targets else None
+        else:
+            continue
+        if parents:
+            parents[-1].remove(element)
+
+
+class TranslationLookup:
+    """
+    Looks up translations by segment id while reading the file only once.
+
+    Files are usually returned in export order, so each lookup reads just the next unit;
+    units that come earlier than needed (e.g. from a tool that sorts the ids as text: s1, s10,
+    s2, ...) are kept until they are used. A segment missing from the file reads the rest of it.
+    """
+
+    def __init__(self, translations):
+        self._translations = iter(translations)
+        self._pending = {}
+        self.missing = 0
+
+    def get(self, segment_id, text):
+        """Returns the translation of the segment, or the source text if the file has none."""
+        if segment_id in self._pending:
+            target = self._pending.pop(segment_id)
+        else:
+            target = None
+            for found_id, found_target in self._translations:
+                if found_id == segment_id:
+                    target = found_target
+                    break
+                self._pending[found_id] = found_target
+        if target is None:
+            self.missing += 1
+            return text
+        return target
+
+
+def import_segments(input_path, translated_path, output_path, target_lang="en"):
+    """
+    Merges a translated XLIFF/TMX file back into the document.
+
+    The output is the same as Translator.translate_word_file with these translations: every
+    translation is added below its original paragraph or table cell line.
+
+    Args:
+        input_path (str): The Word document the segments were exported from.
+        translated_path (str): The translated XLIFF or TMX file.
+        output_path (str): Where to save the translated document.
+        target_lang (str): For TMX, the language of the translation variant.
+
+    Returns:
+        int: The number of segments without a translation (left in the source language).
+    """
+    doc = docx.Document(input_path)
+    lookup = TranslationLookup(iter_translations(translated_path, target_lang))
+    Translator(memory=False).apply_word_translations(doc, lookup.get)
+    doc.save(output_path)
+    if lookup.missing:
+        logger.warning("%d segments had no translation and were copied from the source.", lookup.missing)
+    logger.info("Import completed. Document saved at: %s", output_path)
+    return lookup.missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Word segments to XLIFF 2.0/TMX and merge the translations back.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the segments of a document.")
+    export_parser.add_argument("input", help="Word document.")
+    export_parser.add_argument("output", help="Output .xlf/.xliff or .tmx file.")
+    export_parser.add_argument("--source-lang", default="zh-CN", help="Source language (default: zh-CN).")
+    export_parser.add_argument("--target-lang", default="en", help="Target language (default: en).")
+
+    import_parser = subparsers.add_parser("import", help="Merge translated segments into a document.")
+    import_parser.add_argument("input", help="Word document the segments were exported from.")
+    import_parser.add_argument("translated", help="Translated .xlf/.xliff or .tmx file.")
+    import_parser.add_argument("output", help="Output Word document.")
+    import_parser.add_argument("--target-lang", default="en", help="Target language of a TMX file (default: en).")
+
+    parser.add_argument("--log-level", help="Log level (default: $PYDOC_LOG_LEVEL or INFO).")
+    parser.add_argument("--log-format", choices=("text", "json"), help="Log format (default: $PYDOC_LOG_FORMAT or text).")
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level, args.log_format)
+    if args.command == "export":
+        export_segments(args.input, args.output, args.source_lang, args.target_lang)
+    else:
+        import_segments(args.input, args.translated, args.output, args.target_lang)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
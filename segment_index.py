@@ -0,0 +1,253 @@
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+import docx
+
+from Translator import Translator
+from pydoc_logging import get_logger
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pydoc", "cache", "segments")
+
+# magic, byte order, schema version, segment count, source mtime_ns, source size, source sha256
+HEADER = struct.Struct("<8scB6xQQQ32s")
+MAGIC = b"PYDSEG01"
+BYTE_ORDER = b"l" if sys.byteorder == "little" else b"b"
+# Increase when the columns or the segmentation of Translator.iter_word_units change: older indexes are rebuilt
+SCHEMA_VERSION = 1
+
+logger = get_logger("segments")
+
+KINDS = ("paragraph", "cell")
+# Variable-length columns, stored as offsets into one UTF-8 blob each
+STRING_COLUMNS = ("text", "location", "style")
+
+
+def text_hash(text):
+    """64-bit hash of a segment text, e.g. to find the segments that changed between two versions."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _paragraph_style(paragraph):
+    p_style = paragraph._p.pPr.pStyle if paragraph._p.pPr is not None else None
+    return p_style.val if p_style is not None else ""
+
+
+def _cell_line_styles(cell, count):
+    """Style ids of the paragraphs the lines of a cell (see Translator.iter_word_units) come from."""
+    styles = [_paragraph_style(paragraph) for paragraph in cell.paragraphs
+              for _ in paragraph.text.split("\n")]
+    lines = cell.text.split("\n")
+    first = 0
+    while first < len(lines) and not lines[first].strip():
+        first += 1
+    styles = styles[first:first + count]
+    return styles + [styles[-1] if styles else ""] * (count - len(styles))
+
+
+class SegmentIndex:
+    """
+    Read-only, column-oriented index of the segments of one Word document.
+
+    Layout: a fixed header, then one array per column: kind (uint8), unit number (uint32) and
+    text hash (uint64) per segment, and for text, location and style id count + 1 offsets
+    (uint64) into a UTF-8 blob. Segment i has the id f"s{i + 1}", like Translator.iter_word_units.
+    Opening a cached index maps the file and does not parse the document or build any string.
+    """
+
+    def __init__(self, buffer, path=None):
+        """
+        Args:
+            buffer: bytes or mmap holding a compiled index.
+            path (str, optional): The document the index was built from.
+        """
+        magic, byte_order, version, count, _, _, digest = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or byte_order != BYTE_ORDER or version != SCHEMA_VERSION:
+            raise ValueError("Not a PyDoc segment index")
+        self.path = path
+        self.count = count
+        self.digest = digest
+        self._buffer = buffer
+        view = memoryview(buffer)
+        position = HEADER.size
+        self.kinds = view[position:position + count]
+        position += count
+        position += -position % 8
+        self.units = view[position:position + 4 * count].cast("I")
+        position += 4 * count
+        position += -position % 8
+        self.hashes = view[position:position + 8 * count].cast("Q")
+        position += 8 * count
+        self._offsets = {}
+        for column in STRING_COLUMNS:
+            self._offsets[column] = view[position:position + 8 * (count + 1)].cast("Q")
+            position += 8 * (count + 1)
+        self._blobs = {}
+        for column in STRING_COLUMNS:
+            size = self._offsets[column][count]
+            self._blobs[column] = view[position:position + size]
+            position += size
+
+    # ========= Compilation =========
+
+    @staticmethod
+    def compile(doc, mtime_ns=0, size=0, digest=b"\0" * 32):
+        """
+        Extracts the segments of a document into the binary index format.
+
+        Args:
+            doc (docx.Document): The document.
+
+        Returns:
+            bytes: The compiled index.
+        """
+        kinds = array.array("B")
+        units = array.array("I")
+        hashes = array.array("Q")
+        columns = {column: (array.array("Q", [0]), bytearray()) for column in STRING_COLUMNS}
+
+        def add(column, value):
+            offsets, blob = columns[column]
+            blob += value.encode("utf-8")
+            offsets.append(len(blob))
+
+        for unit, (kind, obj, segments) in enumerate(Translator.iter_word_units(doc)):
+            styles = [_paragraph_style(obj)] if kind == "paragraph" else _cell_line_styles(obj, len(segments))
+            for (_, location, text), style in zip(segments, styles):
+                kinds.append(KINDS.index(kind))
+                units.append(unit)
+                hashes.append(text_hash(text))
+                add("text", text)
+                add("location", location)
+                add("style", style)
+
+        count = len(kinds)
+        data = bytearray(HEADER.pack(MAGIC, BYTE_ORDER, SCHEMA_VERSION, count, mtime_ns, size, digest))
+        for column in (kinds, units, hashes):
+            data += b"\0" * (-len(data) % 8)
+            data += column.tobytes()
+        for column in STRING_COLUMNS:
+            data += columns[column][0].tobytes()
+        for column in STRING_COLUMNS:
+            data += columns[column][1]
+        return bytes(data)
+
+    # ========= Lookup =========
+
+    def _string(self, column, index):
+        offsets = self._offsets[column]
+        return bytes(self._blobs[column][offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+    def __len__(self):
+        return self.count
+
+    def segment_id(self, index):
+        return f"s{index + 1}"
+
+    def kind(self, index):
+        return KINDS[self.kinds[index]]
+
+    def text(self, index):
+        return self._string("text", index)
+
+    def location(self, index):
+        return self._string("location", index)
+
+    def style(self, index):
+        """The style id of the paragraph the segment comes from ("" for the default style)."""
+        return self._string("style", index)
+
+    def texts(self):
+        """Returns the text of every segment, in document order."""
+        return [self.text(index) for index in range(self.count)]
+
+    def __iter__(self):
+        """Yields (segment id, location, text) in document order."""
+        for index in range(self.count):
+            yield self.segment_id(index), self.location(index), self.text(index)
+
+    def iter_word_units(self):
+        """
+        Yields the translation units like Translator.iter_word_units, without the python-docx object.
+
+        Yields:
+            tuple: (kind, None, [(segment id, location, text)])
+        """
+        segments = []
+        for index in range(self.count):
+            if segments and self.units[index] != self.units[index - 1]:
+                yield self.kind(index - 1), None, segments
+                segments = []
+            segments.append((self.segment_id(index), self.location(index), self.text(index)))
+        if segments:
+            yield self.kind(self.count - 1), None, segments
+
+
+# ========= Cache =========
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_segment_index(path, cache_dir=None):
+    """
+    Loads the segment index of a Word document, building it on first use.
+
+    The index is reused while the document's size and mtime are unchanged; if only the mtime
+    changed, the content hash decides. Any other change rebuilds it.
+
+    Args:
+        path (str): The Word document.
+        cache_dir (str, optional): Index directory. Defaults to $PYDOC_SEGMENT_INDEX_DIR or ~/.pydoc/cache/segments.
+
+    Returns:
+        SegmentIndex: The loaded index.
+    """
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Document does not exist: {path}")
+    cache_dir = cache_dir or os.getenv("PYDOC_SEGMENT_INDEX_DIR") or DEFAULT_CACHE_DIR
+    cache_path = os.path.join(cache_dir, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".segidx")
+    stat = os.stat(path)
+
+    digest = None
+    if os.path.exists(cache_path):
+        try:
+            buffer = _map_file(cache_path)
+            magic, byte_order, version, count, mtime_ns, size, cached_digest = HEADER.unpack_from(buffer, 0)
+            if magic == MAGIC and byte_order == BYTE_ORDER and version == SCHEMA_VERSION and size == stat.st_size:
+                if mtime_ns == stat.st_mtime_ns:
+                    return SegmentIndex(buffer, path)
+                digest = _hash_file(path)
+                if digest == cached_digest:
+                    # Same content, only touched: record the new mtime to skip hashing next time
+                    with open(cache_path, "r+b") as f:
+                        f.write(HEADER.pack(magic, byte_order, version, count, stat.st_mtime_ns, size, digest))
+                    return SegmentIndex(buffer, path)
+            buffer.close()
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Ignoring unreadable segment index %s: %s", cache_path, e)
+
+    data = SegmentIndex.compile(docx.Document(path), stat.st_mtime_ns, stat.st_size, digest or _hash_file(path))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+        return SegmentIndex(_map_file(cache_path), path)
+    except OSError as e:
+        logger.warning("Could not write segment index %s, using it from memory: %s", cache_path, e)
+        return SegmentIndex(data, path)
@@ -0,0 +1,65 @@
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+
+
+def iter_block_segments(element, parent, prefix):
+    """
+    Yields the text of every paragraph under a body, header, footer or cell, in document order.
+
+    Tables are walked recursively, so paragraphs in (nested) table cells are included.
+
+    Args:
+        element: The block element (w:body, w:hdr, w:ftr or w:tc).
+        parent: The python-docx object owning the element, used as paragraph parent.
+        prefix (str): Location prefix, e.g. "body" or "section[0]/header".
+
+    Yields:
+        tuple: (location, text) for every non-empty paragraph.
+    """
+    p_index = 0
+    t_index = 0
+    for child in element.iterchildren():
+        if child.tag == qn("w:p"):
+            text = Paragraph(child, parent).text
+            if text:
+                yield f"{prefix}/p[{p_index}]", text
+            p_index += 1
+        elif child.tag == qn("w:tbl"):
+            table = Table(child, parent)
+            seen_cells = {}
+            for r_index, row in enumerate(table.rows):
+                for c_index, cell in enumerate(row.cells):
+                    # Merged cells are returned once per grid column, only visit them once.
+                    # The dict keeps the elements alive, so their ids cannot be reused.
+                    if id(cell._tc) in seen_cells:
+                        continue
+                    seen_cells[id(cell._tc)] = cell._tc
+                    yield from iter_block_segments(cell._tc, cell, f"{prefix}/tbl[{t_index}]/r[{r_index}]/c[{c_index}]")
+            t_index += 1
+
+
+def iter_text_segments(doc):
+    """
+    Yields every text segment of a document: body paragraphs, table cells, headers and footers.
+
+    Headers and footers linked to a previous section are only visited once.
+
+    Args:
+        doc (docx.Document): The document to walk.
+
+    Yields:
+        tuple: (location, text) for every non-empty paragraph.
+    """
+    yield from iter_block_segments(doc.element.body, doc, "body")
+
+    seen_parts = set()
+    for s_index, section in enumerate(doc.sections):
+        for kind in ("header", "footer"):
+            block = getattr(section, kind)
+            if block.is_linked_to_previous:
+                continue
+            if block.part.partname in seen_parts:
+                continue
+            seen_parts.add(block.part.partname)
+            yield from iter_block_segments(block._element, block, f"section[{s_index}]/{kind}")
@@ -0,0 +1,106 @@
+import re
+
+# Sentence-final punctuation; "." is handled separately because of numbers, list markers and abbreviations
+TERMINATORS = set("。！？；!?;…")
+BRACKETS = {"“": "”", "‘": "’", "「": "」", "『": "』", "（": "）", "(": ")", "【": "】", "《": "》", "[": "]"}
+CLOSERS = set(BRACKETS.values()) | {'"', "'"}
+
+# Tokens ending with "." that do not end a sentence: list markers ("1.", "2.3.", "a.") and abbreviations
+NON_FINAL_DOT_RE = re.compile(r"(?<![A-Za-z0-9.])(?:\d+(?:\.\d+)*|[A-Za-z]|e\.g|i\.e|etc|vs|No|Fig|Tab|Ref|approx|Eq|in)\.$", re.IGNORECASE)
+
+
+def split_sentences(text):
+    """
+    Splits a paragraph into sentences, Chinese punctuation first.
+
+    Sentences end at 。！？；!?; and … (runs like "？！" or "……" stay together) and at a "."
+    followed by whitespace. Nothing is split inside quotes or parentheses; closing quotes and
+    brackets after the punctuation stay with the sentence. Numbers ("3.5"), list markers
+    ("1.", "2.3.") and common abbreviations do not end a sentence. Line breaks always do.
+
+    Args:
+        text (str): The paragraph.
+
+    Returns:
+        tuple: (sentences, separators) where separators[i] is the whitespace between
+            sentences[i] and sentences[i + 1], so interleaving both gives the stripped paragraph back.
+    """
+    sentences, separators = [], []
+    stack = []
+    start = 0
+    i = 0
+    length = len(text)
+
+    def close(end):
+        nonlocal start
+        sentence = text[start:end].strip()
+        next_start = end
+        while next_start < length and text[next_start].isspace():
+            next_start += 1
+        if sentence:
+            sentences.append(sentence)
+            separators.append(text[end:next_start])
+        elif separators:
+            # Blank lines between sentences
+            separators[-1] += text[start:next_start]
+        start = next_start
+
+    while i < length:
+        ch = text[i]
+        if ch in BRACKETS:
+            stack.append(BRACKETS[ch])
+        elif stack and ch == stack[-1]:
+            stack.pop()
+        elif ch == '"' and text.find('"', i + 1) != -1:
+            # Straight double quotes open and close with the same character
+            stack.append(ch)
+        elif ch == "\n" and not stack:
+            close(i)
+            i = start
+            continue
+
+        end = None
+        if not stack and ch in CLOSERS and i > start and text[i - 1] in TERMINATORS:
+            # A quotation ending with its own punctuation: 他说：“请检查。”
+            end = i + 1
+        elif not stack and ch in TERMINATORS:
+            end = i + 1
+        elif not stack and ch == "." and (i + 1 == length or text[i + 1].isspace()) \
+                and not NON_FINAL_DOT_RE.search(text[start:i + 1]):
+            end = i + 1
+        if end is not None:
+            # Keep runs of punctuation and closing quotes/brackets with the sentence
+            while end < length and (text[end] in TERMINATORS or text[end] == "." or text[end] in CLOSERS):
+                end += 1
+            close(end)
+            i = max(end, start)
+            continue
+        i += 1
+
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+        separators.append("")
+    if separators:
+        separators[-1] = ""
+    return sentences, separators[:-1]
+
+
+def join_sentences(sentences, separators, target_lang="en"):
+    """
+    Reassembles translated sentences into a paragraph.
+
+    Line breaks of the source are kept. Other boundaries become a space for languages that
+    separate sentences with spaces, and nothing for Chinese and Japanese.
+
+    Args:
+        sentences (list): The translated sentences.
+        separators (list): The separators returned by split_sentences.
+        target_lang (str): Target language code.
+    """
+    space = "" if target_lang.lower().split("-")[0] in ("zh", "ja") else " "
+    parts = [sentences[0]] if sentences else []
+    for separator, sentence in zip(separators, sentences[1:]):
+        parts.append(separator if "\n" in separator else space)
+        parts.append(sentence)
+    return "".join(parts)
@@ -0,0 +1,336 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from Preprocessor import Preprocessor
+from Translator import Translator
+from FileChecker import FileChecker
+from Postprocessor import Postprocessor
+from deepl_translator import DeepLTranslator
+from doc_tester import DocumentTester
+from unit_converter import convert_docx_file
+from segment_exchange import export_segments, import_segments
+from translation_planner import TranslationPlan
+from translation_router import TranslationRouter, build_providers
+from translation_outputs import output_paths, target_paths, write_outputs
+from segment_index import load_segment_index
+from term_qa import TerminologyChecker, TermQASummary, iter_bilingual_pairs, iter_document_pairs
+from pipeline import Stage, register_stage
+
+
+def volcengine_translator(options, glossary_path, target_lang="en"):
+    """Builds the VolcEngine Translator of a run with its request timeout, deadline and hedging options."""
+    timeout = (Translator.REQUEST_TIMEOUT[0], options["request_timeout"]) if options.get("request_timeout") else Translator.REQUEST_TIMEOUT
+    return Translator(glossary_path, timeout=timeout, job_timeout=options.get("job_timeout"),
+                      hedge_percentile=options.get("hedge_percentile"), target_lang=target_lang)
+
+
+def target_glossary(path, target):
+    """
+    Resolves the glossary of one target language. A path containing {lang}, e.g. glossary-{lang}.json,
+    names one glossary per target; targets without such a file are translated without a glossary.
+    """
+    if not path or "{lang}" not in path:
+        return path
+    path = path.replace("{lang}", target)
+    return path if os.path.exists(path) else None
+
+
+@register_stage
+class PreprocessStage(Stage):
+    name = "preprocess"
+    outputs = ("document",)
+    order = 10
+
+    def run(self, context, inputs):
+        self.print("Starting document preprocessing...")
+        Preprocessor().process_word_file(inputs["document"].path, context.output_path)
+        self.print("Preprocessing completed.")
+        return {"document": context.output_path}
+
+
+@register_stage
+class ExportSegmentsStage(Stage):
+    name = "export_segments"
+    outputs = ("segments_file",)
+    order = 20
+
+    def run(self, context, inputs):
+        self.print("Exporting segments for offline translation...")
+        path = context.options["export_segments_path"]
+        export_segments(inputs["document"].path, path)
+        return {"segments_file": path}
+
+
+@register_stage
+class ImportSegmentsStage(Stage):
+    name = "import_segments"
+    outputs = ("document",)
+    order = 30
+
+    def run(self, context, inputs):
+        self.print("Importing translated segments...")
+        import_segments(inputs["document"].path, context.options["import_segments_path"], context.output_path)
+        return {"document": context.output_path}
+
+
+@register_stage
+class TranslateStage(Stage):
+    name = "translate"
+    outputs = ("document",)
+    order = 40
+
+    def run(self, context, inputs):
+        self.print("Start document translation...")
+        options = context.options
+        translator = volcengine_translator(options, options.get("glossary_path"))
+        source_path = inputs["document"].path
+        formats = options.get("output_formats")
+        if source_path.lower().endswith(".pptx"):
+            translator.translate_pptx_file(source_path, context.output_path)
+        elif formats:
+            written = translator.translate_word_outputs(source_path, output_paths(context.output_path, formats))
+            self.print("Translation completed.")
+            for name, path in written.items():
+                self.print(f"  {name}: {path}")
+            # Only a Word output written to -o replaces the document of the later stages
+            return {"document": context.output_path} if context.output_path in written.values() else {}
+        else:
+            translator.translate_word_file(source_path, context.output_path)
+        self.print("Translation completed.")
+        return {"document": context.output_path}
+
+
+@register_stage
+class TranslateTargetsStage(Stage):
+    """
+    Translates the document to several target languages at once, with VolcEngine or DeepL.
+
+    The document is read and its segments extracted once; every target is translated concurrently
+    with its own glossary and translation memory partition and written next to the output path,
+    e.g. manual-DE.docx. The document of the pipeline is left unchanged.
+    """
+    name = "translate_targets"
+    outputs = ("target_documents",)
+    order = 45
+
+    def run(self, context, inputs):
+        options = context.options
+        targets = options["targets"]
+        snapshot = inputs["document"]
+        source_path = snapshot.path
+        paths = target_paths(context.output_path, targets)
+        use_deepl = options.get("deepl_translate")
+        glossary_path = options.get("deepl_glossary") if use_deepl else options.get("glossary_path")
+        glossaries = {target: target_glossary(glossary_path, target) for target in targets}
+        self.print(f"Starting translation to {', '.join(targets)}{' with DeepL' if use_deepl else ''}...")
+        for target in targets:
+            if glossary_path and not glossaries[target]:
+                self.print(f"No glossary {glossary_path.replace('{lang}', target)}, {target} is translated without one.")
+
+        if use_deepl:
+            deepl_translator = DeepLTranslator(options.get("deepl_auth_key"))
+
+            def translate(target):
+                deepl_translator.translate_file(
+                    input_path=source_path,
+                    output_path=paths[target],
+                    source_lang=options.get("deepl_source_lang"),
+                    target_lang=target,
+                    glossary_path=glossaries[target],
+                    reuse_glossary=options.get("deepl_reuse_glossary", True),
+                    formality=options.get("deepl_formality"),
+                    use_cache=options.get("deepl_cache", True)
+                )
+                return {"document": paths[target]}
+        elif source_path.lower().endswith(".pptx"):
+            def translate(target):
+                volcengine_translator(options, glossaries[target], target).translate_pptx_file(source_path, paths[target])
+                return {"document": paths[target]}
+        else:
+            # Shared by all targets: the segments are extracted and the file is read only once
+            segments = [(segment_id, text) for _, _, unit_segments in Translator.iter_word_units(snapshot.document)
+                        for segment_id, _, text in unit_segments]
+            data = snapshot.data
+            formats = options.get("output_formats") or ["bilingual"]
+
+            def translate(target):
+                translator = volcengine_translator(options, glossaries[target], target)
+                translator.document = source_path
+                translations = translator.translate_segments(segments)
+                return write_outputs(source_path, translations, output_paths(paths[target], formats),
+                                     target_lang=target, data=data)
+
+        documents = {}
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            futures = {target: executor.submit(translate, target) for target in targets}
+            for target, future in futures.items():
+                try:
+                    written = future.result()
+                except Exception as e:
+                    self.print(f"Translation to {target} failed: {str(e)}")
+                    continue
+                for name, path in written.items():
+                    self.print(f"  {target} {name}: {path}")
+                # Later stages run on the Word document written to the target's output path
+                if paths[target] in written.values():
+                    documents[target] = paths[target]
+        if not documents and futures:
+            raise RuntimeError(f"Translation to {', '.join(targets)} failed.")
+        self.print("Translation completed.")
+        return {"target_documents": documents}
+
+
+@register_stage
+class RouteStage(Stage):
+    name = "route"
+    outputs = ("document",)
+    order = 50
+
+    def run(self, context, inputs):
+        self.print("Starting routed translation (VolcEngine and DeepL)...")
+        options = context.options
+        source_path = inputs["document"].path
+        plan = TranslationPlan([source_path])
+        target_lang = options.get("deepl_target_lang", "EN-US")
+        router = TranslationRouter(build_providers(options.get("glossary_path"), options.get("deepl_auth_key"),
+                                                   options.get("deepl_source_lang"), target_lang),
+                                   preferences=options.get("route_preferences"), target_lang=Translator.api_language(target_lang))
+        failed = plan.translate(lambda texts, kind: router.translate(texts, kind=kind, glossary=options.get("glossary_path")),
+                                by_kind=True)
+        if failed:
+            self.print(f"Warning: {failed} segments could not be translated and are left unchanged.")
+        plan.apply_document(source_path, context.output_path)
+        return {"document": context.output_path}
+
+
+@register_stage
+class DeepLStage(Stage):
+    name = "deepl"
+    outputs = ("document",)
+    order = 60
+
+    def run(self, context, inputs):
+        self.print("Starting DeepL document translation...")
+        options = context.options
+        # 使用DeepL翻译器
+        deepl_translator = DeepLTranslator(options.get("deepl_auth_key"))
+        deepl_translator.translate_file(
+            input_path=inputs["document"].path,
+            output_path=context.output_path,
+            source_lang=options.get("deepl_source_lang"),
+            target_lang=options.get("deepl_target_lang", "EN-US"),
+            glossary_path=options.get("deepl_glossary"),
+            reuse_glossary=options.get("deepl_reuse_glossary", True),
+            formality=options.get("deepl_formality"),
+            use_cache=options.get("deepl_cache", True)
+        )
+        return {"document": context.output_path}
+
+
+@register_stage
+class ConvertUnitsStage(Stage):
+    name = "convert_units"
+    outputs = ("document",)
+    order = 70
+
+    def run(self, context, inputs):
+        self.print("Starting unit conversion...")
+        convert_docx_file(inputs["document"].path, context.output_path)
+        return {"document": context.output_path}
+
+
+@register_stage
+class CheckStage(Stage):
+    name = "check"
+    order = 80
+
+    def run(self, context, inputs):
+        self.print("Starting document check...")
+        checker = FileChecker(inputs["document"].document, output=self.output)
+        checker.check_document_structure()
+        checker.check_font_consistency()
+        self.print("Document check completed.")
+        return {}
+
+
+@register_stage
+class CheckPartsStage(Stage):
+    name = "check_parts"
+    outputs = ("parts_result",)
+    order = 90
+
+    def run(self, context, inputs):
+        self.print("\nStarting document parts integrity check...")
+        snapshot = inputs["document"]
+        result = None
+        try:
+            tester = DocumentTester(verbose=False)
+            result = tester.check_document_parts(snapshot.path, snapshot.stream())
+            self.print(tester.generate_report(result))
+            self.print(f"Document parts check {'completed successfully' if result['status'] == 'success' else 'completed with warnings'}.")
+        except Exception as e:
+            self.print(f"Error during document parts check: {str(e)}")
+        self.print("\n")
+        return {"parts_result": result}
+
+
+@register_stage
+class TermsStage(Stage):
+    name = "terms"
+    outputs = ("terms",)
+    order = 95
+
+    def run(self, context, inputs):
+        postprocessor = context.resource("postprocessor", lambda: Postprocessor(context.options["glossary"]))
+        terms = postprocessor.detect_terms(inputs["document"].document)
+        if context.options.get("report_terms"):
+            self.print(f"Glossary terms found: {len(terms)}")
+            for term in terms:
+                self.print(f"- {term['acronym']} ({term['count']}x, first at {term['first_location']})")
+        return {"terms": terms}
+
+
+@register_stage
+class TermQAStage(Stage):
+    name = "term_qa"
+    outputs = ("term_issues",)
+    order = 96
+
+    def run(self, context, inputs):
+        self.print("Starting terminology check...")
+        glossary_path = context.options.get("glossary_path") or context.options.get("deepl_glossary")
+        if not glossary_path:
+            self.print("Terminology check skipped: no glossary given (--glossary or --deepl-glossary).")
+            return {"term_issues": None}
+        checker = TerminologyChecker(glossary_path)
+        doc = inputs["document"].document
+        if context.options.get("deepl_translate") and not context.options.get("translate"):
+            # DeepL writes a target-only document, compare it with the source
+            source_path = context.options.get("source_path") or context.input_path
+            pairs = iter_document_pairs(load_segment_index(source_path).iter_word_units(), Translator.iter_word_units(doc))
+        else:
+            pairs = iter_bilingual_pairs(Translator.iter_word_units(doc))
+        result = checker.check_pairs(pairs)
+        result.update(status="success")
+        for issue in result["issues"]:
+            self.print(f"{issue['type']}: {issue['source_term']} -> {issue['expected']} at {issue['location']}"
+                  + (f" (found: {issue['found']})" if issue["found"] else ""))
+        summary = TermQASummary()
+        summary.add(result)
+        self.print(summary.generate_report())
+        return {"term_issues": result["issues"]}
+
+
+@register_stage
+class PostprocessStage(Stage):
+    name = "postprocess"
+    inputs = ("document", "terms")
+    outputs = ("document",)
+    order = 100
+
+    def run(self, context, inputs):
+        self.print("Starting document postprocessing...")
+        postprocessor = context.resource("postprocessor", lambda: Postprocessor(context.options["glossary"]))
+        postprocessor.process_word_file(inputs["document"].path, context.output_path, inputs.get("terms"))
+        self.print("Postprocessing completed.")
+        return {"document": context.output_path}
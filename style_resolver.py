@@ -0,0 +1,237 @@
+import hashlib
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+
+FONT_SLOTS = ("ascii", "eastAsia", "hAnsi")
+HEADING_NAME_RE = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+# Resolvers are shared by all documents with identical styles.xml and theme
+_RESOLVER_CACHE = OrderedDict()
+_RESOLVER_CACHE_SIZE = 32
+# Checks of one pipeline run concurrently and share the cache
+_RESOLVER_CACHE_LOCK = threading.Lock()
+
+
+def read_fonts(rpr):
+    """
+    Reads the fonts set by a w:rPr element, theme references included.
+
+    Args:
+        rpr: A w:rPr element or None.
+
+    Returns:
+        dict: {slot: font or "theme:<name>"} for the slots the element sets.
+    """
+    fonts = {}
+    if rpr is None:
+        return fonts
+    rfonts = rpr.find(W_NS + "rFonts")
+    if rfonts is None:
+        return fonts
+    for slot in FONT_SLOTS:
+        # A theme font takes precedence over the explicit font name of the same slot
+        theme = rfonts.get(W_NS + slot + "Theme")
+        value = rfonts.get(W_NS + slot)
+        if theme:
+            fonts[slot] = "theme:" + theme
+        elif value:
+            fonts[slot] = value
+    return fonts
+
+
+def font_slot(text):
+    """Returns the rFonts slot Word uses to render the text: eastAsia for CJK text, ascii otherwise."""
+    return "eastAsia" if CJK_RE.search(text) else "ascii"
+
+
+class StyleResolver:
+    """
+    Resolves effective fonts and outline levels through the style inheritance chain.
+
+    Order of precedence, lowest first: document defaults, paragraph style and its
+    basedOn chain, character style and its basedOn chain, direct run formatting.
+    Every style id is resolved at most once.
+    """
+
+    def __init__(self, styles_root, theme_root=None):
+        """
+        Args:
+            styles_root (ElementTree.Element): The parsed word/styles.xml.
+            theme_root (ElementTree.Element, optional): The parsed word/theme/theme1.xml.
+        """
+        self.styles = {}
+        self.default_paragraph_style = None
+        for style in styles_root.iter(W_NS + "style"):
+            style_id = style.get(W_NS + "styleId")
+            if not style_id:
+                continue
+            name = style.find(W_NS + "name")
+            based_on = style.find(W_NS + "basedOn")
+            ppr = style.find(W_NS + "pPr")
+            outline = ppr.find(W_NS + "outlineLvl") if ppr is not None else None
+            self.styles[style_id] = {
+                "type": style.get(W_NS + "type"),
+                "name": name.get(W_NS + "val") if name is not None else style_id,
+                "based_on": based_on.get(W_NS + "val") if based_on is not None else None,
+                "custom": style.get(W_NS + "customStyle") in ("1", "true"),
+                "linked": style.find(W_NS + "link") is not None,
+                "fonts": read_fonts(style.find(W_NS + "rPr")),
+                "outline_level": int(outline.get(W_NS + "val")) if outline is not None else None,
+            }
+            if style.get(W_NS + "type") == "paragraph" and style.get(W_NS + "default") in ("1", "true"):
+                self.default_paragraph_style = style_id
+
+        self.default_fonts = read_fonts(styles_root.find(f"{W_NS}docDefaults/{W_NS}rPrDefault/{W_NS}rPr"))
+        self.theme_fonts = self._read_theme_fonts(theme_root)
+        self._font_cache = {}
+        self._outline_cache = {}
+        self._combination_cache = {}
+
+    @staticmethod
+    def _read_theme_fonts(theme_root):
+        fonts = {}
+        if theme_root is None:
+            return fonts
+        for kind in ("major", "minor"):
+            font = theme_root.find(f".//{A_NS}{kind}Font")
+            if font is None:
+                continue
+            for script in ("latin", "ea"):
+                element = font.find(A_NS + script)
+                if element is not None and element.get("typeface"):
+                    fonts[(kind, script)] = element.get("typeface")
+            # Most themes leave <a:ea> empty and list the East Asian font per script instead
+            if (kind, "ea") not in fonts:
+                for element in font.findall(A_NS + "font"):
+                    if element.get("script") == "Hans" and element.get("typeface"):
+                        fonts[(kind, "ea")] = element.get("typeface")
+        return fonts
+
+    def _resolve_theme(self, value):
+        if not value or not value.startswith("theme:"):
+            return value
+        theme = value[len("theme:"):]
+        kind = "major" if theme.startswith("major") else "minor"
+        script = "ea" if theme.endswith("EastAsia") else "latin"
+        # Unknown when the theme part is missing or does not name the font
+        return self.theme_fonts.get((kind, script))
+
+    def is_defined(self, style_id):
+        return style_id in self.styles
+
+    def style_name(self, style_id):
+        style = self.styles.get(style_id)
+        return style["name"] if style else style_id
+
+    def style_fonts(self, style_id):
+        """
+        Returns the fonts a style sets, including everything inherited through basedOn.
+
+        Args:
+            style_id (str): The style id.
+
+        Returns:
+            dict: {slot: font}, theme references unresolved.
+        """
+        if style_id in self._font_cache:
+            return self._font_cache[style_id]
+        # Guard against basedOn cycles in malformed documents
+        self._font_cache[style_id] = {}
+        style = self.styles.get(style_id)
+        fonts = {}
+        if style is not None:
+            if style["based_on"]:
+                fonts.update(self.style_fonts(style["based_on"]))
+            fonts.update(style["fonts"])
+        self._font_cache[style_id] = fonts
+        return fonts
+
+    def outline_level(self, style_id):
+        """
+        Returns the 0-based outline level of a paragraph style, or None for body text.
+
+        Args:
+            style_id (str): The paragraph style id.
+        """
+        if style_id in self._outline_cache:
+            return self._outline_cache[style_id]
+        self._outline_cache[style_id] = None
+        style = self.styles.get(style_id)
+        level = None
+        if style is not None:
+            if style["outline_level"] is not None:
+                level = style["outline_level"]
+            else:
+                match = HEADING_NAME_RE.match(style["name"])
+                if match:
+                    level = int(match.group(1)) - 1
+                elif style["based_on"]:
+                    level = self.outline_level(style["based_on"])
+        # Level 9 is "body text" in WordprocessingML
+        if level is not None and level >= 9:
+            level = None
+        self._outline_cache[style_id] = level
+        return level
+
+    def effective_fonts(self, paragraph_style=None, run_style=None, run_fonts=None):
+        """
+        Computes the effective fonts of a run.
+
+        Args:
+            paragraph_style (str, optional): The paragraph style id (default paragraph style if None).
+            run_style (str, optional): The character style id.
+            run_fonts (dict, optional): Direct run fonts, as returned by read_fonts().
+
+        Returns:
+            dict: {slot: font name} with theme fonts resolved (None if the theme does not name the font).
+                Do not modify, it may be shared.
+        """
+        key = (paragraph_style or self.default_paragraph_style, run_style)
+        base = self._combination_cache.get(key)
+        if base is None:
+            fonts = dict(self.default_fonts)
+            fonts.update(self.style_fonts(key[0]))
+            if run_style:
+                fonts.update(self.style_fonts(run_style))
+            base = {slot: self._resolve_theme(value) for slot, value in fonts.items()}
+            self._combination_cache[key] = base
+        if not run_fonts:
+            return base
+        fonts = dict(base)
+        fonts.update((slot, self._resolve_theme(value)) for slot, value in run_fonts.items())
+        return fonts
+
+
+def get_resolver(styles_xml, theme_xml=None):
+    """
+    Returns a StyleResolver, shared between documents with the same styles.xml and theme.
+
+    Args:
+        styles_xml (bytes): The content of word/styles.xml.
+        theme_xml (bytes, optional): The content of word/theme/theme1.xml.
+
+    Returns:
+        StyleResolver: The cached or newly built resolver.
+    """
+    digest = hashlib.sha256(styles_xml)
+    digest.update(theme_xml or b"")
+    key = digest.hexdigest()
+    with _RESOLVER_CACHE_LOCK:
+        resolver = _RESOLVER_CACHE.get(key)
+        if resolver is not None:
+            _RESOLVER_CACHE.move_to_end(key)
+            return resolver
+    # Parsed outside the lock; if another thread built the same resolver meanwhile, its instance is kept
+    resolver = StyleResolver(ET.fromstring(styles_xml), ET.fromstring(theme_xml) if theme_xml else None)
+    with _RESOLVER_CACHE_LOCK:
+        resolver = _RESOLVER_CACHE.setdefault(key, resolver)
+        _RESOLVER_CACHE.move_to_end(key)
+        if len(_RESOLVER_CACHE) > _RESOLVER_CACHE_SIZE:
+            _RESOLVER_CACHE.popitem(last=False)
+    return resolver
@@ -0,0 +1,171 @@
+from collections import deque
+
+
+def _is_word_char(ch):
+    return ch.isascii() and (ch.isalnum() or ch == "_")
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton matching many surface forms in a single pass over a text.
+
+    The automaton is compiled once; scanning costs O(len(text) + matches) no
+    matter how many patterns it holds.
+    """
+
+    def __init__(self, patterns, word_boundaries=True):
+        """
+        Compiles the automaton.
+
+        Args:
+            patterns (iterable): (surface, value) pairs. The value is returned with every match.
+            word_boundaries (bool): Reject matches of Latin terms glued to other Latin letters or
+                digits (e.g. "AP" inside "APPLE"). CJK text has no word boundaries and is not affected.
+        """
+        self.word_boundaries = word_boundaries
+        # Node 0 is the root. goto[n] maps a character to the next node.
+        self.goto = [{}]
+        self.fail = [0]
+        # Values of patterns ending at the node, and the nearest node on the fail chain with outputs
+        self.outputs = [[]]
+        self.output_link = [0]
+        self.size = 0
+
+        for surface, value in patterns:
+            if surface:
+                self._add(surface, value)
+        self._build()
+
+    def _add(self, surface, value):
+        node = 0
+        for ch in surface:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.output_link.append(0)
+            node = nxt
+        self.outputs[node].append((len(surface), value))
+        self.size += 1
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                fail_state = self.fail[nxt]
+                self.output_link[nxt] = fail_state if self.outputs[fail_state] else self.output_link[fail_state]
+
+    def __len__(self):
+        return self.size
+
+    def iter_matches(self, text):
+        """
+        Yields every (possibly overlapping) match in the text.
+
+        Args:
+            text (str): The text to scan.
+
+        Yields:
+            tuple: (start, end, value) for each match.
+        """
+        goto, fail, outputs, output_link = self.goto, self.fail, self.outputs, self.output_link
+        check_bounds = self.word_boundaries
+        text_len = len(text)
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            state = node if outputs[node] else output_link[node]
+            while state:
+                for length, value in outputs[state]:
+                    start = i - length + 1
+                    if check_bounds and (
+                        (_is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]))
+                        or (_is_word_char(ch) and i + 1 < text_len and _is_word_char(text[i + 1]))
+                    ):
+                        continue
+                    yield start, i + 1, value
+                state = output_link[state]
+
+    def iter_longest(self, text):
+        """
+        Yields non-overlapping matches, preferring the leftmost and then the longest one.
+
+        This keeps "电子价签" from also being reported as "价签".
+
+        Args:
+            text (str): The text to scan.
+
+        Yields:
+            tuple: (start, end, value) for each match.
+        """
+        longest = {}
+        for start, end, value in self.iter_matches(text):
+            best = longest.get(start)
+            if best is None or end > best[0]:
+                longest[start] = (end, value)
+        last_end = 0
+        for start in sorted(longest):
+            if start >= last_end:
+                end, value = longest[start]
+                yield start, end, value
+                last_end = end
+
+
+class TermMatcher:
+    """
+    Finds glossary terms in text segments with one precompiled automaton.
+
+    Every surface form of a term ("acronym", "expanded_form" or "source") is a pattern,
+    so a term is found whichever of its forms the document uses.
+    """
+
+    SURFACE_KEYS = ("acronym", "expanded_form", "source")
+
+    def __init__(self, glossary, word_boundaries=True):
+        """
+        Args:
+            glossary (list): List of term dictionaries.
+            word_boundaries (bool): See AhoCorasick.
+        """
+        self.glossary = list(glossary)
+        self.automaton = AhoCorasick(
+            ((term[key], index)
+             for index, term in enumerate(self.glossary)
+             for key in self.SURFACE_KEYS
+             if term.get(key)),
+            word_boundaries=word_boundaries,
+        )
+
+    def find(self, segments):
+        """
+        Scans text segments once and collects the glossary terms they contain.
+
+        Args:
+            segments (iterable): (location, text) pairs, e.g. from segments.iter_text_segments().
+
+        Returns:
+            list: One dictionary per matched term, in glossary order:
+                {"term": term, "count": int, "first_location": str, "first_offset": int}
+        """
+        found = {}
+        for location, text in segments:
+            for start, _, index in self.automaton.iter_longest(text):
+                hit = found.get(index)
+                if hit is None:
+                    found[index] = {"term": self.glossary[index], "count": 1,
+                                    "first_location": location, "first_offset": start}
+                else:
+                    hit["count"] += 1
+        return [found[index] for index in sorted(found)]
@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from doc_audit import expand_paths
+from glossary_store import load_glossary
+from segment_index import load_segment_index
+from term_matcher import AhoCorasick
+
+ISSUE_TYPES = ("missed", "mistranslated", "inconsistent")
+
+_worker_checker = None
+
+
+class TerminologyChecker:
+    """
+    Checks that glossary terms were rendered with their glossary translation.
+
+    Both automata are compiled once: one over the source terms and one over the target
+    terms (case-insensitive), so a segment pair is checked in one pass over each side.
+    """
+
+    def __init__(self, glossary):
+        """
+        Args:
+            glossary: A glossary file path, a Glossary or a list of term dictionaries (see glossary_store).
+        """
+        self.entries = [(source, target) for source, target, _ in load_glossary(glossary) if source and target]
+        # Several sources may share a target (汉朔, 汉朔科技 -> Hanshow), targets are keyed in lower case
+        self.targets = {}
+        for _, target in self.entries:
+            self.targets.setdefault(target.lower(), target)
+        self.source_automaton = AhoCorasick((source, index) for index, (source, _) in enumerate(self.entries))
+        self.target_automaton = AhoCorasick((key, key) for key in self.targets)
+
+    def check_segment(self, location, source_text, target_text):
+        """
+        Checks one source segment against its translation.
+
+        A term is missed if its glossary translation does not appear in the target, and
+        mistranslated if instead another glossary term appears or the source term was left
+        untranslated. A translation written differently from the glossary (e.g. "esl") is
+        reported as inconsistent.
+
+        Args:
+            location (str): Location of the segment, reported with every issue.
+            source_text (str): The source segment.
+            target_text (str): The translation.
+
+        Returns:
+            tuple: (issues, rendered) with issues a list of dictionaries
+                {"type", "location", "source_term", "expected", "found"} and rendered a
+                Counter of the source terms that were translated correctly.
+        """
+        expected = Counter()
+        sources = defaultdict(list)
+        for _, _, index in self.source_automaton.iter_longest(source_text):
+            source, target = self.entries[index]
+            expected[target.lower()] += 1
+            sources[target.lower()].append(source)
+        if not expected or not target_text:
+            return [], Counter()
+
+        # Lower-casing only keeps offsets when it does not change the length of the text
+        lowered = target_text.lower()
+        if len(lowered) != len(target_text):
+            lowered = target_text
+        found = Counter()
+        surfaces = defaultdict(list)
+        for start, end, key in self.target_automaton.iter_longest(lowered):
+            found[key] += 1
+            surfaces[key].append(target_text[start:end])
+
+        issues = []
+        rendered = Counter()
+        for key, needed in expected.items():
+            expected_target = self.targets[key]
+            for position, source in enumerate(sources[key]):
+                if position < found[key]:
+                    rendered[source] += 1
+                    continue
+                wrong = [surface for other, forms in surfaces.items() if other not in expected for surface in forms]
+                if source in target_text:
+                    wrong.append(source)
+                issues.append({
+                    "type": "mistranslated" if wrong else "missed",
+                    "location": location,
+                    "source_term": source,
+                    "expected": expected_target,
+                    "found": ", ".join(dict.fromkeys(wrong)) or None,
+                })
+            for surface in surfaces.get(key, ())[:needed]:
+                if surface != expected_target:
+                    issues.append({
+                        "type": "inconsistent",
+                        "location": location,
+                        "source_term": sources[key][0],
+                        "expected": expected_target,
+                        "found": surface,
+                    })
+        return issues, rendered
+
+    def check_pairs(self, pairs):
+        """
+        Checks (location, source text, target text) pairs.
+
+        Returns:
+            dict: {"segments": int, "issues": list, "rendered": {source term: count}}
+        """
+        segments = 0
+        issues = []
+        rendered = Counter()
+        for location, source_text, target_text in pairs:
+            segments += 1
+            segment_issues, segment_rendered = self.check_segment(location, source_text, target_text)
+            issues.extend(segment_issues)
+            rendered.update(segment_rendered)
+        return {"segments": segments, "issues": issues, "rendered": dict(rendered)}
+
+
+def iter_bilingual_pairs(units):
+    """
+    Yields the segment pairs of a bilingual document written by Translator.translate_word_file.
+
+    Every non-empty paragraph of the body and every line of a table cell is followed by its
+    translation.
+
+    Args:
+        units (iterable): The units of the bilingual document, from Translator.iter_word_units
+            or SegmentIndex.iter_word_units.
+
+    Yields:
+        tuple: (location, source text, target text)
+    """
+    paragraph = None
+    for kind, _, segments in units:
+        if kind == "paragraph":
+            if paragraph is None:
+                paragraph = segments[0]
+            else:
+                yield paragraph[1], paragraph[2], segments[0][2]
+                paragraph = None
+            continue
+        for pair, (source, target) in enumerate(zip(segments[::2], segments[1::2])):
+            # Locations refer to the lines of the source document
+            yield f"{source[1].rsplit('/l[', 1)[0]}/l[{pair}]", source[2], target[2]
+
+
+def iter_document_pairs(source_units, target_units):
+    """
+    Yields the segment pairs of a source document and its translation, e.g. from DeepL.
+
+    Segments are paired by location, so the translation must keep the paragraph and table
+    structure of the source.
+
+    Args:
+        source_units (iterable): The units of the source document (see iter_bilingual_pairs).
+        target_units (iterable): The units of the translation.
+
+    Yields:
+        tuple: (location, source text, target text)
+    """
+    targets = {location: text for _, _, segments in target_units for _, location, text in segments}
+    for _, _, segments in source_units:
+        for _, location, text in segments:
+            if location in targets:
+                yield location, text, targets[location]
+
+
+def check_document(checker, path, source_path=None):
+    """
+    Checks the terminology of one translated document.
+
+    The segments are read from the segment indexes of the documents, so a document that was
+    checked before is not parsed again.
+
+    Args:
+        checker (TerminologyChecker): The compiled checker.
+        path (str): A bilingual document, or the translation of source_path.
+        source_path (str, optional): The source document of a target-only translation.
+
+    Returns:
+        dict: {"file_path", "source_path", "status", "segments", "issues", "rendered"}
+    """
+    units = load_segment_index(path).iter_word_units()
+    if source_path:
+        pairs = iter_document_pairs(load_segment_index(source_path).iter_word_units(), units)
+    else:
+        pairs = iter_bilingual_pairs(units)
+    result = checker.check_pairs(pairs)
+    result.update(file_path=path, source_path=source_path, status="success")
+    return result
+
+
+def _init_worker(glossary):
+    global _worker_checker
+    _worker_checker = TerminologyChecker(glossary)
+
+
+def _check_job(job):
+    return check_document(_worker_checker, *job)
+
+
+def check_documents(jobs, glossary, workers=None):
+    """
+    Checks many documents in a process pool, yielding results in completion order.
+
+    Every worker compiles the glossary automata once and reuses them for all its documents.
+
+    Args:
+        jobs (list): (path, source path or None) tuples.
+        glossary (str): Glossary file.
+        workers (int, optional): Worker processes, defaults to the number of CPUs.
+
+    Yields:
+        dict: The result of check_document, or an error result.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(glossary,)) as executor:
+        futures = {executor.submit(_check_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                path, source_path = futures[future]
+                yield {"file_path": path, "source_path": source_path, "status": "error", "message": str(e),
+                       "segments": 0, "issues": [], "rendered": {}}
+
+
+class TermQASummary:
+    """
+    Aggregates results over a batch.
+
+    A term is inconsistent across the batch when it was rendered correctly in some segments
+    and not in others, or written in more than one way.
+    """
+
+    def __init__(self):
+        self.documents = 0
+        self.errors = 0
+        self.segments = 0
+        self.issues = Counter()
+        self.rendered = Counter()
+        self.deviations = defaultdict(Counter)
+        self.variants = defaultdict(set)
+        self.expected = {}
+
+    def add(self, result):
+        self.documents += 1
+        if result["status"] != "success":
+            self.errors += 1
+            return
+        self.segments += result["segments"]
+        self.rendered.update(result["rendered"])
+        for issue in result["issues"]:
+            self.issues[issue["type"]] += 1
+            self.deviations[issue["source_term"]][issue["type"]] += 1
+            self.expected[issue["source_term"]] = issue["expected"]
+            if issue["type"] == "inconsistent":
+                self.variants[issue["source_term"]].add(issue["found"])
+
+    def inconsistent_terms(self):
+        """Returns {source term: description} for the terms rendered inconsistently across the batch."""
+        terms = {}
+        for source, deviations in self.deviations.items():
+            correct = self.rendered[source] - deviations["inconsistent"]
+            wrong = deviations["missed"] + deviations["mistranslated"]
+            if (correct > 0 and wrong > 0) or self.variants[source]:
+                variants = ", ".join(sorted(self.variants[source]))
+                terms[source] = (f"{self.expected[source]} {correct}x, missed {deviations['missed']}x, "
+                                 f"mistranslated {deviations['mistranslated']}x" + (f", variants: {variants}" if variants else ""))
+        return terms
+
+    def as_dict(self):
+        return {
+            "documents": self.documents,
+            "errors": self.errors,
+            "segments": self.segments,
+            "issues": {issue_type: self.issues[issue_type] for issue_type in ISSUE_TYPES},
+            "inconsistent_terms": self.inconsistent_terms(),
+        }
+
+    def generate_report(self):
+        report = [f"Documents: {self.documents} ({self.errors} errors), segments: {self.segments}"]
+        report.append("Issues: " + ", ".join(f"{issue_type} {self.issues[issue_type]}" for issue_type in ISSUE_TYPES))
+        terms = self.inconsistent_terms()
+        if terms:
+            report.append("Terms rendered inconsistently across the batch:")
+            for source, description in sorted(terms.items(), key=lambda item: -sum(self.deviations[item[0]].values())):
+                report.append(f"  {source} -> {description}")
+        return "\n".join(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that glossary terms were translated consistently.")
+    parser.add_argument("paths", nargs="+", help="Translated documents, folders or glob patterns.")
+    parser.add_argument("--glossary", required=True, help="Glossary file, e.g. deepl-cn-en-glossary.json.")
+    parser.add_argument("--source-dir", help="Folder of the source documents; the translations are then target-only "
+                                             "(e.g. DeepL) and paired with the source of the same name. "
+                                             "Without it the documents are bilingual (pydoc.py -t).")
+    parser.add_argument("--suffix", default="", help="Suffix of the translated file names to remove when pairing, e.g. -EN.")
+    parser.add_argument("-o", "--output", help="Write the issues as NDJSON to this file (default: standard output).")
+    parser.add_argument("--summary", help="Write the summary as JSON to this file.")
+    parser.add_argument("-j", "--workers", type=int, help="Worker processes (default: number of CPUs).")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    for path in expand_paths(args.paths):
+        source_path = None
+        if args.source_dir:
+            base, ext = os.path.splitext(os.path.basename(path))
+            if args.suffix and base.endswith(args.suffix):
+                base = base[:-len(args.suffix)]
+            source_path = os.path.join(args.source_dir, base + ext)
+            if not os.path.exists(source_path):
+                print(f"No source document for {path}, skipped.", file=sys.stderr)
+                continue
+        jobs.append((path, source_path))
+    if not jobs:
+        print("No documents to check.", file=sys.stderr)
+        return 1
+
+    summary = TermQASummary()
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in check_documents(jobs, args.glossary, args.workers):
+            summary.add(result)
+            if result["status"] != "success":
+                out.write(json.dumps({"file_path": result["file_path"], "type": "error", "message": result["message"]},
+                                     ensure_ascii=False) + "\n")
+            for issue in result["issues"]:
+                out.write(json.dumps(dict(issue, file_path=result["file_path"]), ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary.as_dict(), f, ensure_ascii=False, indent=2)
+    print(summary.generate_report(), file=sys.stderr)
+    return 0 if not sum(summary.issues.values()) and not summary.errors else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
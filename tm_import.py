@@ -0,0 +1,297 @@
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from doc_audit import expand_paths
+from segment_index import load_segment_index
+from sentence_splitter import split_sentences
+from translation_memory import TranslationMemory
+from Translator import Translator
+
+CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+# Paragraphs further than this from the diagonal of the alignment matrix are never paired
+ALIGN_BAND = 50
+# A paragraph left without a counterpart, and the highest cost of a pair that is kept
+SKIP_COST = 0.8
+MAX_PAIR_COST = 0.6
+
+
+def _cjk_count(text):
+    return len(CJK_RE.findall(text))
+
+
+def _segments(index):
+    """Yields (unit, kind, location, text, style) for every segment of a SegmentIndex."""
+    for i in range(len(index)):
+        yield index.units[i], index.kind(i), index.location(i), index.text(i), index.style(i)
+
+
+def align_bilingual(index):
+    """
+    Aligns the segments of a bilingual document written by Translator.translate_word_file.
+
+    Every paragraph (or table cell line) is expected to be followed by its translation in the
+    same style. A segment is only paired with the next one when both have the same style and
+    the next one has fewer Chinese characters; otherwise the alignment resynchronizes on the
+    next segment, so notes or edits added to the document later do not shift every pair.
+
+    Args:
+        index (SegmentIndex): The segment index of the bilingual document.
+
+    Yields:
+        tuple: (location, source text, target text)
+    """
+    pending = None
+    for unit, kind, location, text, style in _segments(index):
+        if pending is not None and pending[0] != unit and "cell" in (pending[1], kind):
+            # Lines of a table cell are only paired within the cell
+            pending = None
+        if pending is not None and pending[4] == style and _cjk_count(text) < _cjk_count(pending[3]):
+            yield pending[2], pending[3], text
+            pending = None
+        else:
+            pending = (unit, kind, location, text, style) if _cjk_count(text) else None
+
+
+def align_paragraphs(sources, targets):
+    """
+    Aligns two sequences of paragraphs by length (a simplified Gale-Church alignment).
+
+    Every paragraph is either paired with one paragraph of the other side or left out, whichever
+    is cheaper. The cost of a pair is the difference between the target length and the source
+    length scaled by the length ratio of the whole documents, plus penalties for a different
+    number of sentences and for different styles.
+
+    Args:
+        sources (list): (location, text, style) of the source paragraphs.
+        targets (list): (location, text, style) of the target paragraphs.
+
+    Returns:
+        list: (source, target) index pairs.
+    """
+    n, m = len(sources), len(targets)
+    if not n or not m:
+        return []
+    ratio = (sum(len(text) for _, text, _ in targets) or 1) / (sum(len(text) for _, text, _ in sources) or 1)
+    band = max(ALIGN_BAND, abs(n - m) + 10)
+    source_sentences = [len(split_sentences(text)[0]) for _, text, _ in sources]
+    target_sentences = [len(split_sentences(text)[0]) for _, text, _ in targets]
+
+    def pair_cost(i, j):
+        expected = ratio * len(sources[i][1])
+        length = len(targets[j][1])
+        return (abs(length - expected) / (expected + length + 1)
+                + min(0.8, 0.4 * abs(source_sentences[i] - target_sentences[j]))
+                + (0.5 if sources[i][2] != targets[j][2] else 0))
+
+    # Only the cells within the band are computed, one dictionary per row
+    inf = float("inf")
+    cost = [{} for _ in range(n + 1)]
+    back = [{} for _ in range(n + 1)]
+    cost[0][0] = 0
+    for i in range(n + 1):
+        center = i * m // n
+        for j in range(max(0, center - band), min(m, center + band) + 1):
+            if i == 0 and j == 0:
+                continue
+            best, move = inf, None
+            if i and j and cost[i - 1].get(j - 1, inf) < inf:
+                best, move = cost[i - 1][j - 1] + pair_cost(i - 1, j - 1), "pair"
+            if i and cost[i - 1].get(j, inf) + SKIP_COST < best:
+                best, move = cost[i - 1][j] + SKIP_COST, "source"
+            if j and cost[i].get(j - 1, inf) + SKIP_COST < best:
+                best, move = cost[i][j - 1] + SKIP_COST, "target"
+            cost[i][j], back[i][j] = best, move
+
+    pairs = []
+    i, j = n, m
+    while i or j:
+        move = back[i][j]
+        if move == "pair":
+            i, j = i - 1, j - 1
+            if pair_cost(i, j) <= MAX_PAIR_COST:
+                pairs.append((i, j))
+        elif move == "source":
+            i -= 1
+        else:
+            j -= 1
+    return pairs[::-1]
+
+
+def align_documents(source_index, target_index):
+    """
+    Aligns a source document with its separate translation, e.g. from a translation vendor.
+
+    Table cell lines are paired by location, so tables must keep their structure. Body
+    paragraphs are aligned by length and style, which tolerates paragraphs that were added,
+    removed or merged in the translation.
+
+    Args:
+        source_index (SegmentIndex): The segment index of the source document.
+        target_index (SegmentIndex): The segment index of the translation.
+
+    Yields:
+        tuple: (location, source text, target text)
+    """
+    sources = [(location, text, style) for _, kind, location, text, style in _segments(source_index) if kind == "paragraph"]
+    targets = [(location, text, style) for _, kind, location, text, style in _segments(target_index) if kind == "paragraph"]
+    for i, j in align_paragraphs(sources, targets):
+        yield sources[i][0], sources[i][1], targets[j][1]
+
+    target_cells = {location: text for _, kind, location, text, _ in _segments(target_index) if kind == "cell"}
+    for _, kind, location, text, _ in _segments(source_index):
+        if kind == "cell" and location in target_cells:
+            yield location, text, target_cells[location]
+
+
+def memory_pairs(source_text, target_text, sentence_split=True):
+    """
+    Converts an aligned segment pair into translation memory entries.
+
+    Translator looks paragraphs up sentence by sentence, so a pair is stored per sentence when
+    both sides split into the same number of sentences, and as a whole when the source is a
+    single sentence. Other pairs cannot be matched reliably and are dropped.
+
+    Returns:
+        list: (source, target) pairs.
+    """
+    target_text = target_text.strip()
+    if not source_text.strip() or not target_text or source_text.strip() == target_text or not _cjk_count(source_text):
+        return []
+    if not sentence_split:
+        return [(source_text, target_text)]
+    source_sentences, _ = split_sentences(source_text)
+    target_sentences, _ = split_sentences(target_text)
+    if len(source_sentences) == 1:
+        # Single sentences are looked up with the text as it is in the document
+        return [(source_text, target_text)]
+    if len(source_sentences) == len(target_sentences):
+        return [(source, target) for source, target in zip(source_sentences, target_sentences) if source != target]
+    return []
+
+
+def import_document(path, source_path=None, sentence_split=True):
+    """
+    Aligns one bilingual document, or a translation with its source document.
+
+    Args:
+        path (str): A bilingual document, or the translation of source_path.
+        source_path (str, optional): The source document of a target-only translation.
+        sentence_split (bool): Store sentence pairs (see memory_pairs).
+
+    Returns:
+        dict: {"file_path", "source_path", "status", "segments", "pairs"} with pairs the
+            (source, target) translation memory entries.
+    """
+    index = load_segment_index(path)
+    if source_path:
+        aligned = list(align_documents(load_segment_index(source_path), index))
+    else:
+        aligned = list(align_bilingual(index))
+    pairs = [pair for _, source, target in aligned for pair in memory_pairs(source, target, sentence_split)]
+    return {"file_path": path, "source_path": source_path, "status": "success", "segments": len(aligned), "pairs": pairs}
+
+
+def _import_job(job):
+    return import_document(*job)
+
+
+def import_documents(jobs, workers=None, sentence_split=True):
+    """
+    Aligns many documents in a process pool, yielding results in completion order.
+
+    Args:
+        jobs (list): (path, source path or None) tuples.
+        workers (int, optional): Worker processes, defaults to the number of CPUs.
+        sentence_split (bool): Store sentence pairs (see memory_pairs).
+
+    Yields:
+        dict: The result of import_document, or an error result.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_import_job, job + (sentence_split,)): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                path, source_path = futures[future]
+                yield {"file_path": path, "source_path": source_path, "status": "error", "message": str(e),
+                       "segments": 0, "pairs": []}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the translation memory from existing translated documents.")
+    parser.add_argument("paths", nargs="+", help="Translated documents, folders or glob patterns.")
+    parser.add_argument("--source-dir", help="Folder of the source documents; the documents are then translations "
+                                             "(e.g. from a vendor) aligned with the source of the same name. "
+                                             "Without it the documents are bilingual (pydoc.py -t).")
+    parser.add_argument("--suffix", default="", help="Suffix of the translated file names to remove when pairing, e.g. -EN.")
+    parser.add_argument("--target-lang", default="en", help="Target language of the translations, e.g. en, EN-US or DE (default: en).")
+    parser.add_argument("--partition", default="", help="Translation memory partition, e.g. the glossary file name used with -t.")
+    parser.add_argument("--provider", default="import", help="Provider recorded with the entries (default: import).")
+    parser.add_argument("--keep-existing", action="store_true", help="Keep entries already in the translation memory instead of replacing them.")
+    parser.add_argument("--no-sentence-split", action="store_false", dest="sentence_split",
+                        help="Store whole paragraphs instead of sentences.")
+    parser.add_argument("--memory", help="Translation memory database (default: PYDOC_TM_PATH or ~/.pydoc/cache/translation_memory.sqlite).")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Entries written per transaction (default: 5000).")
+    parser.add_argument("--dry-run", action="store_true", help="Only align and report, do not write the translation memory.")
+    parser.add_argument("-j", "--workers", type=int, help="Worker processes (default: number of CPUs).")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    for path in expand_paths(args.paths):
+        source_path = None
+        if args.source_dir:
+            base, ext = os.path.splitext(os.path.basename(path))
+            if args.suffix and base.endswith(args.suffix):
+                base = base[:-len(args.suffix)]
+            source_path = os.path.join(args.source_dir, base + ext)
+            if not os.path.exists(source_path):
+                print(f"No source document for {path}, skipped.", file=sys.stderr)
+                continue
+        jobs.append((path, source_path))
+    if not jobs:
+        print("No documents to import.", file=sys.stderr)
+        return 1
+
+    memory = None if args.dry_run else TranslationMemory(args.memory)
+    # Stored under the language Translator looks entries up with, e.g. "en" for EN-US and EN-GB
+    target_lang = Translator.api_language(args.target_lang)
+    documents = errors = segments = aligned = written = 0
+    batch = []
+
+    def flush():
+        nonlocal written, batch
+        if memory is not None and batch:
+            written += memory.put_many(batch, provider=args.provider, target_lang=target_lang,
+                                       partition=args.partition, replace=not args.keep_existing)
+        batch = []
+
+    try:
+        for result in import_documents(jobs, args.workers, args.sentence_split):
+            documents += 1
+            if result["status"] != "success":
+                errors += 1
+                print(f"{result['file_path']}: {result['message']}", file=sys.stderr)
+                continue
+            segments += result["segments"]
+            aligned += len(result["pairs"])
+            print(f"{result['file_path']}: {result['segments']} aligned segments, {len(result['pairs'])} entries")
+            batch.extend(result["pairs"])
+            if len(batch) >= args.batch_size:
+                flush()
+        flush()
+    finally:
+        if memory is not None:
+            memory.close()
+
+    print(f"Documents: {documents} ({errors} errors), aligned segments: {segments}, entries: {aligned}"
+          + ("" if args.dry_run else f", written: {written}"))
+    return 0 if not errors else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
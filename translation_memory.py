@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_TM_PATH = os.path.join(os.path.expanduser("~"), ".pydoc", "cache", "translation_memory.sqlite")
+
+# SQLite limits the number of bound parameters of one statement
+_LOOKUP_CHUNK = 500
+
+
+class TranslationMemory:
+    """
+    Persistent source -> target segment store shared by all translation paths.
+
+    Entries are partitioned by target language and an optional partition name (e.g. a
+    glossary), and record the provider that produced them. Writes are batched in a
+    single transaction; the database is safe to share between threads and processes.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str, optional): Database file. Defaults to $PYDOC_TM_PATH or ~/.pydoc/cache/translation_memory.sqlite.
+        """
+        self.path = path or os.getenv("PYDOC_TM_PATH") or DEFAULT_TM_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " source TEXT NOT NULL,"
+                " target_lang TEXT NOT NULL,"
+                " partition TEXT NOT NULL DEFAULT '',"
+                " target TEXT NOT NULL,"
+                " provider TEXT,"
+                " created REAL NOT NULL,"
+                " PRIMARY KEY (source, target_lang, partition))"
+            )
+
+    def get_many(self, texts, target_lang="en", partition=""):
+        """
+        Looks up many segments at once.
+
+        Args:
+            texts (iterable): Source texts.
+            target_lang (str): Target language.
+            partition (str): Partition name, e.g. a glossary.
+
+        Returns:
+            dict: {source: target} for the texts found.
+        """
+        texts = list(dict.fromkeys(texts))
+        found = {}
+        with self._lock:
+            for i in range(0, len(texts), _LOOKUP_CHUNK):
+                chunk = texts[i:i + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT source, target FROM segments WHERE target_lang = ? AND partition = ? "
+                    f"AND source IN ({','.join('?' * len(chunk))})",
+                    [target_lang.lower(), partition, *chunk],
+                )
+                found.update(rows)
+        return found
+
+    def get(self, text, target_lang="en", partition=""):
+        return self.get_many([text], target_lang, partition).get(text)
+
+    def put_many(self, pairs, provider=None, target_lang="en", partition="", replace=True):
+        """
+        Stores many (source, target) pairs in one transaction.
+
+        Args:
+            pairs (iterable): (source, target) pairs.
+            provider (str, optional): The provider that produced the translations, e.g. "volcengine" or "deepl".
+            target_lang (str): Target language.
+            partition (str): Partition name, e.g. a glossary.
+            replace (bool): Replace existing entries of the same source; if False they are kept.
+
+        Returns:
+            int: The number of pairs written (existing entries that were kept are not counted).
+        """
+        now = time.time()
+        rows = [(source, target_lang.lower(), partition, target, provider, now)
+                for source, target in pairs if source and target is not None]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO segments "
+                "(source, target_lang, partition, target, provider, created) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    def put(self, text, translation, provider=None, target_lang="en", partition=""):
+        self.put_many([(text, translation)], provider, target_lang, partition)
+
+    def stats(self):
+        """Returns the number of entries per (target language, provider)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT target_lang, COALESCE(provider, ''), COUNT(*) FROM segments GROUP BY target_lang, provider"
+            ).fetchall()
+        return {(target_lang, provider): count for target_lang, provider, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
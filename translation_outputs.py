@@ -0,0 +1,172 @@
+import copy
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import docx
+from docx.oxml.ns import qn
+
+from pydoc_logging import get_logger
+from segment_exchange import write_tmx
+from Translator import Translator
+
+logger = get_logger("outputs")
+
+# bilingual: translation below every paragraph/line (translate_word_file)
+# target: the source text replaced by its translation in place
+# table: a two-column source/translation table
+# tmx: a bilingual translation memory
+OUTPUT_FORMATS = ("bilingual", "target", "table", "tmx")
+OUTPUT_SUFFIXES = {"bilingual": "-bilingual.docx", "target": "-target.docx", "table": "-table.docx", "tmx": ".tmx"}
+
+
+def output_paths(output_path, formats):
+    """
+    Derives the file of every output format from one output path.
+
+    The first Word format is written to output_path itself, the others next to it with a
+    suffix, e.g. manual.docx, manual-target.docx, manual-table.docx and manual.tmx.
+
+    Args:
+        output_path (str): The main output document.
+        formats (list): Output formats, see OUTPUT_FORMATS.
+
+    Returns:
+        dict: {format: path}
+    """
+    unknown = [name for name in formats if name not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown output format(s): {', '.join(unknown)}. Available: {', '.join(OUTPUT_FORMATS)}")
+    base = os.path.splitext(output_path)[0]
+    paths = {}
+    for name in dict.fromkeys(formats):
+        if name != "tmx" and output_path not in paths.values():
+            paths[name] = output_path
+        else:
+            paths[name] = base + OUTPUT_SUFFIXES[name]
+    return paths
+
+
+def target_paths(output_path, targets):
+    """
+    Derives the output of every target language from one output path, e.g. manual-DE.docx.
+
+    Args:
+        output_path (str): The main output document.
+        targets (list): Target language codes.
+
+    Returns:
+        dict: {target language: path}
+    """
+    base, ext = os.path.splitext(output_path)
+    return {target: f"{base}-{target}{ext}" for target in dict.fromkeys(targets)}
+
+
+def _replace_paragraph_text(paragraph, text):
+    # Keep the formatting of the first run, like Translator.translate_pptx_file
+    runs = paragraph.runs
+    rpr = runs[0]._r.rPr if runs else None
+    paragraph.text = text
+    if rpr is not None:
+        for run in paragraph.runs:
+            run._r.insert(0, copy.deepcopy(rpr))
+
+
+def _replace_cell_lines(cell, translations):
+    """Replaces the lines of a cell (see Translator.iter_word_units) by their translations in place."""
+    lines = [(paragraph, line) for paragraph in cell.paragraphs for line in paragraph.text.split("\n")]
+    # iter_word_units strips the cell text, so leading blank lines have no segment
+    first = 0
+    while first < len(lines) and not lines[first][1].strip():
+        first += 1
+    replaced = {}
+    for index, (paragraph, line) in enumerate(lines):
+        if first <= index < first + len(translations):
+            line = translations[index - first]
+        replaced.setdefault(paragraph._p, (paragraph, []))[1].append(line)
+    for paragraph, new_lines in replaced.values():
+        new_text = "\n".join(new_lines)
+        if new_text != paragraph.text:
+            _replace_paragraph_text(paragraph, new_text)
+
+
+def write_bilingual(doc, translations, output_path):
+    Translator(memory=False).apply_word_translations(doc, lambda segment_id, text: translations[segment_id])
+    doc.save(output_path)
+
+
+def write_target(doc, translations, output_path):
+    for kind, obj, segments in Translator.iter_word_units(doc):
+        translated = [translations[segment_id] for segment_id, _, _ in segments]
+        if kind == "paragraph":
+            _replace_paragraph_text(obj, translated[0])
+        else:
+            _replace_cell_lines(obj, translated)
+    doc.save(output_path)
+
+
+def write_table(doc, translations, output_path, source_lang="zh-CN", target_lang="en"):
+    segments = [(text, translations[segment_id])
+                for _, _, unit_segments in Translator.iter_word_units(doc) for segment_id, _, text in unit_segments]
+    # Reuse the source document for its styles and page setup, but drop its content
+    body = doc.element.body
+    for child in list(body):
+        if child.tag != qn("w:sectPr"):
+            body.remove(child)
+    table = doc.add_table(rows=len(segments) + 1, cols=2)
+    try:
+        table.style = "Table Grid"
+    except KeyError:
+        pass
+    header = table.rows[0].cells
+    header[0].text = source_lang
+    header[1].text = target_lang
+    for row, (text, translation) in zip(table.rows[1:], segments):
+        cells = row.cells
+        cells[0].text = text
+        cells[1].text = translation
+    # Word expects a paragraph after a table at the end of the body
+    doc.add_paragraph()
+    doc.save(output_path)
+
+
+def write_outputs(input_path, translations, outputs, source_lang="zh-CN", target_lang="en", workers=None, data=None):
+    """
+    Writes several outputs of one translated Word document in parallel.
+
+    Each Word output is built from its own copy of the document, parsed from bytes read once.
+
+    Args:
+        input_path (str): The source Word document.
+        translations (dict): {segment id: translated text} for every segment of the document.
+        outputs (dict): {format: path}, see OUTPUT_FORMATS and output_paths().
+        source_lang (str): Source language code (TMX and table header).
+        target_lang (str): Target language code (TMX and table header).
+        workers (int, optional): Parallel writers, one per output by default.
+        data (bytes, optional): The content of input_path if it was already read.
+
+    Returns:
+        dict: The written {format: path}.
+    """
+    if data is None:
+        with open(input_path, "rb") as f:
+            data = f.read()
+
+    def write(name, path):
+        doc = docx.Document(io.BytesIO(data))
+        if name == "tmx":
+            segments = ((segment_id, location, text, translations[segment_id])
+                        for _, _, unit_segments in Translator.iter_word_units(doc)
+                        for segment_id, location, text in unit_segments)
+            write_tmx(path, segments, source_lang, target_lang)
+        elif name == "table":
+            write_table(doc, translations, path, source_lang, target_lang)
+        elif name == "target":
+            write_target(doc, translations, path)
+        else:
+            write_bilingual(doc, translations, path)
+        logger.info("Wrote %s output: %s", name, path)
+        return name, path
+
+    with ThreadPoolExecutor(max_workers=workers or len(outputs) or 1) as executor:
+        return dict(executor.map(lambda item: write(*item), outputs.items()))
@@ -0,0 +1,207 @@
+import argparse
+import os
+import sys
+from collections import Counter
+
+import docx
+
+from Translator import Translator
+from pydoc_logging import get_logger, setup_logging
+from segment_index import load_segment_index
+from usage_ledger import UsageLedger
+
+logger = get_logger("planner")
+
+
+class TranslationPlan:
+    """
+    Global segment index for a batch of Word documents.
+
+    Every segment translate_word_file would translate is gathered across all documents with a
+    reference count, the unique segments are translated exactly once in batched requests, and
+    the translations are then fanned back out to every document. Translation cost therefore
+    scales with the unique content of the batch instead of the number of documents.
+    """
+
+    def __init__(self, paths):
+        """
+        Args:
+            paths (list): The Word documents of the batch.
+        """
+        self.paths = list(paths)
+        self.references = Counter()
+        self.document_segments = {}
+        self.translations = {}
+        # Segment kind ("paragraph" or "cell") of every unique segment, where it was first seen
+        self.kinds = {}
+        for path in self.paths:
+            count = 0
+            for kind, _, segments in load_segment_index(path).iter_word_units():
+                self.references.update(text for _, _, text in segments)
+                for _, _, text in segments:
+                    self.kinds.setdefault(text, kind)
+                count += len(segments)
+            self.document_segments[path] = count
+
+    @property
+    def total_segments(self):
+        return sum(self.references.values())
+
+    @property
+    def unique_segments(self):
+        return len(self.references)
+
+    @property
+    def pending_chars(self):
+        """Billable characters of the segments that still need a translation."""
+        return sum(len(text) for text in self.references if text not in self.translations)
+
+    def pending(self):
+        """Returns the unique segments that have no translation yet, most referenced first."""
+        return [text for text, _ in self.references.most_common() if text not in self.translations]
+
+    def translate(self, translate_batch, by_kind=False):
+        """
+        Translates every pending unique segment once.
+
+        Args:
+            translate_batch (callable): Takes a list of texts and returns their translations
+                (None for failures), e.g. Translator.translate_batch or DeepLTranslator.translate_batch.
+            by_kind (bool): Call translate_batch once per segment kind with the kind as second
+                argument, e.g. for TranslationRouter preferences.
+
+        Returns:
+            int: The number of segments that could not be translated.
+        """
+        pending = self.pending()
+        if by_kind:
+            groups = {}
+            for text in pending:
+                groups.setdefault(self.kinds[text], []).append(text)
+            results = [(texts, translate_batch(texts, kind)) for kind, texts in groups.items()]
+        else:
+            results = [(pending, translate_batch(pending))]
+        failed = 0
+        for texts, translated in results:
+            for text, translated_text in zip(texts, translated):
+                if translated_text is None:
+                    failed += 1
+                else:
+                    self.translations[text] = translated_text
+        return failed
+
+    def apply(self, output_dir, suffix=""):
+        """
+        Writes every document with the translations added below the original text, like translate_word_file.
+
+        Segments without a translation are left untranslated.
+
+        Args:
+            output_dir (str): Directory of the translated documents (same file names).
+            suffix (str): Appended to the file name before the extension, e.g. "-EN".
+
+        Returns:
+            list: The paths of the written documents.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        outputs = []
+        for path in self.paths:
+            base, ext = os.path.splitext(os.path.basename(path))
+            output_path = os.path.join(output_dir, f"{base}{suffix}{ext}")
+            self.apply_document(path, output_path)
+            outputs.append(output_path)
+        return outputs
+
+    def apply_document(self, path, output_path):
+        """Writes one document of the plan with its translations, like translate_word_file."""
+        doc = docx.Document(path)
+        Translator(memory=False).apply_word_translations(doc, lambda segment_id, text: self.translations.get(text, text))
+        doc.save(output_path)
+        logger.info("Translation completed. Document saved at: %s", output_path)
+
+    def generate_report(self, top=10):
+        """Summarizes the batch: segments per document, unique content and the most shared segments."""
+        total = self.total_segments
+        unique = self.unique_segments
+        total_chars = sum(len(text) * count for text, count in self.references.items())
+        unique_chars = sum(len(text) for text in self.references)
+        report = [f"Documents: {len(self.paths)}"]
+        for path, count in self.document_segments.items():
+            report.append(f"  {os.path.basename(path)}: {count} segments")
+        report.append(f"Segments: {total} total, {unique} unique ({unique / total:.0%})" if total else "Segments: 0")
+        report.append(f"Characters to translate: {unique_chars} instead of {total_chars}")
+        shared = [(text, count) for text, count in self.references.most_common(top) if count > 1]
+        if shared:
+            report.append("Most shared segments:")
+            for text, count in shared:
+                report.append(f"  {count}x {text[:60]}")
+        return "\n".join(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate a batch of Word documents, translating every unique segment once.")
+    parser.add_argument("inputs", nargs="+", help="Word documents of the batch.")
+    parser.add_argument("-o", "--output-dir", help="Directory of the translated documents.")
+    parser.add_argument("--suffix", default="", help="Appended to the output file names, e.g. -EN.")
+    parser.add_argument("--plan-only", action="store_true", help="Only print the plan, do not translate.")
+    parser.add_argument("--deepl", action="store_true", help="Use DeepL instead of VolcEngine.")
+    parser.add_argument("--route", action="store_true", help="Spread the batches over VolcEngine and DeepL at the same time.")
+    parser.add_argument("--route-prefer", action="append", default=[], metavar="KEY=PROVIDER",
+                        help="With --route, reserve a segment kind (paragraph, cell) or glossary file for a provider "
+                             "(volcengine, deepl) while it can take them, e.g. cell=deepl. Repeatable.")
+    parser.add_argument("--glossary", type=str, help="Glossary file (VolcEngine exact-segment terms, or DeepL glossary).")
+    parser.add_argument("--deepl-source", type=str, help="DeepL source language code (optional).")
+    parser.add_argument("--deepl-target", type=str, default="EN-US", help="DeepL target language code (default: EN-US).")
+    parser.add_argument("--deepl-key", type=str, help="DeepL API authentication key (default: DEEPL_AUTH_KEY).")
+    parser.add_argument("--ignore-budget", action="store_true", help="Translate even if the batch exceeds the remaining monthly quota.")
+    parser.add_argument("--log-level", help="Log level (default: $PYDOC_LOG_LEVEL or INFO).")
+    parser.add_argument("--log-format", choices=("text", "json"), help="Log format (default: $PYDOC_LOG_FORMAT or text).")
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level, args.log_format)
+    if args.route_prefer and not args.route:
+        parser.error("--route-prefer can only be used with --route.")
+
+    plan = TranslationPlan(args.inputs)
+    print(plan.generate_report())
+    if args.plan_only:
+        return 0
+    if not args.output_dir:
+        parser.error("--output-dir is required unless --plan-only is used.")
+
+    if args.route:
+        from translation_router import TranslationRouter, build_providers, configured_providers, parse_preferences
+        if not configured_providers(args.deepl_key):
+            parser.error("--route needs VolcEngine credentials (VOLC_ACCESS_KEY, VOLC_SECRET_KEY) or a DeepL key (DEEPL_AUTH_KEY, --deepl-key).")
+        try:
+            preferences = parse_preferences(args.route_prefer)
+        except ValueError as e:
+            parser.error(str(e))
+        router = TranslationRouter(build_providers(args.glossary, args.deepl_key, args.deepl_source, args.deepl_target),
+                                   preferences=preferences, target_lang=Translator.api_language(args.deepl_target))
+        remaining = [provider.quota for provider in router.providers]
+        remaining = None if None in remaining else sum(remaining)
+        translate_batch = lambda texts, kind=None: router.translate(texts, kind=kind, glossary=args.glossary)
+    elif args.deepl:
+        from deepl_translator import DeepLTranslator
+        deepl_translator = DeepLTranslator(args.deepl_key)
+        remaining = UsageLedger().remaining("deepl", deepl_translator)
+        translate_batch = lambda texts: deepl_translator.translate_batch(
+            texts, source_lang=args.deepl_source, target_lang=args.deepl_target, glossary_path=args.glossary)
+    else:
+        remaining = UsageLedger().remaining("volcengine")
+        translate_batch = Translator(args.glossary).translate_batch
+
+    if remaining is not None:
+        print(f"Remaining monthly quota: {remaining} characters, this batch needs {plan.pending_chars}.")
+        if plan.pending_chars > remaining and not args.ignore_budget:
+            print("The batch exceeds the remaining quota, nothing was translated (use --ignore-budget to translate anyway).")
+            return 3
+    failed = plan.translate(translate_batch, by_kind=args.route)
+    if failed:
+        logger.warning("%d unique segments could not be translated and are left unchanged.", failed)
+    plan.apply(args.output_dir, args.suffix)
+    return 0 if not failed else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+import os
+import threading
+import time
+from collections import deque
+
+from pydoc_logging import get_logger
+from translation_memory import TranslationMemory
+from usage_ledger import UsageLedger
+
+# Smoothing factor of the observed latency and error rate
+EWMA_ALPHA = 0.3
+# A provider this many times slower than the fastest one leaves the last batches to it
+TAIL_SLOWDOWN = 3.0
+MAX_COOLDOWN = 60.0
+MAX_ATTEMPTS = 3
+PROVIDER_NAMES = ("volcengine", "deepl")
+
+logger = get_logger("router")
+
+
+class Provider:
+    """
+    A translation backend seen by the router, with its limits and observed health.
+    """
+
+    def __init__(self, name, translate_batch, batch_size=16, batch_chars=5000, workers=2, quota=None):
+        """
+        Args:
+            name (str): Provider name recorded in the translation memory, e.g. "volcengine".
+            translate_batch (callable): Takes a list of texts, returns their translations (None for failures).
+            batch_size (int): Maximum texts per request.
+            batch_chars (int): Maximum characters per request.
+            workers (int): Concurrent requests sent to this provider.
+            quota (int, optional): Remaining billable characters, None for unlimited.
+        """
+        self.name = name
+        self.translate_batch = translate_batch
+        self.batch_size = batch_size
+        self.batch_chars = batch_chars
+        self.workers = workers
+        self.quota = quota
+        self.latency = None  # seconds per 1000 characters
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+        self.batches = 0
+        self.chars = 0
+        self.errors = 0
+
+    def has_quota(self, chars):
+        return self.quota is None or self.quota >= chars
+
+    def record(self, chars, seconds, ok):
+        per_k = seconds * 1000 / max(chars, 1)
+        self.latency = per_k if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * per_k
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+        if ok:
+            self.consecutive_errors = 0
+            self.batches += 1
+            self.chars += chars
+        else:
+            self.errors += 1
+            self.consecutive_errors += 1
+            # Exponential back-off, so a failing provider stops taking work for a while
+            self.cooldown_until = time.monotonic() + min(MAX_COOLDOWN, 2 ** self.consecutive_errors)
+
+
+class _Batch:
+    def __init__(self, texts, preferred=None):
+        self.texts = texts
+        self.chars = sum(len(text) for text in texts)
+        self.preferred = preferred
+        self.failed_by = set()
+        self.attempts = 0
+
+
+class TranslationRouter:
+    """
+    Spreads segment batches over several providers at the same time.
+
+    Every provider runs its own workers that pull batches from a shared queue, so a faster
+    provider naturally takes more batches and the throughput of all providers adds up.
+    On top of that:
+    - a provider out of quota stops pulling, a failing one backs off exponentially and its
+      batch is retried by another provider;
+    - near the end of the queue a provider much slower than the fastest one leaves the last
+      batches to it, so the slow provider does not decide the completion time;
+    - preferences ({segment kind or glossary: provider name}) reserve batches for a provider
+      as long as it is able to take them.
+    Results are stored in the translation memory with the provider that produced them.
+    """
+
+    def __init__(self, providers, memory=None, preferences=None, target_lang="en"):
+        """
+        Args:
+            providers (list): Provider instances.
+            memory (TranslationMemory, optional): Translation memory; a default one is opened if None.
+                Pass False to disable it.
+            preferences (dict, optional): {segment kind or glossary: provider name}.
+            target_lang (str): Target language of all providers, used for the translation memory.
+        """
+        if not providers:
+            raise ValueError("At least one translation provider is required")
+        self.providers = list(providers)
+        self.memory = TranslationMemory() if memory is None else memory or None
+        self.preferences = preferences or {}
+        self.target_lang = target_lang
+        self._condition = threading.Condition()
+
+    def _make_batches(self, texts, preferred):
+        batch_size = min(provider.batch_size for provider in self.providers)
+        batch_chars = min(provider.batch_chars for provider in self.providers)
+        batches, batch, chars = [], [], 0
+        for text in texts:
+            if batch and (len(batch) >= batch_size or chars + len(text) > batch_chars):
+                batches.append(_Batch(batch, preferred))
+                batch, chars = [], 0
+            batch.append(text)
+            chars += len(text)
+        if batch:
+            batches.append(_Batch(batch, preferred))
+        return batches
+
+    def _can_take(self, provider, batch):
+        if not provider.has_quota(batch.chars):
+            return False
+        others = [p for p in self.providers if p is not provider]
+        if provider.name in batch.failed_by and any(p.name not in batch.failed_by and p.has_quota(batch.chars) for p in others):
+            return False
+        if batch.preferred and batch.preferred != provider.name:
+            preferred = next((p for p in others if p.name == batch.preferred), None)
+            if preferred is not None and preferred.has_quota(batch.chars) and preferred.name not in batch.failed_by:
+                return False
+        return True
+
+    def _next_batch(self, provider, queue, state):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if not queue and state["in_flight"] == 0:
+                    return None
+                if provider.quota is not None and provider.quota <= 0:
+                    return None
+                if state["in_flight"] == 0 and not any(self._can_take(p, batch) for p in self.providers for batch in queue):
+                    # Nothing left that any provider can take, e.g. all quotas are too small
+                    return None
+                if now >= provider.cooldown_until:
+                    # Only providers that can still take one of the queued batches count
+                    fastest = min((p.latency for p in self.providers
+                                   if p.latency is not None and now >= p.cooldown_until
+                                   and any(self._can_take(p, batch) for batch in queue)), default=None)
+                    tail = len(queue) <= sum(p.workers for p in self.providers if p is not provider)
+                    slow = provider.latency is not None and fastest is not None and provider.latency > TAIL_SLOWDOWN * fastest
+                    if not (tail and slow):
+                        for batch in queue:
+                            if self._can_take(provider, batch):
+                                queue.remove(batch)
+                                state["in_flight"] += 1
+                                if provider.quota is not None:
+                                    provider.quota -= batch.chars
+                                return batch
+                self._condition.wait(timeout=max(0.05, min(1.0, provider.cooldown_until - now)))
+
+    def _worker(self, provider, queue, state, results):
+        while True:
+            batch = self._next_batch(provider, queue, state)
+            if batch is None:
+                return
+            start = time.monotonic()
+            try:
+                translations = provider.translate_batch(batch.texts)
+            except Exception as e:
+                logger.warning("Provider %s failed: %s", provider.name, e, extra={"fields": {"provider": provider.name}})
+                translations = None
+            seconds = time.monotonic() - start
+            if translations is None or len(translations) != len(batch.texts):
+                translations = [None] * len(batch.texts)
+            failed = [text for text, translation in zip(batch.texts, translations) if translation is None]
+
+            with self._condition:
+                for text, translation in zip(batch.texts, translations):
+                    if translation is not None:
+                        results[text] = (translation, provider.name)
+                provider.record(batch.chars, seconds, not failed)
+                if failed:
+                    if provider.quota is not None:
+                        provider.quota += sum(len(text) for text in failed)
+                    retry = _Batch(failed, batch.preferred)
+                    retry.failed_by = batch.failed_by | {provider.name}
+                    retry.attempts = batch.attempts + 1
+                    # Texts that keep failing are given up, they stay untranslated
+                    if retry.attempts < MAX_ATTEMPTS:
+                        queue.appendleft(retry)
+                state["in_flight"] -= 1
+                self._condition.notify_all()
+
+    def translate(self, texts, kind=None, glossary=None):
+        """
+        Translates texts with all providers in parallel, using the translation memory first.
+
+        Args:
+            texts (list): The texts to translate.
+            kind (str, optional): Segment kind, e.g. "paragraph" or "cell", matched against the preferences.
+            glossary (str, optional): Glossary in use; matched against the preferences and used as
+                translation memory partition.
+
+        Returns:
+            list: The translations in the same order; None for texts no provider could translate.
+        """
+        partition = os.path.basename(glossary) if glossary else ""
+        unique = list(dict.fromkeys(texts))
+        known = self.memory.get_many(unique, self.target_lang, partition) if self.memory else {}
+        pending = [text for text in unique if text not in known]
+
+        results = {}
+        if pending:
+            preferred = self.preferences.get(kind) or self.preferences.get(partition)
+            queue = deque(self._make_batches(pending, preferred))
+            state = {"in_flight": 0}
+            threads = [threading.Thread(target=self._worker, args=(provider, queue, state, results), daemon=True)
+                       for provider in self.providers for _ in range(provider.workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            if self.memory:
+                by_provider = {}
+                for text, (translation, name) in results.items():
+                    by_provider.setdefault(name, []).append((text, translation))
+                for name, pairs in by_provider.items():
+                    self.memory.put_many(pairs, provider=name, target_lang=self.target_lang, partition=partition)
+
+        logger.info("Routed %d segments (%d from translation memory)", len(pending), len(known), extra={"fields": {
+            p.name: f"{p.batches} batches/{p.chars} chars/{p.errors} errors" for p in self.providers}})
+        translations = dict(known)
+        translations.update((text, translation) for text, (translation, _) in results.items())
+        return [translations.get(text) for text in texts]
+
+
+def parse_preferences(values):
+    """
+    Parses --route-prefer options into router preferences.
+
+    Args:
+        values (list): "key=provider" strings, the key being a segment kind ("paragraph", "cell")
+            or a glossary file name, e.g. ["cell=deepl", "glossary.json=volcengine"].
+
+    Returns:
+        dict: {segment kind or glossary file name: provider name}.
+
+    Raises:
+        ValueError: For a value without "=" or with an unknown provider.
+    """
+    preferences = {}
+    for value in values or ():
+        key, sep, name = (part.strip() for part in value.partition("="))
+        if not sep or not key or name not in PROVIDER_NAMES:
+            raise ValueError(f"Invalid route preference {value!r}, expected <segment kind or glossary file>=<{'|'.join(PROVIDER_NAMES)}>")
+        preferences[os.path.basename(key)] = name
+    return preferences
+
+
+def configured_providers(deepl_auth_key=None):
+    """Returns the names of the providers whose credentials are configured."""
+    names = []
+    if os.getenv("VOLC_ACCESS_KEY") and os.getenv("VOLC_SECRET_KEY"):
+        names.append("volcengine")
+    if deepl_auth_key or os.getenv("DEEPL_AUTH_KEY"):
+        names.append("deepl")
+    return names
+
+
+def build_providers(glossary_path=None, deepl_auth_key=None, deepl_source_lang=None, deepl_target_lang="EN-US", quotas=None):
+    """
+    Creates the providers whose credentials are configured: VolcEngine and/or DeepL.
+
+    The providers only send requests: the router looks texts up in the translation memory,
+    stores the results and handles retries, so the VolcEngine provider bypasses the
+    translation memory and job deadline of Translator.translate_batch.
+
+    Args:
+        glossary_path (str, optional): Glossary for DeepL.
+        deepl_auth_key (str, optional): DeepL key, defaults to $DEEPL_AUTH_KEY.
+        deepl_source_lang (str, optional): DeepL source language.
+        deepl_target_lang (str): Target language of both providers (a DeepL code, e.g. EN-US or DE).
+        quotas (dict, optional): {provider name: remaining characters}. Defaults to the remaining
+            monthly quota known to the usage ledger (DeepL's usage endpoint, or the configured limits).
+
+    Returns:
+        list: Provider instances.
+    """
+    ledger = UsageLedger() if quotas is None else None
+    quotas = quotas or {}
+    providers = []
+    configured = configured_providers(deepl_auth_key)
+    if "volcengine" in configured:
+        from Translator import Translator
+        translator = Translator(glossary_path, memory=False, target_lang=deepl_target_lang)
+        quota = ledger.remaining("volcengine") if ledger else quotas.get("volcengine")
+        providers.append(Provider("volcengine", translator._request_translations, Translator.BATCH_SIZE, Translator.BATCH_CHARS,
+                                  quota=quota))
+    if "deepl" in configured:
+        from deepl_translator import DeepLTranslator
+        deepl_translator = DeepLTranslator(deepl_auth_key)
+        quota = ledger.remaining("deepl", deepl_translator) if ledger else quotas.get("deepl")
+        providers.append(Provider(
+            "deepl",
+            lambda texts: deepl_translator.translate_batch(texts, source_lang=deepl_source_lang,
+                                                           target_lang=deepl_target_lang, glossary_path=glossary_path),
+            DeepLTranslator.BATCH_SIZE, DeepLTranslator.BATCH_CHARS, quota=quota))
+    return providers
@@ -0,0 +1,261 @@
+import math
+import re
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, conversions fall back to plain Python
+    np = None
+
+MM_PER_INCH = 25.4
+
+NUMBER = r"[-+]?\d+(?:\.\d+)?"
+
+# Header pattern -> (unit kind, converted header)
+HEADER_RULES = [
+    (re.compile(r"Product Dimensions\s*\(\s*mm\s*[*×]\s*mm\s*[*×]\s*mm\s*\)"), "mm", "Product Dimensions (inch*inch*inch)"),
+    (re.compile(r"Active Display Area\s*\(\s*mm\s*[*×]\s*mm\s*\)"), "mm", "Active Display Area (inch*inch)"),
+    (re.compile(r"Working Temperature\s*\(\s*(?:˚|°)?\s*(?:C|℃)\s*\)"), "celsius", "Working Temperature (°F)"),
+]
+
+# Value tokenizers: every match is one numeric token group of a cell
+VALUE_PATTERNS = {
+    "mm": re.compile(rf"(?<![\d.])({NUMBER})\s*[*×]\s*({NUMBER})(?:\s*[*×]\s*({NUMBER}))?"),
+    # A '-' only separates a range when it is followed by a number, so "-20~60" and "0-40" both work
+    "celsius": re.compile(rf"(?<![\d.])({NUMBER})(?:\s*(?:~|～|-(?=\s*[-+]?\d))\s*({NUMBER}))?"),
+}
+
+
+def _round_half_up(values, decimals):
+    """Rounds a list of floats half away from zero, with NumPy when available."""
+    factor = 10 ** decimals
+    if np is not None:
+        array = np.asarray(values, dtype=float) * factor
+        return (np.sign(array) * np.floor(np.abs(array) + 0.5) / factor).tolist()
+    return [math.copysign(math.floor(abs(v) * factor + 0.5), v) / factor for v in values]
+
+
+def convert_values(kind, values, inch_decimals=1):
+    """
+    Converts a batch of numbers in one vectorized operation.
+
+    Args:
+        kind (str): "mm" (to inch) or "celsius" (to Fahrenheit).
+        values (list): The numbers to convert.
+        inch_decimals (int): Decimals kept for inches. Fahrenheit is always an integer.
+
+    Returns:
+        list: The converted numbers.
+    """
+    if not values:
+        return []
+    if kind == "mm":
+        converted = np.asarray(values, dtype=float) / MM_PER_INCH if np is not None else [v / MM_PER_INCH for v in values]
+        return _round_half_up(converted, inch_decimals)
+    converted = np.asarray(values, dtype=float) * 9 / 5 + 32 if np is not None else [v * 9 / 5 + 32 for v in values]
+    return _round_half_up(converted, 0)
+
+
+def format_number(value):
+    """Formats a converted number without a trailing '.0'."""
+    text = f"{value:.6f}".rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+class UnitConverter:
+    """
+    Converts metric values in header/value cell pairs to US units.
+
+    A cell whose text contains a known header (e.g. "Product Dimensions (mm*mm*mm)")
+    gets its header rewritten, and the cell to its right has its numbers converted.
+    All cells of a batch are tokenized first, then every number of the same unit
+    is converted at once, and finally the numbers are replaced in place, so the
+    surrounding text, separators and spacing are preserved.
+    """
+
+    def __init__(self, inch_decimals=1):
+        """
+        Args:
+            inch_decimals (int): Decimals kept for inches.
+        """
+        self.inch_decimals = inch_decimals
+
+    @staticmethod
+    def match_header(text):
+        """
+        Args:
+            text (str): Cell text.
+
+        Returns:
+            tuple: (kind, converted text) if the text contains a known header, else None.
+        """
+        if not text:
+            return None
+        for pattern, kind, new_header in HEADER_RULES:
+            if pattern.search(text):
+                return kind, pattern.sub(new_header, text)
+        return None
+
+    def convert_texts(self, items):
+        """
+        Converts the numbers of many value texts in bulk.
+
+        Args:
+            items (list): (kind, text) pairs.
+
+        Returns:
+            list: The converted texts, in the same order.
+        """
+        tokens = []  # (item index, start, end, kind, value)
+        for index, (kind, text) in enumerate(items):
+            for match in VALUE_PATTERNS[kind].finditer(text or ""):
+                for group in range(1, match.lastindex + 1 if match.lastindex else 1):
+                    if match.group(group) is not None:
+                        tokens.append((index, match.start(group), match.end(group), kind, float(match.group(group))))
+
+        converted = {}
+        for kind in VALUE_PATTERNS:
+            positions = [i for i, token in enumerate(tokens) if token[3] == kind]
+            for position, value in zip(positions, convert_values(kind, [tokens[i][4] for i in positions], self.inch_decimals)):
+                converted[position] = format_number(value)
+
+        results = [text for _, text in items]
+        # Replace from the end of each text so earlier offsets stay valid
+        for position in range(len(tokens) - 1, -1, -1):
+            index, start, end, _, _ = tokens[position]
+            results[index] = results[index][:start] + converted[position] + results[index][end:]
+        return results
+
+    def convert_rows(self, rows):
+        """
+        Converts a list of rows (lists of cell values) in place.
+
+        Args:
+            rows (list): Rows of cell values; non-string cells are ignored.
+
+        Returns:
+            list: (row index, column index) of every modified cell.
+        """
+        items, targets, changed = [], [], []
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row[:-1]):
+                header = self.match_header(value) if isinstance(value, str) else None
+                if header is None:
+                    continue
+                kind, new_header = header
+                row[c] = new_header
+                changed.append((r, c))
+                if isinstance(row[c + 1], str) and row[c + 1]:
+                    items.append((kind, row[c + 1]))
+                    targets.append((r, c + 1))
+        for (r, c), text in zip(targets, self.convert_texts(items)):
+            rows[r][c] = text
+            changed.append((r, c))
+        return changed
+
+    # ========= Adapters =========
+
+    @staticmethod
+    def _set_cell_text(cell, text):
+        """Sets the text of a python-docx/python-pptx cell, keeping the formatting of each paragraph's first run."""
+        paragraphs = cell.paragraphs if hasattr(cell, "paragraphs") else cell.text_frame.paragraphs
+        lines = text.split("\n")
+        if len(lines) != len(paragraphs):
+            cell.text = text
+            return
+        for paragraph, line in zip(paragraphs, lines):
+            if paragraph.text == line:
+                continue
+            runs = paragraph.runs
+            if not runs:
+                run = paragraph.add_run()
+                run.text = line
+                continue
+            runs[0].text = line
+            for run in runs[1:]:
+                run.text = ""
+
+    def _convert_cell_grid(self, grid):
+        """Converts a grid of python-docx/python-pptx cells and returns the modified cells."""
+        rows = []
+        for row in grid:
+            values, previous = [], None
+            for cell in row:
+                # python-docx returns a horizontally merged cell once per grid column
+                element = getattr(cell, "_tc", cell)
+                values.append(None if element is previous else cell.text)
+                previous = element
+            rows.append(values)
+        changed = self.convert_rows(rows)
+        cells = []
+        for r, c in changed:
+            cell = grid[r][c]
+            self._set_cell_text(cell, rows[r][c])
+            cells.append(cell)
+        return cells
+
+    def convert_pptx_table(self, table):
+        """
+        Converts a python-pptx table.
+
+        Returns:
+            list: The modified cells, e.g. to restyle them.
+        """
+        return self._convert_cell_grid([list(row.cells) for row in table.rows])
+
+    def convert_docx_table(self, table):
+        """
+        Converts a python-docx table, including tables nested in its cells.
+
+        Returns:
+            list: The modified cells.
+        """
+        grid = [list(row.cells) for row in table.rows]
+        cells = self._convert_cell_grid(grid)
+        seen = set()
+        for row in grid:
+            for cell in row:
+                if id(cell._tc) in seen:
+                    continue
+                seen.add(id(cell._tc))
+                for nested in cell.tables:
+                    cells.extend(self.convert_docx_table(nested))
+        return cells
+
+    def convert_docx(self, doc):
+        """
+        Converts every table of a python-docx document, e.g. the output of Translator.translate_word_file.
+
+        Returns:
+            int: The number of modified cells.
+        """
+        return sum(len(self.convert_docx_table(table)) for table in doc.tables)
+
+    def convert_openpyxl_sheet(self, sheet):
+        """
+        Converts an openpyxl worksheet (not in write-only mode).
+
+        Returns:
+            int: The number of modified cells.
+        """
+        grid = [list(row) for row in sheet.iter_rows()]
+        rows = [[cell.value for cell in row] for row in grid]
+        changed = self.convert_rows(rows)
+        for r, c in changed:
+            grid[r][c].value = rows[r][c]
+        return len(changed)
+
+
+def convert_docx_file(input_path, output_path):
+    """
+    Converts the units in all tables of a Word document.
+
+    Args:
+        input_path (str): The Word document to convert.
+        output_path (str): Where to save the converted document.
+    """
+    import docx
+
+    doc = docx.Document(input_path)
+    count = UnitConverter().convert_docx(doc)
+    doc.save(output_path)
+    print(f"Unit conversion completed, {count} cells converted. Document saved at: {output_path}")
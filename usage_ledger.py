@@ -0,0 +1,160 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+from collections import Counter
+
+DEFAULT_LEDGER_DIR = os.path.join(os.path.expanduser("~"), ".pydoc", "usage")
+
+# Monthly character limits can be configured per provider, e.g. PYDOC_VOLCENGINE_MONTHLY_CHARS=2000000
+MONTHLY_LIMIT_ENV = "PYDOC_{provider}_MONTHLY_CHARS"
+
+SUMMARY_KEYS = ("provider", "day", "document", "glossary")
+
+
+class UsageLedger:
+    """
+    Persistent record of the billable characters sent to each translation provider.
+
+    Every request appends one JSON line to a file per month. A single write of a short line
+    to a file opened with O_APPEND is atomic, so concurrent workers and processes can record
+    usage without locks, and reading a month never touches older records.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str, optional): Ledger directory. Defaults to $PYDOC_USAGE_DIR or ~/.pydoc/usage.
+        """
+        self.directory = directory or os.getenv("PYDOC_USAGE_DIR") or DEFAULT_LEDGER_DIR
+
+    def _month_path(self, month):
+        return os.path.join(self.directory, f"{month}.ndjson")
+
+    def record(self, provider, chars, document=None, glossary=None, requests=1):
+        """
+        Appends one usage record.
+
+        Args:
+            provider (str): Provider name, e.g. "volcengine" or "deepl".
+            chars (int): Billable characters.
+            document (str, optional): The document being translated.
+            glossary (str, optional): The glossary in use.
+            requests (int): Number of API requests the record covers.
+        """
+        if not chars:
+            return
+        now = datetime.datetime.now()
+        record = {
+            "ts": round(now.timestamp(), 3),
+            "day": now.strftime("%Y-%m-%d"),
+            "provider": provider,
+            "chars": int(chars),
+            "requests": requests,
+            "document": os.path.basename(document) if document else None,
+            "glossary": os.path.basename(glossary) if glossary else None,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        fd = os.open(self._month_path(now.strftime("%Y-%m")), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def iter_records(self, month=None):
+        """
+        Yields the records of a month.
+
+        Args:
+            month (str, optional): "YYYY-MM", defaults to the current month.
+        """
+        path = self._month_path(month or datetime.date.today().strftime("%Y-%m"))
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A record cut off by a crash, skip it
+                    continue
+
+    def summary(self, by="provider", month=None, provider=None):
+        """
+        Sums the characters of a month.
+
+        Args:
+            by (str): One of "provider", "day", "document" or "glossary".
+            month (str, optional): "YYYY-MM", defaults to the current month.
+            provider (str, optional): Only count this provider.
+
+        Returns:
+            Counter: {key: characters}
+        """
+        totals = Counter()
+        for record in self.iter_records(month):
+            if provider is None or record["provider"] == provider:
+                totals[record.get(by)] += record["chars"]
+        return totals
+
+    def used(self, provider, month=None):
+        """Returns the characters a provider used in a month (default: the current month)."""
+        return self.summary("provider", month, provider)[provider]
+
+    def remaining(self, provider, deepl_translator=None):
+        """
+        Returns the characters a provider may still use this month, or None if there is no known limit.
+
+        DeepL's usage endpoint is authoritative when a DeepLTranslator is given; otherwise the limit
+        is taken from $PYDOC_<PROVIDER>_MONTHLY_CHARS and the usage from the ledger.
+        """
+        if provider == "deepl" and deepl_translator is not None:
+            usage = deepl_translator.get_usage()
+            if usage is not None:
+                count, limit = usage
+                if limit:
+                    return max(0, limit - count)
+        limit = os.getenv(MONTHLY_LIMIT_ENV.format(provider=provider.upper()))
+        if not limit:
+            return None
+        return max(0, int(limit) - self.used(provider))
+
+    def check_budget(self, provider, chars, deepl_translator=None):
+        """
+        Checks that a job of the given size fits in the remaining quota.
+
+        Returns:
+            tuple: (fits, remaining) with remaining None if the limit is unknown.
+        """
+        remaining = self.remaining(provider, deepl_translator)
+        return remaining is None or chars <= remaining, remaining
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the translation usage recorded in the ledger.")
+    parser.add_argument("--month", help="Month to show, YYYY-MM (default: current month).")
+    parser.add_argument("--by", choices=SUMMARY_KEYS, default="provider", help="Group the characters by this field (default: provider).")
+    parser.add_argument("--provider", help="Only show this provider.")
+    parser.add_argument("--deepl", action="store_true", help="Also query DeepL's usage endpoint.")
+    parser.add_argument("--dir", help="Ledger directory (default: $PYDOC_USAGE_DIR or ~/.pydoc/usage).")
+    args = parser.parse_args(argv)
+
+    ledger = UsageLedger(args.dir)
+    totals = ledger.summary(args.by, args.month, args.provider)
+    print(f"Characters by {args.by} ({args.month or datetime.date.today().strftime('%Y-%m')}):")
+    for key, chars in totals.most_common():
+        print(f"  {key or '-'}: {chars}")
+    print(f"  total: {sum(totals.values())}")
+    if args.deepl:
+        from deepl_translator import DeepLTranslator
+        usage = DeepLTranslator().get_usage()
+        if usage is not None:
+            count, limit = usage
+            print(f"DeepL API usage: {count} of {limit or 'unlimited'} characters")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())